@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Shanten cache size and hit rate with and without canonical keys.
+
+The trace is a list of 34 tiles arrays in the order the AI asks for shanten.
+It can be loaded from a file (one hand per line, 34 comma separated counts),
+or generated by bots battle like rounds: four players get the wall dealt
+like in GameManager, and on each turn the player checks the all discard/draw pairs.
+
+Run it from the tenhou-bot folder:
+python -m benchmarks.canonical_cache --rounds 20
+"""
+import random
+import time
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+
+from mahjong.ai.cache import LRUCache, canonical_key, pack_tiles
+from mahjong.ai.hand_analyzer import HandAnalyzer
+from mahjong.ai.shanten import Shanten
+
+
+def generate_trace(rounds, seed):
+    random.seed(seed)
+    trace = []
+    for _ in range(0, rounds):
+        wall = [x // 4 for x in range(0, 136)]
+        random.shuffle(wall)
+        # dead wall
+        wall = wall[14:]
+
+        players = []
+        for _ in range(0, 4):
+            tiles = [0] * 34
+            for tile in wall[:13]:
+                tiles[tile] += 1
+            wall = wall[13:]
+            players.append(HandAnalyzer(tiles))
+
+        current = 0
+        while wall:
+            analyzer = players[current]
+            analyzer.draw(wall.pop())
+            trace += exchanged_hands(analyzer.tiles)
+
+            outs, shanten = analyzer.outs()
+            if shanten == Shanten.AGARI_STATE:
+                break
+
+            if outs:
+                discard = outs[0]['discard']
+            else:
+                discard = random.choice([x for x in range(0, 34) if analyzer.tiles[x]])
+            analyzer.discard(discard)
+            current = (current + 1) % 4
+    return trace
+
+
+def exchanged_hands(tiles):
+    """
+    Hands that we check when we calculate outs for 14 tiles hand
+    """
+    hands = []
+    tiles = list(tiles)
+    for discard in range(0, 34):
+        if not tiles[discard]:
+            continue
+
+        tiles[discard] -= 1
+        hands.append(list(tiles))
+        for draw in range(0, 34):
+            if draw == discard or tiles[draw] >= 4:
+                continue
+
+            tiles[draw] += 1
+            hands.append(list(tiles))
+            tiles[draw] -= 1
+        tiles[discard] += 1
+    return hands
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [[int(x) for x in line.split(',')] for line in f if line.strip()]
+
+
+def replay(trace, capacity, cache_key):
+    cache = LRUCache(capacity)
+    shanten = Shanten(cache, cache_key)
+    start = time.perf_counter()
+    for tiles in trace:
+        shanten.calculate_shanten(tiles)
+    return cache, time.perf_counter() - start
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-r', '--rounds', type='int', default=20, help='Count of generated rounds')
+    parser.add_option('-s', '--seed', type='int', default=0, help='Random seed for the generated rounds')
+    parser.add_option('-t', '--trace', type='string', help='File with recorded hands')
+    parser.add_option('-c', '--capacity', type='string', default='10000,100000,1000000',
+                      help='Comma separated cache capacities')
+
+    opts, _ = parser.parse_args()
+
+    if opts.trace:
+        trace = load_trace(opts.trace)
+    else:
+        trace = generate_trace(opts.rounds, opts.seed)
+
+    table_data = [
+        ['Capacity', 'Key', 'Size', 'Hit rate', 'Evictions', 'Time, s'],
+    ]
+    for capacity in [int(x) for x in opts.capacity.split(',')]:
+        for name, cache_key in [('packed', pack_tiles), ('canonical', canonical_key)]:
+            cache, elapsed = replay(trace, capacity, cache_key)
+            table_data.append([
+                '{0:,d}'.format(capacity),
+                name,
+                '{0:,d}'.format(len(cache)),
+                format(cache.hit_rate * 100, '.2f') + '%',
+                '{0:,d}'.format(cache.evictions),
+                format(elapsed, '.2f'),
+            ])
+
+    print('Trace: {0:,d} hands, {1:,d} unique'.format(len(trace), len(set([bytes(x) for x in trace]))))
+    print(AsciiTable(table_data).table)
+
+
+if __name__ == '__main__':
+    main()
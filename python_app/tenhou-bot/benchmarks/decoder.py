@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Decode time of the tenhou messages.
+
+The stream is messages in the same format as TenhouClient gets them:
+lower case tags delimited by \0. By default it is the recorded stream
+from the beginning of the game, or it can be loaded from a file.
+
+Run it from the tenhou-bot folder:
+python -m benchmarks.decoder --repeats 200
+"""
+import time
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+
+from tenhou.decoder import TenhouDecoder
+from tenhou.tokenizer import tokenize
+
+RECORDED_STREAM = '\x00'.join([
+    '<helo uname="%4e%6f%4e%61%6d%65" auth="20160318-54ebe070" ratingscale=""/>',
+    '<ln n="bu0t3g1" j="c1c4" g="hg2"/>',
+    '<go type="169" lobby="0" gpid="d0fa2bb0-2bc1"/>',
+    '<un n0="%4e%6f%4e%61%6d%65" n1="%6f%32" n2="%6f%33" n3="%6f%34" dan="0,7,12,1" '
+    'rate="1500.00,1521.23,1722.00,1499.00" sx="m,m,f,m"/>',
+    '<taikyoku oya="1" log="2016031911gm-0001-0000-381f693b"/>',
+    '<init seed="0,2,3,0,1,126" ten="250,250,250,250" oya="3" hai="30,67,44,21,133,123,87,69,36,34,94,4,128"/>',
+    '<t23/>', '<d23/>', '<u/>', '<e101/>', '<v/>', '<f57/>', '<w/>', '<g12 t="1"/>',
+    '<t88/>', '<d88/>', '<u/>', '<e45/>', '<v/>', '<f3/>', '<w/>', '<g120/>',
+    '<n who="3" m="34314" />',
+    '<t76/>', '<d30/>', '<u/>', '<e98 t="4"/>', '<v/>', '<f110/>',
+    '<reach who="2" step="1"/>', '<reach who="2" ten="255,216,261,258" step="2"/>',
+    '<w/>', '<g61/>', '<t17/>', '<d17/>', '<u/>', '<e8/>',
+    '<n who="1" m="13825" />', '<dora hai="125" />',
+    '<v/>', '<f90/>', '<w/>', '<g33 t="8"/>',
+    '<agari ba="0,1" hai="1,6,9,24,25,37,42,44,45,49,52,58,60,64" machi="44" ten="30,8000,1" yaku="1,1,7,1,54,1" '
+    'dorahai="69" dorahaiura="59" who="2" fromwho="3" sc="240,0,260,0,230,113,270,-103" '
+    'owari="240,-16.0,260,6.0,343,54.0,167,-44.0" />',
+    '<prof lobby="0" type="9" add="-1,0,0,1,0,0,0,0,0,0,0"/>',
+]) + '\x00'
+
+
+def decode(decoder, message):
+    """
+    The same decode calls that TenhouClient does for the message
+    """
+    token = tokenize(message)
+    tag, attrs = token
+
+    if tag == 'init':
+        decoder.parse_initial_values(token)
+        decoder.parse_initial_hand(token)
+    elif tag in ['t', 'e', 'f', 'g'] and 'tile' in attrs:
+        decoder.parse_tile(token)
+    elif tag == 'n':
+        decoder.parse_meld(token)
+    elif tag == 'dora':
+        decoder.parse_dora_indicator(token)
+    elif tag == 'reach':
+        decoder.parse_who_called_riichi(token)
+    elif tag == 'un':
+        decoder.parse_names_and_ranks(token)
+    elif tag == 'taikyoku':
+        decoder.parse_log_link(token)
+    elif tag == 'go':
+        decoder.parse_game_type(token)
+
+    if 'owari' in attrs:
+        decoder.parse_final_scores_and_uma(token)
+
+
+def measure(function, messages, repeats):
+    start = time.perf_counter()
+    for _ in range(0, repeats):
+        for message in messages:
+            function(message)
+    return (time.perf_counter() - start) / repeats / len(messages) * 1000000
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-f', '--file', type='string', help='File with \\0 delimited tenhou messages')
+    parser.add_option('-r', '--repeats', type='int', default=200, help='Count of repeats of the stream')
+
+    opts, _ = parser.parse_args()
+
+    stream = RECORDED_STREAM
+    if opts.file:
+        with open(opts.file, 'r') as f:
+            stream = f.read().lower()
+    # the same split as TenhouClient does
+    messages = stream.split('\x00')[0:-1]
+
+    decoder = TenhouDecoder()
+    table_data = [
+        ['Messages', 'Tokenize, us per message', 'Decode, us per message'],
+        [
+            len(messages),
+            format(measure(tokenize, messages, opts.repeats), '.2f'),
+            format(measure(lambda x: decode(decoder, x), messages, opts.repeats), '.2f'),
+        ]
+    ]
+    print(AsciiTable(table_data).table)
+
+
+if __name__ == '__main__':
+    main()
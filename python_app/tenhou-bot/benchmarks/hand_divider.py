@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+HandDivider speed on the hands with a lot of possible sets.
+Most of them are chinitsu and chuuren poutou hands from the yaku tests.
+
+Run it from the tenhou-bot folder:
+python -m benchmarks.hand_divider --repeat 100
+"""
+import time
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+
+from mahjong.ai.decompositions import decomposition_table
+from mahjong.hand import HandDivider
+from mahjong.tile import TilesConverter
+
+HANDS = [
+    # chinitsu
+    {'man': '12345666778899'},
+    {'man': '11234567677889'},
+    {'man': '11223344556677'},
+    {'man': '11122233344455'},
+    {'man': '22223333444455'},
+    # chuuren poutou
+    {'man': '11112345678999'},
+    {'man': '11122345678999'},
+    {'pin': '11123345678999'},
+    {'sou': '11123456678999'},
+    # chinitsu with the open set
+    {'man': '11234567677889', 'open_sets': [{'man': '678'}]},
+    # simple hand
+    {'man': '234567', 'sou': '23455', 'honors': '777'},
+]
+
+
+def hand_to_34(hand):
+    return TilesConverter.to_34_array(TilesConverter.string_to_136_array(sou=hand.get('sou', ''),
+                                                                         pin=hand.get('pin', ''),
+                                                                         man=hand.get('man', ''),
+                                                                         honors=hand.get('honors', '')))
+
+
+def open_sets_to_34(hand):
+    open_sets = []
+    for item in hand.get('open_sets', []):
+        tiles = hand_to_34(item)
+        open_sets.append([x for x in range(0, 34) for _ in range(0, tiles[x])])
+    return open_sets
+
+
+def measure(tiles, open_sets, repeat):
+    # the first call decodes suits from the decompositions table
+    decomposition_table().decoded.clear()
+    start = time.perf_counter()
+    hands = HandDivider().divide_hand(list(tiles), [list(x) for x in open_sets], [])
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(0, repeat):
+        HandDivider().divide_hand(list(tiles), [list(x) for x in open_sets], [])
+    warm = (time.perf_counter() - start) / repeat
+    return hands, cold, warm
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-r', '--repeat', type='int', default=100, help='Count of calls for the every hand')
+
+    opts, _ = parser.parse_args()
+
+    table_data = [
+        ['Hand', 'Open sets', 'Options', 'First call, ms', 'Next calls, ms'],
+    ]
+    for hand in HANDS:
+        tiles = hand_to_34(hand)
+        open_sets = open_sets_to_34(hand)
+        hands, cold, warm = measure(tiles, open_sets, opts.repeat)
+        table_data.append([
+            TilesConverter.to_one_line_string([x * 4 for x in range(0, 34) for _ in range(0, tiles[x])]),
+            len(open_sets),
+            len(hands),
+            format(cold * 1000, '.3f'),
+            format(warm * 1000, '.3f'),
+        ])
+
+    print(AsciiTable(table_data).table)
+
+
+if __name__ == '__main__':
+    main()
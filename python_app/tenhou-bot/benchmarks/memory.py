@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Memory of the model objects (Table, Player, Meld, Tile) in the local bots battle.
+
+Every hanchan is played with tracemalloc enabled, and after every discard
+we measure the size of the tables state (without AI objects).
+
+Run it from the tenhou-bot folder:
+python -m benchmarks.memory --hanchans 5
+"""
+import logging
+import random
+import sys
+import tracemalloc
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+
+from game.game_manager import GameManager
+from mahjong.client import Client
+
+# memory of the one table state, with players, their hands, discards and melds
+TABLE_MEMORY_BUDGET = 16 * 1024
+
+
+def object_size(item):
+    """
+    :return: size of the object and its __dict__, if it has it
+    """
+    size = sys.getsizeof(item)
+    if hasattr(item, '__dict__'):
+        size += sys.getsizeof(item.__dict__)
+    return size
+
+
+def table_memory(table):
+    """
+    Size of the table and players state in bytes, AI objects are not counted
+    """
+    size = object_size(table) + sys.getsizeof(table.players) + sys.getsizeof(table.dora_indicators)
+
+    index = table.index
+    size += object_size(index) + sys.getsizeof(index.genbutsu) + sys.getsizeof(index.meld_tiles)
+    for counts in [index.visible, index.remaining, index.dora] + index.meld_tiles:
+        size += sys.getsizeof(counts)
+
+    for player in table.players:
+        size += object_size(player)
+        for tiles in [player.tiles, player.discards, player.safe_tiles]:
+            # small int objects are shared, but tiles of the int subclass are not
+            size += sys.getsizeof(tiles) + sum([object_size(x) for x in tiles if type(x) is not int])
+
+        size += sys.getsizeof(player.melds)
+        for meld in player.melds:
+            size += object_size(meld) + sys.getsizeof(meld.tiles)
+    return size
+
+
+class MeasuredGameManager(GameManager):
+    max_table_memory = 0
+
+    def play_round(self):
+        result = super(MeasuredGameManager, self).play_round()
+        # the end of the round is the biggest state: all discards and melds are on the table
+        self.max_table_memory = max(self.max_table_memory, max([table_memory(x.table) for x in self.clients]))
+        return result
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-n', '--hanchans', type='int', default=5, help='Count of hanchans to play')
+    parser.add_option('-s', '--seed', type='int', default=42, help='Seed for the wall generation')
+
+    opts, _ = parser.parse_args()
+
+    logging.getLogger('game').disabled = True
+    random.seed(opts.seed)
+
+    clients = [Client() for _ in range(0, 4)]
+    manager = MeasuredGameManager(clients)
+    total_results = dict([(x.id, {'lose_rounds': 0, 'win_rounds': 0, 'riichi_rounds': 0}) for x in clients])
+
+    table_data = [
+        ['Hanchan', 'Rounds', 'Allocated, KB', 'Peak, KB', 'Table state, bytes'],
+    ]
+    tracemalloc.start()
+    for x in range(0, opts.hanchans):
+        manager.max_table_memory = 0
+        tracemalloc.reset_peak()
+        start_size, _ = tracemalloc.get_traced_memory()
+        start = tracemalloc.take_snapshot()
+
+        result = manager.play_game(total_results)
+
+        _, peak = tracemalloc.get_traced_memory()
+        allocated = sum([stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(start, 'filename')
+                         if stat.size_diff > 0])
+        table_data.append([
+            x + 1,
+            result['played_rounds'],
+            format(allocated / 1024, '.1f'),
+            format((peak - start_size) / 1024, '.1f'),
+            '{0:,d}'.format(manager.max_table_memory),
+        ])
+    tracemalloc.stop()
+
+    print(AsciiTable(table_data).table)
+
+    max_table_memory = max([int(x[-1].replace(',', '')) for x in table_data[1:]])
+    print('Table memory budget: {0:,d} bytes, max table state: {1:,d} bytes'.format(
+        TABLE_MEMORY_BUDGET,
+        max_table_memory
+    ))
+    if max_table_memory > TABLE_MEMORY_BUDGET:
+        print('Table state is over the budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+FinishedHand.estimate_hand_value speed on the hands with different yaku.
+
+Run it from the tenhou-bot folder:
+python -m benchmarks.yaku --repeat 200
+"""
+import time
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+
+from mahjong.ai.cache import LRUCache
+from mahjong.constants import EAST, SOUTH
+from mahjong.hand import FinishedHand
+from mahjong.tile import TilesConverter
+
+HANDS = [
+    {'tiles': {'sou': '123444', 'man': '234456', 'pin': '66'}, 'win_tile': {'sou': '4'}},
+    {'tiles': {'sou': '112233', 'man': '22', 'pin': '223344'}, 'win_tile': {'pin': '3'}},
+    {'tiles': {'sou': '111333', 'man': '333', 'pin': '44555'}, 'win_tile': {'pin': '5'}, 'is_tsumo': True},
+    {'tiles': {'sou': '123', 'man': '123789', 'honors': '22333'}, 'win_tile': {'honors': '3'}},
+    {'tiles': {'man': '11234567677889'}, 'win_tile': {'man': '1'}},
+    {'tiles': {'man': '11122345678999'}, 'win_tile': {'man': '2'}},
+    {'tiles': {'man': '12345666778899'}, 'win_tile': {'man': '9'}, 'is_riichi': True},
+    {'tiles': {'sou': '123', 'pin': '123', 'man': '123', 'honors': '11777'}, 'win_tile': {'honors': '7'}},
+    {'tiles': {'sou': '1133', 'man': '113355', 'honors': '1155'}, 'win_tile': {'man': '5'}},
+    {'tiles': {'sou': '222', 'honors': '11122233344'}, 'win_tile': {'honors': '4'}, 'is_tsumo': True},
+    {'tiles': {'pin': '234777888999', 'honors': '22'}, 'win_tile': {'pin': '9'},
+     'open_sets': [{'pin': '789'}, {'pin': '234'}]},
+]
+
+# 13 tiles hands for the estimate_tenpai_values
+TENPAI_HANDS = [
+    {'sou': '67', 'man': '234567', 'pin': '23455'},
+    {'man': '1112345678999'},
+    {'man': '2345666778899'},
+    {'sou': '1133', 'man': '113355', 'honors': '115'},
+]
+
+
+def to_136(tiles):
+    return TilesConverter.string_to_136_array(sou=tiles.get('sou', ''),
+                                              pin=tiles.get('pin', ''),
+                                              man=tiles.get('man', ''),
+                                              honors=tiles.get('honors', ''))
+
+
+def estimate(hand, item):
+    return hand.estimate_hand_value(to_136(item['tiles']),
+                                    to_136(item['win_tile'])[0],
+                                    is_tsumo=item.get('is_tsumo', False),
+                                    is_riichi=item.get('is_riichi', False),
+                                    open_sets=[to_136(x) for x in item.get('open_sets', [])],
+                                    player_wind=EAST,
+                                    round_wind=SOUTH)
+
+
+def measure(hand, item, repeat):
+    start = time.perf_counter()
+    for _ in range(0, repeat):
+        estimate(hand, item)
+    return (time.perf_counter() - start) / repeat
+
+
+def estimate_waits(hand, tiles):
+    """
+    The same values as estimate_tenpai_values, but with separate call for the every value
+    """
+    values = {}
+    for win_tile in range(0, 34):
+        for is_tsumo in [False, True]:
+            for is_riichi in [True, False]:
+                result = hand.estimate_hand_value(tiles + [win_tile * 4], win_tile * 4, is_tsumo=is_tsumo,
+                                                  is_riichi=is_riichi, player_wind=EAST, round_wind=SOUTH)
+                if result['error'] != 'Hand is not winning':
+                    values[(win_tile, is_tsumo, is_riichi)] = result
+    return values
+
+
+def tenpai_table(repeat):
+    hand = FinishedHand()
+    table_data = [
+        ['Hand', 'Waits', 'Separate calls, ms', 'estimate_tenpai_values, ms'],
+    ]
+    for item in TENPAI_HANDS:
+        tiles = to_136(item)
+
+        start = time.perf_counter()
+        for _ in range(0, repeat):
+            estimate_waits(hand, tiles)
+        separate = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(0, repeat):
+            values = hand.estimate_tenpai_values(tiles, player_wind=EAST, round_wind=SOUTH)
+        batch = (time.perf_counter() - start) / repeat
+
+        table_data.append([
+            TilesConverter.to_one_line_string(tiles),
+            len(values),
+            format(separate * 1000, '.3f'),
+            format(batch * 1000, '.3f'),
+        ])
+    return AsciiTable(table_data).table
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-r', '--repeat', type='int', default=200, help='Count of calls for the every hand')
+
+    opts, _ = parser.parse_args()
+
+    hand = FinishedHand()
+    cached_hand = FinishedHand(LRUCache(len(HANDS)))
+    table_data = [
+        ['Hand', 'Han', 'Fu', 'Yaku', 'Time, ms', 'Cached, ms'],
+    ]
+    total = 0
+    cached_total = 0
+    for item in HANDS:
+        result = estimate(hand, item)
+
+        elapsed = measure(hand, item, opts.repeat)
+        total += elapsed
+
+        cached_elapsed = measure(cached_hand, item, opts.repeat)
+        cached_total += cached_elapsed
+
+        table_data.append([
+            TilesConverter.to_one_line_string(to_136(item['tiles'])),
+            result['han'],
+            result['fu'],
+            ', '.join([x.name for x in result['hand_yaku']]),
+            format(elapsed * 1000, '.3f'),
+            format(cached_elapsed * 1000, '.3f'),
+        ])
+
+    table_data.append(['Total', '', '', '', format(total * 1000, '.3f'), format(cached_total * 1000, '.3f')])
+    print(AsciiTable(table_data).table)
+    print(tenpai_table(max(1, opts.repeat // 10)))
+
+
+if __name__ == '__main__':
+    main()
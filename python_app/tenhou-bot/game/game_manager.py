@@ -5,7 +5,7 @@ from collections import deque
 from random import randint, shuffle, random
 
 from game.logger import set_up_logging
-from mahjong.ai.agari import Agari
+from mahjong.ai.cache import hand_value_cache
 from mahjong.client import Client
 from mahjong.hand import FinishedHand
 from mahjong.tile import TilesConverter
@@ -41,15 +41,18 @@ class GameManager(object):
 
     _unique_dealers = 0
 
-    def __init__(self, clients):
+    def __init__(self, clients, ruleset=None):
+        """
+        :param clients: list of clients, they should be created with the same ruleset
+        :param ruleset: Ruleset of the game, by default it is rules from the settings
+        """
         self.tiles = []
         self.dead_wall = []
         self.dora_indicators = []
         self.clients = clients
         self._set_client_names()
 
-        self.agari = Agari()
-        self.finished_hand = FinishedHand()
+        self.finished_hand = FinishedHand(hand_value_cache, ruleset)
 
     def init_game(self):
         """
@@ -133,14 +136,12 @@ class GameManager(object):
 
             tile = self._cut_tiles(1)[0]
 
+            # the waiting mask is calculated for the hand before the draw
+            is_win = client.player.is_waiting_on(tile)
+
             # we don't need to add tile to the hand when we are in riichi
-            if client.player.in_riichi:
-                tiles = client.player.tiles + [tile]
-            else:
+            if not client.player.in_riichi:
                 client.draw_tile(tile)
-                tiles = client.player.tiles
-
-            is_win = self.agari.is_agari(TilesConverter.to_34_array(tiles))
 
             # win by tsumo after tile draw
             if is_win:
@@ -243,9 +244,7 @@ class GameManager(object):
     def can_call_ron(self, client, win_tile):
         if not client.player.in_tempai or not client.player.in_riichi:
             return False
-        tiles = client.player.tiles
-        is_ron = self.agari.is_agari(TilesConverter.to_34_array(tiles + [win_tile]))
-        return is_ron
+        return client.player.is_waiting_on(win_tile)
 
     def call_riichi(self, client):
         client.player.in_riichi = True
@@ -1,12 +1,31 @@
 # -*- coding: utf-8 -*-
+import itertools
+
+from mahjong.ai.decompositions import build_decompositions
+from mahjong.packed_hand import PackedHand
+
+# all complete suit patterns (up to four sets and one pair)
+# packed suit counts -> (has pair, tuple of decompositions)
+SUIT_PATTERNS = None
+
+
+def suit_patterns():
+    global SUIT_PATTERNS
+    if SUIT_PATTERNS is None:
+        SUIT_PATTERNS = {}
+        for key, decompositions in build_decompositions().items():
+            has_pair = any([len(x) == 2 for x in decompositions[0]])
+            SUIT_PATTERNS[key] = (has_pair, decompositions)
+    return SUIT_PATTERNS
 
 
 class Agari(object):
 
     def is_agari(self, tiles):
         """
-        Determine was it win or not
-        :param tiles: 34 tiles format array
+        Determine was it win or not.
+        Every number suit is checked with one lookup in the suit patterns
+        :param tiles: 34 tiles format array or PackedHand
         :return: boolean
         """
         j = (1 << tiles[27]) | (1 << tiles[28]) | (1 << tiles[29]) | (1 << tiles[30]) | \
@@ -28,123 +47,80 @@ class Agari(object):
         if j & 2:
             return False
 
-        n00 = tiles[0] + tiles[3] + tiles[6]
-        n01 = tiles[1] + tiles[4] + tiles[7]
-        n02 = tiles[2] + tiles[5] + tiles[8]
+        patterns = suit_patterns()
+        # honor pairs
+        count_of_pairs = (tiles[27] == 2) + (tiles[28] == 2) + (tiles[29] == 2) + (tiles[30] == 2) + \
+            (tiles[31] == 2) + (tiles[32] == 2) + (tiles[33] == 2)
+        for d in (0, 9, 18):
+            key = self._to_meld(tiles, d)
+            if not key:
+                continue
 
-        n10 = tiles[9] + tiles[12] + tiles[15]
-        n11 = tiles[10] + tiles[13] + tiles[16]
-        n12 = tiles[11] + tiles[14] + tiles[17]
+            pattern = patterns.get(key)
+            if not pattern:
+                return False
+            count_of_pairs += pattern[0]
 
-        n20 = tiles[18] + tiles[21] + tiles[24]
-        n21 = tiles[19] + tiles[22] + tiles[25]
-        n22 = tiles[20] + tiles[23] + tiles[26]
+        return count_of_pairs == 1
 
-        n0 = (n00 + n01 + n02) % 3
-        if n0 == 1:
-            return False
+    def divide_hand(self, tiles):
+        """
+        Find the all possible closed hand options with the suit patterns.
+        The result is the same as the result of HandDivider.divide_hand without open sets and kans
+        :param tiles: 34 tiles format array or PackedHand
+        :return: list of hands, every hand is a sorted list of sets in 34 tiles format
+        """
+        patterns = suit_patterns()
 
-        n1 = (n10 + n11 + n12) % 3
-        if n1 == 1:
-            return False
+        # honor pon sets can't be a part of pair
+        pair_indices = [x for x in range(0, 27) if tiles[x] >= 2] + [x for x in range(27, 34) if tiles[x] == 2]
 
-        n2 = (n20 + n21 + n22) % 3
-        if n2 == 1:
-            return False
+        honors = []
+        for x in range(27, 34):
+            if tiles[x] == 1 or tiles[x] == 4:
+                honors = None
+                break
+            if tiles[x]:
+                honors.append([x] * tiles[x])
+
+        # sou, man, pin suits, in the same order as HandDivider combines them
+        suits = []
+        for d in (0, 18, 9):
+            key = self._to_meld(tiles, d)
+            if not key:
+                continue
+
+            pattern = patterns.get(key)
+            if not pattern:
+                suits = None
+                break
 
-        if ((n0 == 2) + (n1 == 2) + (n2 == 2) + (tiles[27] == 2) + (tiles[28] == 2) +
-                (tiles[29] == 2) + (tiles[30] == 2) + (tiles[31] == 2) + (tiles[32] == 2) +
-                (tiles[33] == 2) != 1):
-            return False
+            suits.append([[[d + x for x in item] for item in decomposition] for decomposition in pattern[1]])
 
-        nn0 = (n00 * 1 + n01 * 2) % 3
-        m0 = self._to_meld(tiles, 0)
-        nn1 = (n10 * 1 + n11 * 2) % 3
-        m1 = self._to_meld(tiles, 9)
-        nn2 = (n20 * 1 + n21 * 2) % 3
-        m2 = self._to_meld(tiles, 18)
-
-        if j & 4:
-            return not (n0 | nn0 | n1 | nn1 | n2 | nn2) and self._is_mentsu(m0) \
-                   and self._is_mentsu(m1) and self._is_mentsu(m2)
-
-        if n0 == 2:
-            return not (n1 | nn1 | n2 | nn2) and self._is_mentsu(m1) and self._is_mentsu(m2) \
-                   and self._is_atama_mentsu(nn0, m0)
-
-        if n1 == 2:
-            return not (n2 | nn2 | n0 | nn0) and self._is_mentsu(m2) and self._is_mentsu(m0) \
-                   and self._is_atama_mentsu(nn1, m1)
-
-        if n2 == 2:
-            return not (n0 | nn0 | n1 | nn1) and self._is_mentsu(m0) and self._is_mentsu(m1) \
-                   and self._is_atama_mentsu(nn2, m2)
-
-        return False
-
-    def _is_mentsu(self, m):
-        a = m & 7
-        b = 0
-        c = 0
-        if a == 1 or a == 4:
-            b = c = 1
-        elif a == 2:
-            b = c = 2
-        m >>= 3
-        a = (m & 7) - b
-
-        if a < 0:
-            return False
+        hands = []
+        if honors is not None and suits is not None:
+            for decompositions in itertools.product(*suits):
+                hand = list(honors)
+                for decomposition in decompositions:
+                    hand += decomposition
 
-        is_not_mentsu = False
-        for x in range(0, 6):
-            b = c
-            c = 0
-            if a == 1 or a == 4:
-                b += 1
-                c += 1
-            elif a == 2:
-                b += 2
-                c += 2
-            m >>= 3
-            a = (m & 7) - b
-            if a < 0:
-                is_not_mentsu = True
-                break
+                pairs = [x[0] for x in hand if len(x) == 2]
+                if len(pairs) == 1:
+                    hands.append((pairs[0], sorted(hand, key=lambda x: (x[0], x[1]))))
 
-        if is_not_mentsu:
-            return False
+        # HandDivider tries pairs from the lowest tile
+        hands = [x[1] for x in sorted(hands, key=lambda x: x[0])]
 
-        m >>= 3
-        a = (m & 7) - c
-
-        return a == 0 or a == 3
-
-    def _is_atama_mentsu(self, nn, m):
-        if nn == 0:
-            if (m & (7 << 6)) >= (2 << 6) and self._is_mentsu(m - (2 << 6)):
-                return True
-            if (m & (7 << 15)) >= (2 << 15) and self._is_mentsu(m - (2 << 15)):
-                return True
-            if (m & (7 << 24)) >= (2 << 24) and self._is_mentsu(m - (2 << 24)):
-                return True
-        elif nn == 1:
-            if (m & (7 << 3)) >= (2 << 3) and self._is_mentsu(m - (2 << 3)):
-                return True
-            if (m & (7 << 12)) >= (2 << 12) and self._is_mentsu(m - (2 << 12)):
-                return True
-            if (m & (7 << 21)) >= (2 << 21) and self._is_mentsu(m - (2 << 21)):
-                return True
-        elif nn == 2:
-            if (m & (7 << 0)) >= (2 << 0) and self._is_mentsu(m - (2 << 0)):
-                return True
-            if (m & (7 << 9)) >= (2 << 9) and self._is_mentsu(m - (2 << 9)):
-                return True
-            if (m & (7 << 18)) >= (2 << 18) and self._is_mentsu(m - (2 << 18)):
-                return True
-        return False
+        if len(pair_indices) == 7:
+            hands.append([[x] * 2 for x in pair_indices])
+
+        return hands
 
     def _to_meld(self, tiles, d):
+        # packed hand already has the same layout
+        if isinstance(tiles, PackedHand):
+            return tiles.suit_counts(d // 9)
+
         result = 0
         for i in range(0, 9):
             result |= (tiles[d + i] << i * 3)
@@ -4,6 +4,9 @@
 class BaseAI(object):
     player = None
     table = None
+    # model output for the next discard, when the prediction was made outside of the AI
+    # (for example, in one batch with the other tables)
+    prediction = None
 
     def __init__(self, table, player):
         self.player = player
@@ -11,3 +14,9 @@ class BaseAI(object):
 
     def discard_tile(self):
         pass
+
+    def discard_model_input(self):
+        """
+        :return: model input for the next discard, None if the discard doesn't need a model
+        """
+        return None
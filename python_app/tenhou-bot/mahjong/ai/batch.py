@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized shanten and agari checks for many hands at once.
+
+Hands are passed as (N, 34) integer arrays in the 34 tiles format.
+Suit keys are calculated with one dot product per suit block,
+rows are gathered from the same tables that Shanten uses,
+so the results are the same as the results of the scalar calls.
+"""
+import numpy as np
+
+from mahjong.ai.shanten import Shanten
+from mahjong.ai.tables import TABLE, SUIT_KEYS, SUIT_SIZE, HONORS_SIZE, ROW_SIZE, MAX_SETS, PAIRS_INDEX, \
+    KINDS_INDEX, TERMINALS_INDEX, TERMINAL_PAIR_INDEX
+
+# hands are processed by chunks, to not allocate too big temporary arrays
+CHUNK_SIZE = 1 << 16
+
+ROWS = np.frombuffer(TABLE, dtype=np.uint8).reshape(-1, ROW_SIZE)
+SUIT_ROWS = ROWS[:SUIT_KEYS]
+HONOR_ROWS = ROWS[SUIT_KEYS:]
+
+SUIT_POWERS = 5 ** np.arange(SUIT_SIZE, dtype=np.int64)
+HONOR_POWERS = 5 ** np.arange(HONORS_SIZE, dtype=np.int64)
+
+# key change of the every suit when we add one tile
+TILE_KEYS = np.zeros((34, 4), dtype=np.int64)
+TILE_KEYS[np.arange(34), np.arange(34) // SUIT_SIZE] = np.append(np.tile(SUIT_POWERS, 3), HONOR_POWERS)
+
+
+def calculate_shanten_batch(hands):
+    """
+    Return the count of tiles before tempai for the every hand
+    :param hands: (N, 34) array of 34 tiles format hands
+    :return: (N,) int8 array, same values as Shanten.calculate_shanten
+    """
+    hands = _prepare(hands)
+    result = np.empty(len(hands), dtype=np.int8)
+    for start in range(0, len(hands), CHUNK_SIZE):
+        end = start + CHUNK_SIZE
+        result[start:end] = _calculate_chunk(hands[start:end])
+    return result
+
+
+def is_agari_batch(hands):
+    """
+    Determine was it win or not for the every hand.
+    A hand is complete when it is one step after tempai,
+    this is the same as Agari.is_agari for hands up to 14 tiles.
+    :param hands: (N, 34) array of 34 tiles format hands
+    :return: (N,) boolean array
+    """
+    return calculate_shanten_batch(hands) == Shanten.AGARI_STATE
+
+
+def calculate_acceptance_matrix(tiles):
+    """
+    Check the all discard/draw pairs of the hand in one pass.
+    The exchange changes only one or two suit keys,
+    so the keys of the all 34x34 exchanges are built from the hand keys
+    with one broadcasted addition, without building 34x34 hands.
+    Impossible exchanges (discard of a tile that we don't have,
+    or draw of the fifth tile) have -2 shanten and never improve the hand.
+    :param tiles: 34 tiles format array of the hand before the discard
+    :return: (34, 34) boolean array improves[discard, draw] and (34, 34) int8 array of shanten after the exchange
+    """
+    tiles = np.asarray(tiles, dtype=np.int64)
+    if tiles.shape != (34,):
+        raise ValueError('Hand should be a 34 tiles array, got {0}'.format(tiles.shape))
+    _check_counts(tiles)
+
+    keys = np.append(tiles[0:27].reshape(3, SUIT_SIZE).dot(SUIT_POWERS), tiles[27:34].dot(HONOR_POWERS))
+    shanten = _calculate_by_keys(keys[None, :], tiles.sum())[0]
+
+    exchange_keys = keys + TILE_KEYS[None, :, :] - TILE_KEYS[:, None, :]
+    after_discard = tiles - np.eye(34, dtype=np.int64)
+    possible = (tiles > 0)[:, None] & (after_discard < 4)
+    exchange_keys[~possible] = keys
+
+    result = np.full((34, 34), -2, dtype=np.int8)
+    result[possible] = _calculate_by_keys(exchange_keys[possible], tiles.sum())
+    improves = possible & (result < shanten)
+    return improves, result
+
+
+def _prepare(hands):
+    hands = np.asarray(hands)
+    if hands.ndim != 2 or hands.shape[1] != 34:
+        raise ValueError('Hands should be a (N, 34) array, got {0}'.format(hands.shape))
+    _check_counts(hands)
+    return hands.astype(np.int64, copy=False)
+
+
+def _check_counts(tiles):
+    # suit keys are valid only for 0..4 tiles, other counts give a wrong shanten without any error
+    if tiles.size and (tiles.min() < 0 or tiles.max() > 4):
+        raise ValueError('Count of tiles should be from 0 to 4, got {0}..{1}'.format(tiles.min(), tiles.max()))
+
+
+def _calculate_chunk(hands):
+    count_of_tiles = hands.sum(axis=1)
+
+    suit_keys = hands[:, 0:27].reshape(-1, 3, SUIT_SIZE).dot(SUIT_POWERS)
+    honor_keys = hands[:, 27:34].dot(HONOR_POWERS)
+    keys = np.concatenate([suit_keys, honor_keys[:, None]], axis=1)
+
+    return _calculate_by_keys(keys, count_of_tiles)
+
+
+def _calculate_by_keys(keys, count_of_tiles):
+    """
+    :param keys: (N, 4) array of sou, pin, man and honors keys
+    :param count_of_tiles: (N,) array or one count for the all hands
+    :return: (N,) shanten array
+    """
+    count_of_tiles = np.broadcast_to(count_of_tiles, (len(keys),))
+
+    rows = np.empty((len(keys), 4, ROW_SIZE), dtype=np.int16)
+    rows[:, 0:3] = SUIT_ROWS[keys[:, 0:3]]
+    rows[:, 3] = HONOR_ROWS[keys[:, 3]]
+
+    features = rows.sum(axis=1)
+    completed_pairs = features[:, PAIRS_INDEX]
+    pairs = features[:, KINDS_INDEX]
+    terminals = features[:, TERMINALS_INDEX]
+    completed_terminals = features[:, TERMINAL_PAIR_INDEX]
+
+    chitoitsu = 6 - completed_pairs + np.maximum(0, 7 - pairs)
+    kokushi = 13 - terminals - (completed_terminals > 0)
+
+    distances = rows[:, :, 0:10].reshape(-1, 4, MAX_SETS + 1, 2)
+    merged = _merge(_merge(distances[:, 0], distances[:, 1]), _merge(distances[:, 2], distances[:, 3]))
+
+    count_of_sets = 4 - (14 - count_of_tiles) // 3
+    # hands with more than 14 tiles are filtered below, so sets are always valid index there
+    count_of_sets = np.clip(count_of_sets, 0, MAX_SETS)
+    standard = merged[np.arange(len(keys)), count_of_sets, 1] - 1
+
+    shanten = np.minimum(np.minimum(standard, chitoitsu), np.minimum(kokushi, 8))
+    shanten[count_of_tiles > 14] = -2
+    return shanten
+
+
+def _merge(first, second):
+    """
+    Vectorized version of tables.merge for (N, sets, pairs) distances
+    """
+    result = first[:, 0:1, 0:1] + second
+    for sets in range(0, MAX_SETS + 1):
+        for pairs in range(0, 2):
+            if not sets and not pairs:
+                continue
+
+            target = result[:, sets:, pairs:]
+            np.minimum(target, first[:, sets:sets + 1, pairs:pairs + 1] + second[:, :MAX_SETS + 1 - sets, :2 - pairs],
+                       out=target)
+    return result
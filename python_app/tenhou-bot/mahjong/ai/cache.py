@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from utils.settings_handler import settings
+
+
+def pack_tiles(tiles):
+    """
+    Pack 34 tiles format array to one int, 3 bits per tile (the same idea as Agari._to_meld).
+    Tile i is stored in the bits 3 * i .. 3 * i + 2
+    :param tiles: 34 tiles format array
+    :return: int
+    """
+    result = 0
+    for count in reversed(tiles):
+        # numpy ints would overflow after 64 bits
+        result = (result << 3) | int(count)
+    return result
+
+
+def canonical_key(tiles):
+    """
+    Shanten and hand structure are the same after we swap number suits
+    or reflect 1..9 to 9..1 inside a suit, and honor tiles are used only in pons and pairs.
+    So we take the smaller of direct and reflected counts for each suit,
+    sort suits and honor counts, and use the result as a key.
+    :param tiles: 34 tiles format array, list or numpy array
+    :return: bytes, the same for the all symmetric hands
+    """
+    # bytes of numpy array would be its raw buffer, not the counts
+    counts = bytes(list(tiles))
+    man, pin, sou = counts[0:9], counts[9:18], counts[18:27]
+    man_reflected, pin_reflected, sou_reflected = man[::-1], pin[::-1], sou[::-1]
+    suits = sorted([
+        man < man_reflected and man or man_reflected,
+        pin < pin_reflected and pin or pin_reflected,
+        sou < sou_reflected and sou or sou_reflected,
+    ])
+    return b''.join(suits) + bytes(sorted(counts[27:34]))
+
+
+def unpack_tiles(key):
+    """
+    :param key: int from pack_tiles
+    :return: 34 tiles format array
+    """
+    return [(key >> (i * 3)) & 7 for i in range(0, 34)]
+
+
+class LRUCache(object):
+    """
+    Bounded cache, the least recently used item is evicted when the cache is full.
+    Statistics are collected to be able to tune the capacity.
+    """
+    capacity = 0
+    items = None
+
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    def __init__(self, capacity):
+        """
+        :param capacity: max count of stored items, 0 disables the cache
+        """
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def get(self, key):
+        """
+        :return: cached value or None
+        """
+        value = self.items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        while len(self.items) > max(capacity, 0):
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.items.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return total and self.hits / total or 0.0
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'size': len(self.items),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def __len__(self):
+        return len(self.items)
+
+
+# one cache for the all AI instances in the process
+shanten_cache = LRUCache(settings.SHANTEN_CACHE_SIZE)
+# hand values for the all FinishedHand instances
+hand_value_cache = LRUCache(settings.HAND_VALUE_CACHE_SIZE)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed set and pair decompositions of one suit.
+
+Every suit with up to 14 tiles that can be divided to sets and one optional pair
+is stored in the binary file with the all its decompositions:
+
+    header  - magic, version and count of suits
+    keys    - sorted uint32 suit keys (tile counts packed by 3 bits, see PackedHand.suit_counts)
+    offsets - uint32 offsets of the suit decompositions in the data block, one more than keys
+    data    - decompositions, the count of sets and then the sets codes:
+              0..6 - chi from the tile, 7..15 - pon, 16..24 - pair
+
+The file is built offline (or on the first use) and memory mapped,
+so the lookup is one binary search over the keys without any search of sets.
+
+Build it from the tenhou-bot folder:
+python -m mahjong.ai.decompositions
+"""
+import itertools
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from optparse import OptionParser
+
+SUIT_SIZE = 9
+
+# sets that can be in one suit, in suit tile indices
+SUIT_SETS = [(x, x + 1, x + 2) for x in range(0, 7)] + [(x, x, x) for x in range(0, 9)]
+CHI_CODE = 0
+PON_CODE = 7
+PAIR_CODE = 16
+
+MAGIC = b'MJDC'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'decompositions.bin')
+
+
+def pack_suit(counts):
+    """
+    :param counts: list with counts of the suit tiles
+    :return: int with 3 bits per tile
+    """
+    key = 0
+    for i in range(0, SUIT_SIZE):
+        key |= counts[i] << i * 3
+    return key
+
+
+def build_decompositions():
+    """
+    Walk over the all combinations of up to four suit sets with or without a pair.
+    Decompositions of the one suit are sorted in the reverse order,
+    so chi sets go before pon sets with the same first tile
+    :return: dict with suit key -> tuple of decompositions,
+    every decomposition is a sorted tuple of sets in suit indices
+    """
+    decompositions = {}
+    for count_of_sets in range(0, 5):
+        for sets in itertools.combinations_with_replacement(SUIT_SETS, count_of_sets):
+            counts = [0] * SUIT_SIZE
+            for item in sets:
+                for tile in item:
+                    counts[tile] += 1
+
+            for pair in [None] + list(range(0, SUIT_SIZE)):
+                if pair is not None:
+                    counts[pair] += 2
+
+                if max(counts) <= 4:
+                    decomposition = list(sets)
+                    if pair is not None:
+                        decomposition.append((pair, pair))
+                    decompositions.setdefault(pack_suit(counts), set()).add(tuple(sorted(decomposition)))
+
+                if pair is not None:
+                    counts[pair] -= 2
+
+    return dict([(key, tuple(sorted(items, reverse=True))) for key, items in decompositions.items()])
+
+
+def encode_set(item):
+    if len(item) == 2:
+        return PAIR_CODE + item[0]
+    if item[0] == item[1]:
+        return PON_CODE + item[0]
+    return CHI_CODE + item[0]
+
+
+def decode_set(code):
+    if code >= PAIR_CODE:
+        tile = code - PAIR_CODE
+        return tile, tile
+    if code >= PON_CODE:
+        tile = code - PON_CODE
+        return tile, tile, tile
+    return code, code + 1, code + 2
+
+
+def build_table(path=TABLE_PATH):
+    """
+    Calculate decompositions of the all suits and store them to the disk
+    :return: count of stored suits
+    """
+    decompositions = build_decompositions()
+    keys = sorted(decompositions.keys())
+
+    offsets = [0]
+    data = bytearray()
+    for key in keys:
+        for decomposition in decompositions[key]:
+            data.append(len(decomposition))
+            data.extend([encode_set(x) for x in decomposition])
+        offsets.append(len(data))
+
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # write to the temp file first, to not leave broken table
+    # if other process will try to load it in the same time
+    temp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+        f.write(struct.pack('<{0}I'.format(len(keys)), *keys))
+        f.write(struct.pack('<{0}I'.format(len(offsets)), *offsets))
+        f.write(data)
+    os.replace(temp_path, path)
+
+    return len(keys)
+
+
+class DecompositionTable(object):
+    """
+    Memory mapped decompositions file.
+    Decoded suits are kept in memory, there are not a lot of them in the real games
+    """
+    data = None
+    keys = None
+    offsets = None
+    data_offset = 0
+    decoded = None
+
+    def __init__(self, path=TABLE_PATH):
+        if not os.path.exists(path):
+            build_table(path)
+
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{0} is not a decompositions table of version {1}'.format(path, VERSION))
+
+        keys_offset = HEADER.size
+        offsets_offset = keys_offset + count * 4
+        self.data_offset = offsets_offset + (count + 1) * 4
+
+        # the file is written in the little endian order
+        view = memoryview(self.data)
+        self.keys = view[keys_offset:offsets_offset].cast('I')
+        self.offsets = view[offsets_offset:self.data_offset].cast('I')
+        self.decoded = {}
+
+    def get(self, key):
+        """
+        :param key: suit tile counts packed by 3 bits per tile
+        :return: tuple of decompositions, it is empty when the suit can't be divided
+        """
+        result = self.decoded.get(key)
+        if result is not None:
+            return result
+
+        result = ()
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            result = self._decode(self.data_offset + self.offsets[index], self.data_offset + self.offsets[index + 1])
+
+        self.decoded[key] = result
+        return result
+
+    def _decode(self, start, end):
+        decompositions = []
+        position = start
+        while position < end:
+            count_of_sets = self.data[position]
+            codes = self.data[position + 1:position + 1 + count_of_sets]
+            decompositions.append(tuple([decode_set(x) for x in codes]))
+            position += 1 + count_of_sets
+        return tuple(decompositions)
+
+
+_table = None
+
+
+def decomposition_table():
+    """
+    Table is loaded on the first call
+    """
+    global _table
+    if _table is None:
+        _table = DecompositionTable()
+    return _table
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-o', '--output', type='string', default=TABLE_PATH, help='Path to the table file')
+
+    opts, _ = parser.parse_args()
+
+    count = build_table(opts.output)
+    print('{0:,d} suits are stored to {1} ({2:,d} bytes)'.format(count, opts.output, os.path.getsize(opts.output)))
+
+
+if __name__ == '__main__':
+    main()
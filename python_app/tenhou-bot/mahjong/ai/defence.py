@@ -1,11 +1,16 @@
+from mahjong.ai.monte_carlo import MonteCarloEstimator
 from mahjong.tile import TilesConverter
+from utils.settings_handler import settings
 
 
 class Defence(object):
     table = None
+    estimator = None
 
     def __init__(self, table):
         self.table = table
+        self.estimator = MonteCarloEstimator(samples=settings.MONTE_CARLO_SAMPLES,
+                                             time_budget=settings.MONTE_CARLO_TIME_BUDGET)
 
     def go_to_defence_mode(self):
         """
@@ -26,26 +31,53 @@ class Defence(object):
             if player.in_riichi:
                 result = True
 
+        # let's push with a good hand
+        if result:
+            chances = self.estimate_win_chances(estimator=self._decision_estimator())
+            if chances['win'] >= settings.PUSH_WIN_PROBABILITY:
+                result = False
+
         return result
 
+    def estimate_win_chances(self, draws=None, estimator=None):
+        """
+        :param draws: count of main player draws, by default it is the all his draws until the end of the round
+        :param estimator: MonteCarloEstimator, by default it is the estimator with the time budget
+        :return: dict with probabilities, see MonteCarloEstimator.estimate
+        """
+        main_player = self.table.get_main_player()
+        tiles = main_player.hand_analyzer.tiles
+        # hand wasn't dealt yet
+        if sum(tiles) % 3 == 0:
+            return {'tempai': 0, 'tempai_interval': (0, 0), 'win': 0, 'win_interval': (0, 0), 'samples': 0}
+
+        visible_tiles = self.table.visible_tiles(main_player.seat)
+        remaining_tiles = [max(0, 4 - tiles[x] - visible_tiles[x]) for x in range(0, 34)]
+        if draws is None:
+            draws = self.table.count_of_remaining_tiles // self.table.count_of_players
+        return (estimator or self.estimator).estimate(tiles, remaining_tiles, draws)
+
+    def _decision_estimator(self):
+        # new random generator for the every decision, it doesn't depend on the previous estimations
+        return MonteCarloEstimator(samples=settings.DEFENCE_MONTE_CARLO_SAMPLES,
+                                   time_budget=None,
+                                   seed=settings.DEFENCE_MONTE_CARLO_SEED)
+
     def calculate_safe_tile_against_riichi(self):
-        player_tiles = self.table.get_main_player().tiles
+        main_player = self.table.get_main_player()
+        player_tiles = main_player.tiles
         # tiles that were discarded after riichi or
         # discarded by player in riichi
         # for better experience we need to detect the safe tiles for different players
-        safe_tiles = []
-        for player in self.table.players:
-            safe_tiles += player.safe_tiles
-            if player.in_riichi:
-                safe_tiles += player.discards
+        riichi_seats = [x.seat for x in self.table.players if x.in_riichi]
+        safe_mask = self.table.index.safe_mask(riichi_seats)
 
-        player_tiles_34 = TilesConverter.to_34_array(player_tiles)
-        safe_tiles_34 = TilesConverter.to_34_array(safe_tiles)
+        player_tiles_34 = main_player.packed_hand
 
         safe_tile = None
         # let's try to find a safe tile in our main player hand
-        for i in range(0, len(safe_tiles_34)):
-            if safe_tiles_34[i] > 0 and player_tiles_34[i] > 0:
+        for i in range(0, 34):
+            if (safe_mask >> i) & 1 and player_tiles_34[i] > 0:
                 return TilesConverter.find_34_tile_in_136_array(i, player_tiles)
 
         return safe_tile
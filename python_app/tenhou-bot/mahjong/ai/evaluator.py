@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Stateless entry points for the hand evaluation.
+They never change passed arrays and don't keep anything between calls,
+so they can be used from different threads and processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from mahjong.ai.agari import Agari
+from mahjong.ai.hand_analyzer import HandAnalyzer
+from mahjong.ai.shanten import Shanten
+
+# calculators without cache don't have any state
+_shanten = Shanten()
+_agari = Agari()
+
+
+def calculate_shanten(tiles):
+    """
+    :param tiles: 34 tiles format array
+    :return: int
+    """
+    return _shanten.calculate_shanten(tiles)
+
+
+def is_agari(tiles):
+    """
+    :param tiles: 34 tiles format array
+    :return: boolean
+    """
+    return _agari.is_agari(tiles)
+
+
+def calculate_outs(tiles):
+    """
+    :param tiles: 34 tiles format array of the hand before the discard
+    :return: list of discard candidates and shanten, the same as MainAI.calculate_outs
+    """
+    return HandAnalyzer(tiles).outs()
+
+
+def _evaluate_chunk(positions):
+    return [calculate_outs(tiles) for tiles in positions]
+
+
+class ParallelEvaluator(object):
+    """
+    Calculate outs for many independent positions in the process pool.
+    Positions are sent to workers by chunks, to not pay the transfer cost for each hand.
+    """
+    executor = None
+    chunk_size = 0
+
+    def __init__(self, workers=None, chunk_size=256):
+        """
+        :param workers: count of processes, by default it is the count of CPUs
+        :param chunk_size: count of positions in one task
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.chunk_size = chunk_size
+
+    def evaluate(self, positions):
+        """
+        :param positions: list of 34 tiles format arrays
+        :return: list of (outs, shanten) in the same order as positions
+        """
+        positions = [list(x) for x in positions]
+        futures = []
+        for start in range(0, len(positions), self.chunk_size):
+            futures.append(self.executor.submit(_evaluate_chunk, positions[start:start + self.chunk_size]))
+
+        results = []
+        for future in futures:
+            results += future.result()
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
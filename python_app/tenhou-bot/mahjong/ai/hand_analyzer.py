@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from mahjong.ai.batch import calculate_shanten_batch, calculate_acceptance_matrix
+from mahjong.ai.shanten import Shanten
+from mahjong.ai.tables import suit_row, honor_row, merge, distance_terms, terms_distance, PAIRS_INDEX, \
+    KINDS_INDEX, TERMINALS_INDEX, TERMINAL_PAIR_INDEX
+
+# sou, pin, man and honors
+SUITS = 4
+HONORS_SUIT = 3
+
+# value that we need to add to the suit key, when we add a tile to the suit
+TILE_WEIGHTS = [5 ** (x % 9) for x in range(0, 27)] + [5 ** x for x in range(0, 7)]
+
+
+def tile_suit(tile34):
+    return tile34 // 9
+
+
+def tile_weight(tile34):
+    return TILE_WEIGHTS[tile34]
+
+
+def suit_tiles(suit):
+    """
+    :param suit: 0..3
+    :return: 34 tile indices of the suit
+    """
+    if suit == HONORS_SUIT:
+        return range(27, 34)
+    return range(suit * 9, suit * 9 + 9)
+
+
+def load_row(suit, key):
+    if suit == HONORS_SUIT:
+        return honor_row(key)
+    return suit_row(key)
+
+
+def row_features(row):
+    return row[PAIRS_INDEX], row[KINDS_INDEX], row[TERMINALS_INDEX], row[TERMINAL_PAIR_INDEX]
+
+
+class HandAnalyzer(object):
+    """
+    Keep suit rows of the player's hand.
+    Draw and discard reload only the row of the changed suit,
+    and outs calculation shares the suit work between all discard/draw pairs.
+    """
+    tiles = None
+    keys = None
+    rows = None
+    count_of_tiles = 0
+
+    def __init__(self, tiles=None):
+        """
+        :param tiles: 34 tiles format array
+        """
+        self.shanten_calculator = Shanten()
+        self.init_hand(tiles or [0] * 34)
+
+    def init_hand(self, tiles):
+        """
+        :param tiles: 34 tiles format array
+        """
+        self.tiles = list(tiles)
+        self.count_of_tiles = sum(self.tiles)
+        self.keys = [0] * SUITS
+        for tile in range(0, 34):
+            self.keys[tile_suit(tile)] += self.tiles[tile] * tile_weight(tile)
+        self.rows = [load_row(suit, self.keys[suit]) for suit in range(0, SUITS)]
+
+    def draw(self, tile34):
+        self._update(tile34, 1)
+
+    def discard(self, tile34):
+        self._update(tile34, -1)
+
+    def shanten(self):
+        if self.count_of_tiles > 14:
+            return -2
+        return self.shanten_calculator.calculate_shanten_by_rows(self.rows, self.count_of_tiles)
+
+    def waiting_mask(self):
+        """
+        Tiles that complete the hand, it makes sense only for 13 (10, 7, 4, 1) tiles hands
+        :return: int with 34 bits, the bit of the 34 tile index is set when the tile completes the hand
+        """
+        if self.count_of_tiles % 3 != 1 or self.shanten() != 0:
+            return 0
+
+        mask = 0
+        for tile in range(0, 34):
+            if self.tiles[tile] >= 4:
+                continue
+
+            self.draw(tile)
+            if self.shanten() == Shanten.AGARI_STATE:
+                mask |= 1 << tile
+            self.discard(tile)
+        return mask
+
+    def outs(self, depth=1, visible_tiles=None):
+        """
+        Find discards that will decrease the shanten after the next draw
+        :param depth: with depth=2 we also check how good is the hand after the next useful draw
+        :param visible_tiles: 34 tiles format array of tiles that we see outside of our hand,
+        they are used to weight the second step
+        :return: list of discard candidates with waiting tiles and their count, and the current shanten
+        """
+        shanten = self.shanten()
+        # win
+        if shanten == Shanten.AGARI_STATE:
+            return [], shanten
+
+        results = []
+        for tile in range(0, 34):
+            if not self.tiles[tile]:
+                continue
+
+            waiting = self.improving_draws(tile, shanten)
+            if not waiting:
+                continue
+
+            self.tiles[tile] -= 1
+            tiles_count = sum([4 - self.tiles[x] for x in waiting])
+            self.tiles[tile] += 1
+
+            if tiles_count:
+                results.append({
+                    'discard': tile,
+                    'waiting': waiting,
+                    'tiles_count': tiles_count
+                })
+
+        # in tempai the next useful draw is a win, so the second step is the same as the first
+        if depth == 2 and shanten > 0:
+            self._add_second_step(results, shanten, visible_tiles or [0] * 34)
+            results = sorted(results, key=lambda x: (x['second_step_count'], x['tiles_count'], x['discard']),
+                             reverse=True)
+        else:
+            # if we have character and honor candidates to discard with same tiles count,
+            # we need to discard honor tile first
+            results = sorted(results, key=lambda x: (x['tiles_count'], x['discard']), reverse=True)
+
+        return results, shanten
+
+    def acceptance_matrix(self):
+        """
+        :return: improves[discard, draw] boolean matrix and shanten after the every exchange,
+        see batch.calculate_acceptance_matrix
+        """
+        return calculate_acceptance_matrix(self.tiles)
+
+    def improving_draws(self, discard, shanten):
+        """
+        :param discard: 34 tile index that we discard from the hand
+        :param shanten: current shanten of the hand
+        :return: list of 34 tile indices that will decrease the shanten after the discard
+        """
+        return [tile for tile, value in self.shanten_after_exchange(discard) if value == shanten - 1]
+
+    def shanten_after_exchange(self, discard):
+        """
+        Calculate shanten for the all draws after the discard.
+        Only the rows of the discard and draw suits are loaded,
+        other suits are merged once per call.
+        :param discard: 34 tile index that we discard from the hand
+        :return: list of (draw tile, shanten) tuples
+        """
+        count_of_sets = self.shanten_calculator.count_of_sets(self.count_of_tiles)
+        discard_suit = tile_suit(discard)
+        discard_key = self.keys[discard_suit] - tile_weight(discard)
+        discard_row = load_row(discard_suit, discard_key)
+
+        completed_pairs, pairs, terminals, completed_terminals = self._replace_features(
+            self._features(), self.rows[discard_suit], discard_row
+        )
+
+        results = []
+        for draw_suit in range(0, SUITS):
+            other_suits = [x for x in range(0, SUITS) if x != discard_suit and x != draw_suit]
+            other_rows = self.rows[other_suits[0]]
+            for suit in other_suits[1:]:
+                other_rows = merge(other_rows, self.rows[suit])
+
+            if draw_suit == discard_suit:
+                fixed_rows = other_rows
+                old_row = discard_row
+                draw_key = discard_key
+            else:
+                fixed_rows = merge(other_rows, discard_row)
+                old_row = self.rows[draw_suit]
+                draw_key = self.keys[draw_suit]
+
+            terms = distance_terms(fixed_rows, count_of_sets)
+            # one draw can't improve the regular hand shanten by more than one
+            min_regular_shanten = terms_distance(terms, old_row) - 2
+
+            # chitoitsu and kokushi counters without the draw suit
+            suit_pairs = completed_pairs - old_row[PAIRS_INDEX]
+            suit_kinds = pairs - old_row[KINDS_INDEX]
+            suit_terminals = terminals - old_row[TERMINALS_INDEX]
+            suit_completed_terminals = completed_terminals - old_row[TERMINAL_PAIR_INDEX]
+
+            for tile in suit_tiles(draw_suit):
+                count = self.tiles[tile] - (tile == discard and 1 or 0)
+                if tile == discard or count >= 4:
+                    continue
+
+                new_row = load_row(draw_suit, draw_key + tile_weight(tile))
+
+                shanten = self.shanten_calculator.chitoitsu_and_kokushi(
+                    suit_pairs + new_row[PAIRS_INDEX],
+                    suit_kinds + new_row[KINDS_INDEX],
+                    suit_terminals + new_row[TERMINALS_INDEX],
+                    suit_completed_terminals + new_row[TERMINAL_PAIR_INDEX]
+                )
+                if shanten > min_regular_shanten:
+                    ret_shanten = terms_distance(terms, new_row) - 1
+                    if ret_shanten < shanten:
+                        shanten = ret_shanten
+
+                results.append((tile, shanten))
+
+        return results
+
+    def _add_second_step(self, results, shanten, visible_tiles):
+        """
+        For each discard candidate calculate the sum over useful draws of
+        remaining copies of the draw * remaining copies of the useful tiles after the best second discard.
+        All 13 tiles hands after the second discard are collected first,
+        hands shared between different first discards are calculated only once,
+        and their shanten is calculated with one batch call.
+        """
+        for item in results:
+            item['second_step_count'] = 0
+
+        remaining = np.maximum(0, 4 - np.array(self.tiles) - np.array(visible_tiles))
+        exchanges = [(item['discard'], draw) for item in results for draw in item['waiting'] if remaining[draw]]
+        if not exchanges:
+            return
+
+        identity = np.eye(34, dtype=np.int64)
+        discards, draws = np.array(exchanges).T
+        # 14 tiles hands after the first discard and useful draw
+        drawn_hands = np.array(self.tiles) - identity[discards] + identity[draws]
+
+        # 13 tiles hands after the second discard
+        in_hand = drawn_hands > 0
+        exchange_indices = np.nonzero(in_hand)[0]
+        second_hands = (drawn_hands[:, None, :] - identity[None, :, :])[in_hand]
+        unique_hands, hand_indices = np.unique(second_hands, axis=0, return_inverse=True)
+        hand_indices = hand_indices.reshape(-1)
+
+        # only the hands that keep the shanten can be improved by the next draw
+        keep_shanten = calculate_shanten_batch(unique_hands) == shanten - 1
+        kept_hands = unique_hands[keep_shanten]
+        next_hands = np.minimum(kept_hands[:, None, :] + identity[None, :, :], 4).reshape(-1, 34)
+        improves = np.zeros(unique_hands.shape, dtype=bool)
+        improves[keep_shanten] = (calculate_shanten_batch(next_hands).reshape(-1, 34) == shanten - 2) & (kept_hands < 4)
+
+        # the first draw is not in the wall anymore
+        second_improves = improves[hand_indices]
+        first_draws = draws[exchange_indices]
+        counts = second_improves.dot(remaining) - second_improves[np.arange(len(first_draws)), first_draws]
+
+        best_counts = np.zeros(len(exchanges), dtype=np.int64)
+        np.maximum.at(best_counts, exchange_indices, counts)
+
+        second_step_counts = {}
+        for (discard, draw), best_count in zip(exchanges, best_counts.tolist()):
+            second_step_counts[discard] = second_step_counts.get(discard, 0) + int(remaining[draw]) * best_count
+
+        for item in results:
+            item['second_step_count'] = second_step_counts.get(item['discard'], 0)
+
+    def _update(self, tile34, count):
+        suit = tile_suit(tile34)
+        self.tiles[tile34] += count
+        self.count_of_tiles += count
+        self.keys[suit] += count * tile_weight(tile34)
+        self.rows[suit] = load_row(suit, self.keys[suit])
+
+    def _features(self):
+        features = [0, 0, 0, 0]
+        for row in self.rows:
+            for i, value in enumerate(row_features(row)):
+                features[i] += value
+        return features
+
+    def _replace_features(self, features, old_row, new_row):
+        old_features = row_features(old_row)
+        new_features = row_features(new_row)
+        return [features[i] - old_features[i] + new_features[i] for i in range(0, 4)]
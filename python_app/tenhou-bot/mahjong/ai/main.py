@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from mahjong.ai.agari import Agari
 from mahjong.ai.base import BaseAI
+from mahjong.ai.cache import shanten_cache
 from mahjong.ai.defence import Defence
 from mahjong.ai.shanten import Shanten
 from mahjong.tile import TilesConverter
@@ -17,7 +18,7 @@ class MainAI(BaseAI):
         super(MainAI, self).__init__(table, player)
 
         self.agari = Agari()
-        self.shanten = Shanten()
+        self.shanten = Shanten(shanten_cache)
         self.defence = Defence(table)
 
     def discard_tile(self):
@@ -46,61 +47,25 @@ class MainAI(BaseAI):
 
         return tile_in_hand
 
-    def calculate_outs(self):
-        tiles = TilesConverter.to_34_array(self.player.tiles)
-
-        shanten = self.shanten.calculate_shanten(tiles)
-        # win
-        if shanten == Shanten.AGARI_STATE:
-            return [], shanten
-
-        raw_data = {}
-        for i in range(0, 34):
-            if not tiles[i]:
-                continue
-
-            tiles[i] -= 1
-
-            raw_data[i] = []
-            for j in range(0, 34):
-                if i == j or tiles[j] >= 4:
-                    continue
-
-                tiles[j] += 1
-                if self.shanten.calculate_shanten(tiles) == shanten - 1:
-                    raw_data[i].append(j)
-                tiles[j] -= 1
-
-            tiles[i] += 1
-
-            if raw_data[i]:
-                raw_data[i] = {'tile': i, 'tiles_count': self.count_tiles(raw_data[i], tiles), 'waiting': raw_data[i]}
-
-        results = []
-        tiles = TilesConverter.to_34_array(self.player.tiles)
-        for tile in range(0, len(tiles)):
-            if tile in raw_data and raw_data[tile] and raw_data[tile]['tiles_count']:
-                item = raw_data[tile]
-
-                waiting = []
-
-                for item2 in item['waiting']:
-                    waiting.append(item2)
-
-                results.append({
-                    'discard': item['tile'],
-                    'waiting': waiting,
-                    'tiles_count': item['tiles_count']
-                })
-
-        # if we have character and honor candidates to discard with same tiles count,
-        # we need to discard honor tile first
-        results = sorted(results, key=lambda x: (x['tiles_count'], x['discard']), reverse=True)
-
-        return results, shanten
-
-    def count_tiles(self, raw_data, tiles):
-        n = 0
-        for i in range(0, len(raw_data)):
-            n += 4 - tiles[raw_data[i]]
-        return n
+    def calculate_outs(self, depth=1):
+        """
+        :param depth: 1 - rank discards by count of useful tiles,
+        2 - rank them by useful tiles after the next useful draw too
+        """
+        if depth == 1:
+            return self.player.hand_analyzer.outs()
+        return self.player.hand_analyzer.outs(depth, self.visible_tiles())
+
+    def visible_tiles(self):
+        """
+        :return: 34 tiles format array of tiles that we see outside of our hand
+        """
+        return self.table.visible_tiles(self.player.seat)
+
+    def estimate_win_chances(self, draws=None):
+        """
+        Monte Carlo estimation of our chances to get tempai or to win by tsumo
+        :param draws: count of our next draws, by default it is the all our draws until the end of the round
+        :return: dict with probabilities, see MonteCarloEstimator.estimate
+        """
+        return self.defence.estimate_win_chances(draws)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo estimation of the chances to get tempai or to win by tsumo in the next draws.
+
+The wall is built from the tiles that we don't see, and the every sample is a random
+sequence of our next draws from it. The all samples of one batch are played at once:
+on each draw step the hands are stored as (N, 34) array and checked with one batch shanten call.
+The player keeps the drawn tile only when it decreases the shanten,
+and then discards the first tile that keeps the new shanten.
+"""
+import math
+import time
+
+import numpy as np
+
+from mahjong.ai.batch import calculate_shanten_batch
+from mahjong.ai.shanten import Shanten
+
+# 95% confidence interval
+Z_SCORE = 1.96
+
+# shanten for discards of tiles that we don't have
+NO_DISCARD = 99
+
+
+def confidence_interval(successes, samples, z=Z_SCORE):
+    """
+    Wilson score interval, it works well for probabilities close to 0 and 1
+    :param successes: count of successful samples
+    :param samples: count of all samples
+    :return: (low, high) tuple
+    """
+    if not samples:
+        return 0.0, 1.0
+
+    probability = successes / samples
+    denominator = 1 + z * z / samples
+    center = (probability + z * z / (2 * samples)) / denominator
+    margin = z * math.sqrt(probability * (1 - probability) / samples + z * z / (4 * samples * samples)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class MonteCarloEstimator(object):
+    """
+    Estimate the probability to get tempai or to win in the next draws
+    """
+    samples = 0
+    time_budget = 0
+    batch_size = 0
+    random = None
+
+    def __init__(self, samples=2000, time_budget=0.05, batch_size=500, seed=None):
+        """
+        :param samples: maximum count of simulated draw sequences
+        :param time_budget: seconds, we stop after the first batch that is out of the budget,
+        None to simulate the all samples
+        :param batch_size: count of sequences that are simulated together
+        :param seed: seed for the random generator, to get the same results in tests
+        """
+        self.samples = samples
+        self.time_budget = time_budget
+        self.batch_size = batch_size
+        self.random = np.random.RandomState(seed)
+
+    def estimate(self, tiles, remaining_tiles, draws):
+        """
+        :param tiles: 34 tiles format array of the closed hand, before or after the discard
+        :param remaining_tiles: 34 tiles format array of tiles that can be in the wall
+        :param draws: count of our next draws
+        :return: dict with tempai and win probabilities, their confidence intervals and count of samples
+        """
+        start = time.perf_counter()
+
+        tiles = np.asarray(tiles, dtype=np.int64)
+        if tiles.sum() % 3 == 0:
+            raise ValueError('Hand should have 13 or 14 tiles (minus melds), got {0}'.format(tiles.sum()))
+
+        wall = np.repeat(np.arange(34), np.maximum(0, np.asarray(remaining_tiles, dtype=np.int64)))
+        draws = min(draws, len(wall))
+
+        # we have to discard before the first draw
+        if tiles.sum() % 3 == 2:
+            shanten = calculate_shanten_batch(tiles[None])[0]
+            if shanten == Shanten.AGARI_STATE:
+                return self._result(1, 1, 1)
+            tiles = self._best_discards(tiles[None])[0]
+
+        tempai_count = 0
+        win_count = 0
+        samples = 0
+        while samples < self.samples:
+            batch_size = min(self.batch_size, self.samples - samples)
+            tempai, win = self._simulate(tiles, wall, draws, batch_size)
+            tempai_count += int(tempai.sum())
+            win_count += int(win.sum())
+            samples += batch_size
+
+            if self.time_budget is not None and time.perf_counter() - start > self.time_budget:
+                break
+
+        return self._result(tempai_count, win_count, samples)
+
+    def _simulate(self, tiles, wall, draws, count):
+        """
+        :return: two (count,) boolean arrays, did we get tempai and did we win in the every sample
+        """
+        hands = np.repeat(tiles[None], count, axis=0)
+        shanten = np.repeat(calculate_shanten_batch(tiles[None]), count).astype(np.int64)
+        tempai = shanten == 0
+        win = np.zeros(count, dtype=bool)
+        if not draws:
+            return tempai, win
+
+        # the first draws of the random permutation of the wall
+        order = np.argsort(self.random.random_sample((count, len(wall))), axis=1)[:, :draws]
+        sequences = wall[order]
+
+        for step in range(0, draws):
+            active = np.nonzero(~win)[0]
+            if not len(active):
+                break
+
+            drawn = sequences[active, step]
+            hands[active, drawn] += 1
+            new_shanten = calculate_shanten_batch(hands[active]).astype(np.int64)
+
+            win[active] = new_shanten == Shanten.AGARI_STATE
+            improved = (new_shanten < shanten[active]) & ~win[active]
+
+            # tsumogiri
+            kept = ~improved & ~win[active]
+            hands[active[kept], drawn[kept]] -= 1
+
+            improved_hands = active[improved]
+            if len(improved_hands):
+                hands[improved_hands] = self._best_discards(hands[improved_hands])
+                shanten[improved_hands] = new_shanten[improved]
+
+            tempai |= (shanten == 0) | win
+
+        return tempai, win
+
+    def _best_discards(self, hands):
+        """
+        :param hands: (N, 34) array of hands after the draw
+        :return: (N, 34) array of hands after the first discard with the lowest shanten
+        """
+        candidates = hands[:, None, :] - np.eye(34, dtype=np.int64)[None, :, :]
+        shanten = calculate_shanten_batch(np.maximum(candidates, 0).reshape(-1, 34)).reshape(-1, 34).astype(np.int64)
+        shanten[hands == 0] = NO_DISCARD
+        discards = np.argmin(shanten, axis=1)
+        return candidates[np.arange(len(hands)), discards]
+
+    def _result(self, tempai_count, win_count, samples):
+        return {
+            'tempai': tempai_count / samples,
+            'tempai_interval': confidence_interval(tempai_count, samples),
+            'win': win_count / samples,
+            'win_interval': confidence_interval(win_count, samples),
+            'samples': samples,
+        }
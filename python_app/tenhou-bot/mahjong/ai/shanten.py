@@ -1,273 +1,71 @@
 # -*- coding: utf-8 -*-
-import math
+from mahjong.ai.cache import canonical_key
+from mahjong.ai.tables import hand_rows, packed_hand_rows, merge, distance, PAIRS_INDEX, KINDS_INDEX, TERMINALS_INDEX, \
+    TERMINAL_PAIR_INDEX
+from mahjong.packed_hand import PackedHand
 
 
 class Shanten(object):
     AGARI_STATE = -1
 
-    tiles = []
-    number_melds = 0
-    number_tatsu = 0
-    number_pairs = 0
-    number_jidahai = 0
-    number_characters = 0
-    number_isolated_tiles = 0
-    min_shanten = 0
+    cache = None
+    cache_key = None
+
+    def __init__(self, cache=None, cache_key=canonical_key):
+        """
+        :param cache: LRUCache shared between calculators, results are not cached without it
+        :param cache_key: function to build the cache key from 34 tiles format array
+        """
+        self.cache = cache
+        self.cache_key = cache_key
 
     def calculate_shanten(self, tiles):
         """
         Return the count of tiles before tempai
-        :param tiles: 34 tiles format array
+        :param tiles: 34 tiles format array or PackedHand
         :return: int
         """
-        self._init(tiles)
-
-        count_of_tiles = sum(self.tiles)
-
-        if count_of_tiles > 14:
-            return -2
-
-        self.min_shanten = self._scan_chitoitsu_and_kokushi()
-        self._remove_character_tiles(count_of_tiles)
-
-        init_mentsu = math.floor((14 - count_of_tiles) / 3)
-        self._scan(init_mentsu)
-
-        return self.min_shanten
-
-    def _init(self, tiles):
-        self.tiles = tiles
-        self.number_melds = 0
-        self.number_tatsu = 0
-        self.number_pairs = 0
-        self.number_jidahai = 0
-        self.number_characters = 0
-        self.number_isolated_tiles = 0
-        self.min_shanten = 8
-
-    def _scan(self, init_mentsu):
-        self.number_characters = 0
-        for i in range(0, 27):
-            self.number_characters |= (self.tiles[i] == 4) << i
-        self.number_melds += init_mentsu
-        self._run(0)
-
-    def _run(self, depth):
-        if self.min_shanten == Shanten.AGARI_STATE:
-            return
-
-        while not self.tiles[depth]:
-            depth += 1
-
-            if depth >= 27:
-                break
-
-        if depth >= 27:
-            return self._update_result()
-
-        i = depth
-        if i > 8:
-            i -= 9
-        if i > 8:
-            i -= 9
-
-        if self.tiles[depth] == 4:
-            self._increase_set(depth)
-            if i < 7 and self.tiles[depth + 2]:
-                if self.tiles[depth + 1]:
-                    self._increase_syuntsu(depth)
-                    self._run(depth + 1)
-                    self._decrease_syuntsu(depth)
-                self._increase_tatsu_second(depth)
-                self._run(depth + 1)
-                self._decrease_tatsu_second(depth)
-
-            if i < 8 and self.tiles[depth + 1]:
-                self._increase_tatsu_first(depth)
-                self._run(depth + 1)
-                self._decrease_tatsu_first(depth)
-
-            self._increase_isolated_tile(depth)
-            self._run(depth + 1)
-            self._decrease_isolated_tile(depth)
-            self._decrease_set(depth)
-            self._increase_pair(depth)
-
-            if i < 7 and self.tiles[depth + 2]:
-                if self.tiles[depth + 1]:
-                    self._increase_syuntsu(depth)
-                    self._run(depth)
-                    self._decrease_syuntsu(depth)
-                self._increase_tatsu_second(depth)
-                self._run(depth + 1)
-                self._decrease_tatsu_second(depth)
-
-            if i < 8 and self.tiles[depth + 1]:
-                self._increase_tatsu_first(depth)
-                self._run(depth + 1)
-                self._decrease_tatsu_first(depth)
-
-            self._decrease_pair(depth)
-
-        if self.tiles[depth] == 3:
-            self._increase_set(depth)
-            self._run(depth + 1)
-            self._decrease_set(depth)
-            self._increase_pair(depth)
-
-            if i < 7 and self.tiles[depth + 1] and self.tiles[depth + 2]:
-                self._increase_syuntsu(depth)
-                self._run(depth + 1)
-                self._decrease_syuntsu(depth)
-            else:
-                if i < 7 and self.tiles[depth + 2]:
-                    self._increase_tatsu_second(depth)
-                    self._run(depth + 1)
-                    self._decrease_tatsu_second(depth)
-
-                if i < 8 and self.tiles[depth + 1]:
-                    self._increase_tatsu_first(depth)
-                    self._run(depth + 1)
-                    self._decrease_tatsu_first(depth)
-
-            self._decrease_pair(depth)
-
-            if i < 7 and self.tiles[depth + 2] >= 2 and self.tiles[depth + 1] >= 2:
-                self._increase_syuntsu(depth)
-                self._increase_syuntsu(depth)
-                self._run(depth)
-                self._decrease_syuntsu(depth)
-                self._decrease_syuntsu(depth)
-
-        if self.tiles[depth] == 2:
-            self._increase_pair(depth)
-            self._run(depth + 1)
-            self._decrease_pair(depth)
-            if i < 7 and self.tiles[depth + 2] and self.tiles[depth + 1]:
-                self._increase_syuntsu(depth)
-                self._run(depth)
-                self._decrease_syuntsu(depth)
-
-        if self.tiles[depth] == 1:
-            if i < 6 and self.tiles[depth + 1] == 1 and self.tiles[depth + 2] and self.tiles[depth + 3] != 4:
-                self._increase_syuntsu(depth)
-                self._run(depth + 2)
-                self._decrease_syuntsu(depth)
-            else:
-                self._increase_isolated_tile(depth)
-                self._run(depth + 1)
-                self._decrease_isolated_tile(depth)
-
-                if i < 7 and self.tiles[depth + 2]:
-                    if self.tiles[depth + 1]:
-                        self._increase_syuntsu(depth)
-                        self._run(depth + 1)
-                        self._decrease_syuntsu(depth)
-                    self._increase_tatsu_second(depth)
-                    self._run(depth + 1)
-                    self._decrease_tatsu_second(depth)
-
-                if i < 8 and self.tiles[depth + 1]:
-                    self._increase_tatsu_first(depth)
-                    self._run(depth + 1)
-                    self._decrease_tatsu_first(depth)
-
-    def _update_result(self):
-        ret_shanten = 8 - self.number_melds * 2 - self.number_tatsu - self.number_pairs
-        n_mentsu_kouho = self.number_melds + self.number_tatsu
-        if self.number_pairs:
-            n_mentsu_kouho += self.number_pairs - 1
-        elif self.number_characters and self.number_isolated_tiles:
-            if (self.number_characters | self.number_isolated_tiles) == self.number_characters:
-                ret_shanten += 1
-
-        if n_mentsu_kouho > 4:
-            ret_shanten += n_mentsu_kouho - 4
-
-        if ret_shanten != Shanten.AGARI_STATE and ret_shanten < self.number_jidahai:
-            ret_shanten = self.number_jidahai
-
-        if ret_shanten < self.min_shanten:
-            self.min_shanten = ret_shanten
-
-    def _increase_set(self, k):
-        self.tiles[k] -= 3
-        self.number_melds += 1
-
-    def _decrease_set(self, k):
-        self.tiles[k] += 3
-        self.number_melds -= 1
-
-    def _increase_pair(self, k):
-        self.tiles[k] -= 2
-        self.number_pairs += 1
-
-    def _decrease_pair(self, k):
-        self.tiles[k] += 2
-        self.number_pairs -= 1
-
-    def _increase_syuntsu(self, k):
-        self.tiles[k] -= 1
-        self.tiles[k + 1] -= 1
-        self.tiles[k + 2] -= 1
-        self.number_melds += 1
-
-    def _decrease_syuntsu(self, k):
-        self.tiles[k] += 1
-        self.tiles[k + 1] += 1
-        self.tiles[k + 2] += 1
-        self.number_melds -= 1
-
-    def _increase_tatsu_first(self, k):
-        self.tiles[k] -= 1
-        self.tiles[k + 1] -= 1
-        self.number_tatsu += 1
-
-    def _decrease_tatsu_first(self, k):
-        self.tiles[k] += 1
-        self.tiles[k + 1] += 1
-        self.number_tatsu -= 1
-
-    def _increase_tatsu_second(self, k):
-        self.tiles[k] -= 1
-        self.tiles[k + 2] -= 1
-        self.number_tatsu += 1
-
-    def _decrease_tatsu_second(self, k):
-        self.tiles[k] += 1
-        self.tiles[k + 2] += 1
-        self.number_tatsu -= 1
-
-    def _increase_isolated_tile(self, k):
-        self.tiles[k] -= 1
-        self.number_isolated_tiles |= (1 << k)
-
-    def _decrease_isolated_tile(self, k):
-        self.tiles[k] += 1
-        self.number_isolated_tiles |= (1 << k)
-
-    def _scan_chitoitsu_and_kokushi(self):
-        shanten = self.min_shanten
-
-        indices = [0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33]
+        if self.cache is None:
+            return self._calculate_shanten(tiles)
+
+        key = self.cache_key(tiles)
+        shanten = self.cache.get(key)
+        if shanten is None:
+            shanten = self._calculate_shanten(tiles)
+            self.cache.put(key, shanten)
+        return shanten
 
-        completed_terminals = 0
-        for i in indices:
-            completed_terminals += self.tiles[i] >= 2
+    def calculate_shanten_by_rows(self, rows, count_of_tiles):
+        """
+        Same as calculate_shanten, but for already loaded suit rows
+        :param rows: sou, pin, man and honors rows from the tables
+        :param count_of_tiles: count of tiles in the hand
+        :return: int
+        """
+        shanten = self._scan_chitoitsu_and_kokushi(rows)
 
-        terminals = 0
-        for i in indices:
-            terminals += self.tiles[i] != 0
+        ret_shanten = distance(merge(rows[0], rows[1]), merge(rows[2], rows[3]), self.count_of_sets(count_of_tiles))
+        ret_shanten -= 1
+        if ret_shanten < shanten:
+            shanten = ret_shanten
 
-        indices = [1, 2, 3, 4, 5, 6, 7, 10, 11, 12, 13, 14, 15, 16, 19, 20, 21, 22, 23, 24, 25]
+        return shanten
 
-        completed_pairs = completed_terminals
-        for i in indices:
-            completed_pairs += self.tiles[i] >= 2
+    def count_of_sets(self, count_of_tiles):
+        """
+        Open sets are not in the hand, so we need to collect fewer sets from our tiles
+        """
+        return 4 - (14 - count_of_tiles) // 3
 
-        pairs = terminals
-        for i in indices:
-            pairs += self.tiles[i] != 0
+    def chitoitsu_and_kokushi(self, completed_pairs, pairs, terminals, completed_terminals):
+        """
+        :param completed_pairs: count of tiles with two or more copies
+        :param pairs: count of different tiles
+        :param terminals: count of different terminal and honor tiles
+        :param completed_terminals: do we have a terminal or honor pair or not
+        :return: int minimal shanten of chitoitsu and kokushi
+        """
+        shanten = 8
 
         ret_shanten = 6 - completed_pairs + (pairs < 7 and 7 - pairs or 0)
         if ret_shanten < shanten:
@@ -279,30 +77,31 @@ class Shanten(object):
 
         return shanten
 
-    def _remove_character_tiles(self, nc):
-        number = 0
-        isolated = 0
-
-        for i in range(27, 34):
-            if self.tiles[i] == 4:
-                self.number_melds += 1
-                self.number_jidahai += 1
-                number |= (1 << (i - 27))
-                isolated |= (1 << (i - 27))
+    def _calculate_shanten(self, tiles):
+        if isinstance(tiles, PackedHand):
+            count_of_tiles = tiles.count_of_tiles
+        else:
+            count_of_tiles = sum(tiles)
 
-            if self.tiles[i] == 3:
-                self.number_melds += 1
+        if count_of_tiles > 14:
+            return -2
 
-            if self.tiles[i] == 2:
-                self.number_pairs += 1
+        if isinstance(tiles, PackedHand):
+            rows = packed_hand_rows(tiles.counts)
+        else:
+            rows = hand_rows(tiles)
 
-            if self.tiles[i] == 1:
-                isolated |= (1 << (i - 27))
+        return self.calculate_shanten_by_rows(rows, count_of_tiles)
 
-        if self.number_jidahai and (nc % 3) == 2:
-            self.number_jidahai -= 1
+    def _scan_chitoitsu_and_kokushi(self, rows):
+        completed_pairs = 0
+        pairs = 0
+        terminals = 0
+        completed_terminals = 0
+        for row in rows:
+            completed_pairs += row[PAIRS_INDEX]
+            pairs += row[KINDS_INDEX]
+            terminals += row[TERMINALS_INDEX]
+            completed_terminals += row[TERMINAL_PAIR_INDEX]
 
-        if isolated:
-            self.number_isolated_tiles |= (1 << 27)
-            if (number | isolated) == number:
-                self.number_characters |= (1 << 27)
+        return self.chitoitsu_and_kokushi(completed_pairs, pairs, terminals, completed_terminals)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed per-suit tables for the shanten calculation.
+
+Every suit (9 tiles with 0..4 copies each) and the honors block (7 tiles)
+is described by a row of ROW_SIZE bytes:
+
+    0..9 - how many tiles we need to add to the suit to build
+           m sets and h pairs in it, stored at index m * 2 + h
+    10   - count of tiles with 2 or more copies (chitoitsu pairs)
+    11   - count of different tiles
+    12   - count of different terminal/honor tiles (kokushi)
+    13   - 1 if there is a terminal/honor tile with 2 or more copies
+
+Rows are indexed by the base-5 suit key (see suit_key and honor_key).
+The table is built once with numpy, stored on disk and memory mapped on import.
+"""
+import mmap
+import os
+
+SUIT_SIZE = 9
+HONORS_SIZE = 7
+SUIT_KEYS = 5 ** SUIT_SIZE
+HONOR_KEYS = 5 ** HONORS_SIZE
+
+ROW_SIZE = 14
+PAIRS_INDEX = 10
+KINDS_INDEX = 11
+TERMINALS_INDEX = 12
+TERMINAL_PAIR_INDEX = 13
+
+HONORS_OFFSET = SUIT_KEYS * ROW_SIZE
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'suits.bin')
+
+# base-5 keys of three tiles packed by 3 bits (see PackedHand)
+TRIPLE_KEYS = [(x & 7) + 5 * ((x >> 3) & 7) + 25 * (x >> 6) for x in range(0, 512)]
+SUIT_MASK = (1 << 27) - 1
+
+# we never need more than 4 sets and 1 pair in the hand
+MAX_SETS = 4
+INF = 99
+
+
+def suit_key(tiles, offset):
+    """
+    :param tiles: 34 tiles format array
+    :param offset: index of the first tile of the suit (0, 9 or 18)
+    :return: int base-5 key of the suit
+    """
+    return tiles[offset] + 5 * (tiles[offset + 1] + 5 * (tiles[offset + 2] + 5 * (
+        tiles[offset + 3] + 5 * (tiles[offset + 4] + 5 * (tiles[offset + 5] + 5 * (
+            tiles[offset + 6] + 5 * (tiles[offset + 7] + 5 * tiles[offset + 8])))))))
+
+
+def honor_key(tiles):
+    """
+    :param tiles: 34 tiles format array
+    :return: int base-5 key of the honor tiles
+    """
+    return tiles[27] + 5 * (tiles[28] + 5 * (tiles[29] + 5 * (
+        tiles[30] + 5 * (tiles[31] + 5 * (tiles[32] + 5 * tiles[33])))))
+
+
+def suit_row(key):
+    start = key * ROW_SIZE
+    return TABLE[start:start + ROW_SIZE]
+
+
+def honor_row(key):
+    start = HONORS_OFFSET + key * ROW_SIZE
+    return TABLE[start:start + ROW_SIZE]
+
+
+def hand_rows(tiles):
+    """
+    :param tiles: 34 tiles format array
+    :return: list with sou, pin, man and honors rows
+    """
+    return [
+        suit_row(suit_key(tiles, 0)),
+        suit_row(suit_key(tiles, 9)),
+        suit_row(suit_key(tiles, 18)),
+        honor_row(honor_key(tiles)),
+    ]
+
+
+def packed_key(counts):
+    """
+    :param counts: counts of one suit packed by 3 bits per tile
+    :return: int base-5 key of the suit
+    """
+    return TRIPLE_KEYS[counts & 511] + 125 * TRIPLE_KEYS[(counts >> 9) & 511] + \
+        15625 * TRIPLE_KEYS[(counts >> 18) & 511]
+
+
+def packed_hand_rows(counts):
+    """
+    :param counts: 34 tile counts packed by 3 bits per tile
+    :return: list with sou, pin, man and honors rows
+    """
+    return [
+        suit_row(packed_key(counts & SUIT_MASK)),
+        suit_row(packed_key((counts >> 27) & SUIT_MASK)),
+        suit_row(packed_key((counts >> 54) & SUIT_MASK)),
+        honor_row(packed_key(counts >> 81)),
+    ]
+
+
+def merge(first, second):
+    """
+    Combine two distance vectors of different suits.
+    It is called for the every hand, so the loops are unrolled.
+    :param first: sequence with at least 10 distances
+    :param second: sequence with at least 10 distances
+    :return: list with 10 distances for the union of suits
+    """
+    a0, a1, a2, a3, a4, a5, a6, a7, a8, a9 = first[0:10]
+    b0, b1, b2, b3, b4, b5, b6, b7, b8, b9 = second[0:10]
+    return [
+        a0 + b0,
+        min(a0 + b1, a1 + b0),
+        min(a0 + b2, a2 + b0),
+        min(a0 + b3, a1 + b2, a2 + b1, a3 + b0),
+        min(a0 + b4, a2 + b2, a4 + b0),
+        min(a0 + b5, a1 + b4, a2 + b3, a3 + b2, a4 + b1, a5 + b0),
+        min(a0 + b6, a2 + b4, a4 + b2, a6 + b0),
+        min(a0 + b7, a1 + b6, a2 + b5, a3 + b4, a4 + b3, a5 + b2, a6 + b1, a7 + b0),
+        min(a0 + b8, a2 + b6, a4 + b4, a6 + b2, a8 + b0),
+        min(a0 + b9, a1 + b8, a2 + b7, a3 + b6, a4 + b5, a5 + b4, a6 + b3, a7 + b2, a8 + b1, a9 + b0),
+    ]
+
+
+def distance(first, second, sets, pairs=1):
+    """
+    How many tiles we need to add to the union of two suits
+    to have required count of sets and pairs there
+    """
+    result = INF
+    for first_sets in range(0, sets + 1):
+        second_sets = (sets - first_sets) * 2
+        for first_pairs in range(0, pairs + 1):
+            value = first[first_sets * 2 + first_pairs] + second[second_sets + pairs - first_pairs]
+            if value < result:
+                result = value
+    return result
+
+
+def distance_terms(first, sets, pairs=1):
+    """
+    Prepare distance calculation for the many second vectors with the same first vector.
+    Terms with unreachable first distances are skipped.
+    :return: list of (first distance, second index) tuples
+    """
+    terms = []
+    for first_sets in range(0, sets + 1):
+        second_sets = (sets - first_sets) * 2
+        for first_pairs in range(0, pairs + 1):
+            value = first[first_sets * 2 + first_pairs]
+            if value < INF:
+                terms.append((value, second_sets + pairs - first_pairs))
+    return terms
+
+
+def terms_distance(terms, second):
+    """
+    The same as distance, but for terms from distance_terms
+    """
+    return min([value + second[index] for value, index in terms])
+
+
+def build_table(path=TABLE_PATH):
+    """
+    Calculate all suit and honor rows and store them to the disk
+    """
+    import numpy as np
+
+    suits = np.zeros((SUIT_KEYS, ROW_SIZE), dtype=np.uint8)
+    suits[:, 0:10] = _build_suit_distances(np)
+    _fill_features(np, suits, SUIT_SIZE, [0, SUIT_SIZE - 1])
+
+    honors = np.zeros((HONOR_KEYS, ROW_SIZE), dtype=np.uint8)
+    honors[:, 0:10] = _build_honor_distances(np)
+    _fill_features(np, honors, HONORS_SIZE, list(range(0, HONORS_SIZE)))
+
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # write to the temp file first, to not leave broken table
+    # if other process will try to load it in the same time
+    temp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(suits.tobytes())
+        f.write(honors.tobytes())
+    os.replace(temp_path, path)
+
+
+def load_table(path=TABLE_PATH):
+    if not os.path.exists(path):
+        build_table(path)
+
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _digits(np, size):
+    keys = np.arange(5 ** size)
+    return np.stack([(keys // 5 ** i) % 5 for i in range(0, size)], axis=1)
+
+
+def _fill_features(np, rows, size, terminal_indices):
+    digits = _digits(np, size)
+    terminals = digits[:, terminal_indices]
+    rows[:, PAIRS_INDEX] = (digits >= 2).sum(axis=1)
+    rows[:, KINDS_INDEX] = (digits >= 1).sum(axis=1)
+    rows[:, TERMINALS_INDEX] = (terminals >= 1).sum(axis=1)
+    rows[:, TERMINAL_PAIR_INDEX] = (terminals >= 2).any(axis=1)
+
+
+def _build_suit_distances(np):
+    """
+    Dynamic programming over the tile positions of the suit.
+    State is the count of started chi sets that still need tiles:
+    chi sets started on the previous tile and chi sets started two tiles ago.
+    For each state we keep distances for the all (sets, pairs) combinations.
+    """
+    states = {(0, 0): np.full((1, MAX_SETS + 1, 2), INF, dtype=np.int16)}
+    states[(0, 0)][0, 0, 0] = 0
+
+    # the first positions for all possible prefixes
+    for position in range(0, SUIT_SIZE - 2):
+        states = _concatenate(np, [_step(np, states, count, position) for count in range(0, 5)])
+
+    result = np.zeros((SUIT_KEYS, 10), dtype=np.uint8)
+    block = 5 ** (SUIT_SIZE - 2)
+    # two last positions are calculated by blocks to save the memory
+    for seventh in range(0, 5):
+        seventh_states = _step(np, states, seventh, SUIT_SIZE - 2)
+        for eighth in range(0, 5):
+            final_states = _step(np, seventh_states, eighth, SUIT_SIZE - 1)
+            start = seventh * block + eighth * block * 5
+            result[start:start + block] = final_states[(0, 0)].reshape(-1, 10)
+    return result
+
+
+def _step(np, states, count, position):
+    """
+    Add a tile position with given count of tiles to the all prefixes
+    """
+    new_states = {}
+    max_new_chi = position < SUIT_SIZE - 2 and 4 or 0
+    for (previous_chi, old_chi), distances in states.items():
+        for new_chi in range(0, max_new_chi + 1):
+            for pon in range(0, 2):
+                for pair in range(0, 2):
+                    need = previous_chi + old_chi + new_chi + pon * 3 + pair * 2
+                    if need > 4:
+                        continue
+
+                    cost = max(0, need - count)
+                    sets = new_chi + pon
+
+                    key = (new_chi, previous_chi)
+                    if key not in new_states:
+                        new_states[key] = np.full(distances.shape, INF, dtype=np.int16)
+
+                    target = new_states[key][:, sets:, pair:]
+                    np.minimum(target, distances[:, :MAX_SETS + 1 - sets, :2 - pair] + cost, out=target)
+
+    for distances in new_states.values():
+        np.minimum(distances, INF, out=distances)
+    return new_states
+
+
+def _concatenate(np, states_list):
+    keys = set()
+    for states in states_list:
+        keys.update(states.keys())
+
+    result = {}
+    for key in keys:
+        parts = []
+        for states in states_list:
+            rows = len(next(iter(states.values())))
+            if key in states:
+                parts.append(states[key])
+            else:
+                parts.append(np.full((rows, MAX_SETS + 1, 2), INF, dtype=np.int16))
+        result[key] = np.concatenate(parts)
+    return result
+
+
+def _build_honor_distances(np):
+    digits = _digits(np, HONORS_SIZE)
+    distances = np.full((HONOR_KEYS, MAX_SETS + 1, 2), INF, dtype=np.int16)
+    distances[:, 0, 0] = 0
+    for i in range(0, HONORS_SIZE):
+        count = digits[:, i]
+        pon_cost = np.maximum(0, 3 - count)[:, None]
+        pair_cost = np.maximum(0, 2 - count)[:, None]
+
+        new_distances = distances.copy()
+        np.minimum(new_distances[:, 1:, :], distances[:, :MAX_SETS, :] + pon_cost[:, :, None],
+                   out=new_distances[:, 1:, :])
+        np.minimum(new_distances[:, :, 1], distances[:, :, 0] + pair_cost, out=new_distances[:, :, 1])
+        distances = np.minimum(new_distances, INF)
+    return distances.reshape(-1, 10).astype(np.uint8)
+
+
+if __name__ == '__main__':
+    build_table()
+else:
+    TABLE = load_table()
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import unittest
 
-from mahjong.ai.agari import Agari
+from mahjong.ai.agari import Agari, suit_patterns
+from mahjong.hand import HandDivider
+from mahjong.packed_hand import PackedHand
 from utils.tests import TestMixin
 
 
@@ -69,3 +71,32 @@ class AgariTestCase(unittest.TestCase, TestMixin):
 
         tiles = self._string_to_136_array(sou='19', pin='19', man='19', honors='11134567')
         self.assertFalse(agari.is_agari(self._to_34_array(tiles)))
+
+    def test_divide_hand(self):
+        agari = Agari()
+        hand_divider = HandDivider()
+
+        hands = [
+            self._string_to_34_array(man='234567', sou='23455', honors='777'),
+            self._string_to_34_array(man='11122233388899'),
+            self._string_to_34_array(man='112233', sou='445566', pin='99'),
+            self._string_to_34_array(sou='111123666789', honors='11'),
+            self._string_to_34_array(sou='11112222333399'),
+            self._string_to_34_array(pin='11223344556677'),
+        ]
+        for tiles in hands:
+            self.assertEqual(agari.divide_hand(tiles), hand_divider.divide_hand(tiles, [], []))
+
+        self.assertEqual(agari.divide_hand(self._string_to_34_array(man='11122233388846')), [])
+
+    def test_suit_patterns(self):
+        patterns = suit_patterns()
+
+        has_pair, decompositions = patterns[PackedHand.from_34_array(self._string_to_34_array(man='111222333')).counts]
+        self.assertFalse(has_pair)
+        # chi sets go first
+        self.assertEqual(decompositions, (((0, 1, 2), (0, 1, 2), (0, 1, 2)), ((0, 0, 0), (1, 1, 1), (2, 2, 2))))
+
+        has_pair, decompositions = patterns[PackedHand.from_34_array(self._string_to_34_array(man='11')).counts]
+        self.assertTrue(has_pair)
+        self.assertEqual(decompositions, (((0, 0),),))
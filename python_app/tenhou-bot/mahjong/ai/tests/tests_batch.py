@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+import numpy as np
+
+from mahjong.ai.agari import Agari
+from mahjong.ai.batch import calculate_shanten_batch, calculate_acceptance_matrix, is_agari_batch
+from mahjong.ai.hand_analyzer import HandAnalyzer
+from mahjong.ai.shanten import Shanten
+from utils.tests import TestMixin
+
+
+class BatchTestCase(unittest.TestCase, TestMixin):
+
+    def test_shanten_batch(self):
+        hands = np.array([
+            self._string_to_34_array(sou='111234567', pin='11', man='567'),
+            self._string_to_34_array(sou='111345677', pin='11', man='567'),
+            self._string_to_34_array(sou='111345677', pin='15', man='567'),
+            self._string_to_34_array(sou='1589', pin='13588', man='1358', honors='1'),
+            self._string_to_34_array(sou='19', pin='19', man='19', honors='1234567'),
+            self._string_to_34_array(sou='114477', pin='114477', man='77'),
+            self._string_to_34_array(sou='2222', honors='1111222333'),
+        ])
+
+        self.assertEqual(calculate_shanten_batch(hands).tolist(),
+                         [Shanten.AGARI_STATE, 0, 1, 4, 0, Shanten.AGARI_STATE, 1])
+
+    def test_batch_and_scalar_results_are_the_same(self):
+        shanten = Shanten()
+        agari = Agari()
+
+        random.seed(42)
+        hands = []
+        for _ in range(0, 2000):
+            wall = [x for x in range(0, 34) for _ in range(0, 4)]
+            random.shuffle(wall)
+            tiles = [0] * 34
+            for tile in wall[:random.choice([2, 5, 8, 11, 13, 14])]:
+                tiles[tile] += 1
+            hands.append(tiles)
+        # the all possible complete hands are rare in random samples, so let's add some
+        hands.append(self._string_to_34_array(sou='123456789', pin='123', honors='11'))
+        hands.append(self._string_to_34_array(sou='11122233344455'))
+        hands.append(self._string_to_34_array(sou='1111234', man='567', honors='222'))
+
+        result = calculate_shanten_batch(np.array(hands))
+        self.assertEqual(result.tolist(), [shanten.calculate_shanten(x) for x in hands])
+
+        result = is_agari_batch(np.array(hands))
+        self.assertEqual(result.tolist(), [agari.is_agari(x) for x in hands])
+
+    def test_wrong_shape(self):
+        with self.assertRaises(ValueError):
+            calculate_shanten_batch(np.zeros((2, 18)))
+
+        with self.assertRaises(ValueError):
+            calculate_acceptance_matrix([0] * 27)
+
+    def test_wrong_count_of_tiles(self):
+        hand = self._string_to_34_array(sou='11123', pin='456', man='789', honors='11')
+
+        wrong_hand = hand[:]
+        wrong_hand[0] = 5
+        with self.assertRaises(ValueError):
+            calculate_shanten_batch(np.array([hand, wrong_hand]))
+
+        wrong_hand[0] = -1
+        with self.assertRaises(ValueError):
+            is_agari_batch(np.array([wrong_hand]))
+
+        with self.assertRaises(ValueError):
+            calculate_acceptance_matrix(wrong_hand)
+
+    def test_acceptance_matrix(self):
+        tiles = self._string_to_34_array(sou='111345677', pin='15', man='567')
+        improves, shanten = calculate_acceptance_matrix(tiles)
+
+        discard = self._string_to_34_tile(sou='7')
+        waiting = np.nonzero(improves[discard])[0].tolist()
+        self.assertEqual(waiting, [self._string_to_34_tile(pin='1'), self._string_to_34_tile(pin='5'),
+                                   self._string_to_34_tile(sou='2'), self._string_to_34_tile(sou='5'),
+                                   self._string_to_34_tile(sou='8')])
+        self.assertEqual(shanten[discard, self._string_to_34_tile(pin='5')], 0)
+        # the same hand
+        self.assertEqual(shanten[discard, discard], 1)
+
+        # we don't have this tile
+        self.assertFalse(improves[self._string_to_34_tile(pin='2')].any())
+        self.assertEqual(shanten[self._string_to_34_tile(pin='2'), discard], -2)
+
+        tiles = self._string_to_34_array(sou='1111345677', pin='1', man='567')
+        improves, shanten = calculate_acceptance_matrix(tiles)
+        # the fifth tile
+        self.assertEqual(shanten[self._string_to_34_tile(pin='1'), self._string_to_34_tile(sou='1')], -2)
+
+    def test_acceptance_matrix_and_analyzer_results_are_the_same(self):
+        random.seed(42)
+        for _ in range(0, 100):
+            wall = [x for x in range(0, 34) for _ in range(0, 4)]
+            random.shuffle(wall)
+            tiles = [0] * 34
+            for tile in wall[:14]:
+                tiles[tile] += 1
+
+            analyzer = HandAnalyzer(tiles)
+            improves, shanten = analyzer.acceptance_matrix()
+            for discard in range(0, 34):
+                if not tiles[discard]:
+                    continue
+
+                for draw, value in analyzer.shanten_after_exchange(discard):
+                    self.assertEqual(shanten[discard, draw], value)
+                    self.assertEqual(improves[discard, draw], value < analyzer.shanten())
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from mahjong.ai.cache import LRUCache, canonical_key, pack_tiles, unpack_tiles
+from mahjong.ai.shanten import Shanten
+from utils.tests import TestMixin
+
+
+class CacheTestCase(unittest.TestCase, TestMixin):
+
+    def test_pack_tiles(self):
+        tiles = self._string_to_34_array(sou='1111', pin='55', man='9', honors='777')
+
+        key = pack_tiles(tiles)
+
+        self.assertEqual((key >> 3 * 8) & 7, 1)
+        self.assertEqual((key >> 3 * 13) & 7, 2)
+        self.assertEqual((key >> 3 * 18) & 7, 4)
+        self.assertEqual(key >> 3 * 33, 3)
+        self.assertEqual(unpack_tiles(key), tiles)
+        self.assertNotEqual(key, pack_tiles(self._string_to_34_array(sou='1111', pin='55', man='8', honors='777')))
+        self.assertEqual(key, pack_tiles(np.array(tiles)))
+
+    def test_lru_eviction(self):
+        cache = LRUCache(2)
+
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        self.assertEqual(cache.get(1), 'a')
+
+        # 2 is the least recently used item now
+        cache.put(3, 'c')
+        self.assertEqual(cache.get(2), None)
+        self.assertEqual(cache.get(1), 'a')
+        self.assertEqual(cache.get(3), 'c')
+
+        self.assertEqual(cache.stats(), {
+            'capacity': 2,
+            'size': 2,
+            'hits': 3,
+            'misses': 1,
+            'evictions': 1,
+            'hit_rate': 0.75,
+        })
+
+        cache.resize(1)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.evictions, 2)
+
+    def test_disabled_cache(self):
+        cache = LRUCache(0)
+
+        cache.put(1, 'a')
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get(1), None)
+
+    def test_shared_shanten_cache(self):
+        cache = LRUCache(10)
+        first = Shanten(cache)
+        second = Shanten(cache)
+
+        tiles = self._string_to_34_array(sou='111345677', pin='15', man='567')
+
+        self.assertEqual(first.calculate_shanten(tiles), 1)
+        self.assertEqual(second.calculate_shanten(tiles), 1)
+        self.assertEqual(second.calculate_shanten(self._string_to_34_array(sou='111234567', pin='11', man='567')),
+                         Shanten.AGARI_STATE)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 2)
+
+    def test_canonical_key(self):
+        tiles = self._string_to_34_array(sou='1123', pin='789', man='55', honors='11777')
+        key = canonical_key(tiles)
+
+        # swap suits
+        self.assertEqual(key, canonical_key(self._string_to_34_array(man='1123', sou='789', pin='55', honors='11777')))
+        # reflect 1..9 inside a suit
+        self.assertEqual(key, canonical_key(self._string_to_34_array(sou='7899', pin='789', man='55', honors='11777')))
+        self.assertEqual(key, canonical_key(self._string_to_34_array(sou='1123', pin='123', man='55', honors='11777')))
+        # honor tiles
+        self.assertEqual(key, canonical_key(self._string_to_34_array(sou='1123', pin='789', man='55', honors='33555')))
+
+        self.assertNotEqual(key,
+                            canonical_key(self._string_to_34_array(sou='1223', pin='789', man='55', honors='11777')))
+        self.assertNotEqual(key,
+                            canonical_key(self._string_to_34_array(sou='1123', pin='789', man='55', honors='11577')))
+
+    def test_canonical_key_of_numpy_array(self):
+        one_shanten = self._string_to_34_array(man='111234567', pin='99', sou='5', honors='12')
+        tempai = self._string_to_34_array(man='111234567', pin='99', sou='55', honors='1')
+        self.assertEqual(canonical_key(np.array(tempai)), canonical_key(tempai))
+
+        shanten = Shanten(LRUCache(100))
+        self.assertEqual(shanten.calculate_shanten(np.array(one_shanten)), 1)
+        self.assertEqual(shanten.calculate_shanten(np.array(tempai)), 0)
+
+    def test_canonical_shanten_cache(self):
+        cache = LRUCache(10)
+        shanten = Shanten(cache)
+
+        self.assertEqual(shanten.calculate_shanten(self._string_to_34_array(sou='111345677', pin='15', man='567')), 1)
+        self.assertEqual(shanten.calculate_shanten(self._string_to_34_array(man='334567999', sou='59', pin='345')), 1)
+        self.assertEqual(cache.hits, 1)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from mahjong.ai.decompositions import DecompositionTable, build_decompositions, build_table, pack_suit
+from utils.tests import TestMixin
+
+
+class DecompositionsTestCase(unittest.TestCase, TestMixin):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'decompositions.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_table_lookup(self):
+        table = DecompositionTable(self.path)
+
+        key = pack_suit(self._string_to_34_array(man='111222333')[0:9])
+        self.assertEqual(table.get(key), (((0, 1, 2), (0, 1, 2), (0, 1, 2)), ((0, 0, 0), (1, 1, 1), (2, 2, 2))))
+
+        key = pack_suit(self._string_to_34_array(man='11123444')[0:9])
+        self.assertEqual(table.get(key), (((0, 0, 0), (1, 2, 3), (3, 3)), ((0, 0), (0, 1, 2), (3, 3, 3))))
+
+        # we can't divide this suit
+        self.assertEqual(table.get(pack_suit(self._string_to_34_array(man='1245')[0:9])), ())
+
+    def test_table_and_built_decompositions_are_the_same(self):
+        count = build_table(self.path)
+        table = DecompositionTable(self.path)
+        decompositions = build_decompositions()
+
+        self.assertEqual(count, len(decompositions))
+        for key, value in decompositions.items():
+            self.assertEqual(table.get(key), value)
+
+    def test_wrong_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 32)
+
+        with self.assertRaises(ValueError):
+            DecompositionTable(self.path)
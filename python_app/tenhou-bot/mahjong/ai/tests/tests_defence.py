@@ -3,9 +3,10 @@ import unittest
 
 from mahjong.ai.defence import Defence
 from mahjong.table import Table
+from utils.tests import TestMixin
 
 
-class DefenceTestCase(unittest.TestCase):
+class DefenceTestCase(unittest.TestCase, TestMixin):
 
     def test_go_to_the_defence_mode(self):
         table = Table()
@@ -18,6 +19,37 @@ class DefenceTestCase(unittest.TestCase):
         table.players[0].in_riichi = True
         self.assertFalse(defence.go_to_defence_mode())
 
+    def test_push_with_good_hand(self):
+        table = Table()
+        table.count_of_remaining_tiles = 60
+        table.players[1].in_riichi = True
+        defence = Defence(table)
+
+        table.get_main_player().init_hand(self._string_to_136_array(sou='1589', pin='13588', man='1358', honors='1'))
+        self.assertTrue(defence.go_to_defence_mode())
+        self.assertTrue(defence.estimate_win_chances()['win'] < 0.3)
+
+        table.get_main_player().init_hand(self._string_to_136_array(sou='123456789', pin='23', man='55'))
+        self.assertFalse(defence.go_to_defence_mode())
+
+    def test_push_or_fold_is_reproducible(self):
+        table = Table()
+        table.count_of_remaining_tiles = 60
+        table.players[1].in_riichi = True
+        table.get_main_player().init_hand(self._string_to_136_array(sou='1289', pin='13588', man='1358', honors='1'))
+
+        decision_estimator = Defence(table)._decision_estimator()
+        self.assertIsNone(decision_estimator.time_budget)
+
+        # the first and the next decisions of the different instances use the same samples
+        first = Defence(table)
+        second = Defence(table)
+        expected = first.estimate_win_chances(estimator=first._decision_estimator())
+        for defence in [first, first, second]:
+            self.assertEqual(defence.estimate_win_chances(estimator=defence._decision_estimator()), expected)
+            self.assertEqual(defence.go_to_defence_mode(), expected['win'] < 0.3)
+        self.assertEqual(expected['samples'], 1000)
+
     def test_calculate_safe_tiles_to_discard(self):
         table = Table()
         table.get_main_player().init_hand([3, 5, 6, 7, 8])
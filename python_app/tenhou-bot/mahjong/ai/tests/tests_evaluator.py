@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.ai.evaluator import ParallelEvaluator, calculate_outs, calculate_shanten, is_agari
+from utils.tests import TestMixin
+
+
+class EvaluatorTestCase(unittest.TestCase, TestMixin):
+
+    def test_inputs_are_not_changed(self):
+        tiles = self._string_to_34_array(sou='111345677', pin='15', man='569')
+        copy_of_tiles = list(tiles)
+
+        self.assertEqual(calculate_shanten(tiles), 2)
+        self.assertEqual(is_agari(tiles), False)
+
+        outs, shanten = calculate_outs(tiles)
+        self.assertEqual(shanten, 2)
+        self.assertEqual(outs[0]['discard'], 9)
+
+        self.assertEqual(tiles, copy_of_tiles)
+
+    def test_parallel_evaluator(self):
+        positions = [
+            self._string_to_34_array(sou='111345677', pin='15', man='569'),
+            self._string_to_34_array(sou='111345677', pin='45', man='569'),
+            self._string_to_34_array(sou='11145677', pin='345', man='569'),
+            self._string_to_34_array(sou='11145677', pin='345', man='456'),
+        ] * 3
+
+        with ParallelEvaluator(workers=2, chunk_size=5) as evaluator:
+            results = evaluator.evaluate(positions)
+
+        self.assertEqual(results, [calculate_outs(x) for x in positions])
+        self.assertEqual([x[1] for x in results[:4]], [2, 1, 0, -1])
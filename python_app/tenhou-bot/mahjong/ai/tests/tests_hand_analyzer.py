@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.ai.hand_analyzer import HandAnalyzer
+from mahjong.ai.shanten import Shanten
+from utils.tests import TestMixin
+
+
+class HandAnalyzerTestCase(unittest.TestCase, TestMixin):
+
+    def test_draw_and_discard(self):
+        shanten = Shanten()
+        analyzer = HandAnalyzer(self._string_to_34_array(sou='111345678', pin='15', man='56'))
+
+        self.assertEqual(analyzer.shanten(), 1)
+
+        analyzer.draw(self._string_to_34_tile(man='7'))
+        self.assertEqual(analyzer.shanten(), 0)
+
+        analyzer.discard(self._string_to_34_tile(pin='1'))
+        tiles = self._string_to_34_array(sou='111345678', pin='5', man='567')
+        self.assertEqual(analyzer.tiles, tiles)
+        self.assertEqual(analyzer.shanten(), shanten.calculate_shanten(tiles))
+
+        analyzer.draw(self._string_to_34_tile(pin='5'))
+        self.assertEqual(analyzer.shanten(), Shanten.AGARI_STATE)
+
+    def test_outs(self):
+        analyzer = HandAnalyzer(self._string_to_34_array(sou='111345677', pin='15', man='569'))
+
+        outs, shanten = analyzer.outs()
+
+        self.assertEqual(shanten, 2)
+        self.assertEqual(outs[0]['discard'], 9)
+        self.assertEqual(outs[0]['waiting'], [3, 6, 7, 8, 11, 12, 13, 14, 15, 18, 19, 20, 21, 22, 23, 24, 25])
+        self.assertEqual(outs[0]['tiles_count'], 57)
+
+        analyzer = HandAnalyzer(self._string_to_34_array(sou='11145677', pin='345', man='569'))
+
+        outs, shanten = analyzer.outs()
+
+        self.assertEqual(shanten, 0)
+        self.assertEqual(outs[0]['discard'], 8)
+        self.assertEqual(outs[0]['waiting'], [3, 6])
+        self.assertEqual(outs[0]['tiles_count'], 8)
+
+        analyzer = HandAnalyzer(self._string_to_34_array(sou='11145677', pin='345', man='456'))
+
+        outs, shanten = analyzer.outs()
+
+        self.assertEqual(shanten, Shanten.AGARI_STATE)
+        self.assertEqual(outs, [])
+
+    def test_outs_are_the_same_as_shanten_calculation(self):
+        shanten = Shanten()
+        tiles = self._string_to_34_array(sou='1589', pin='13588', man='1358', honors='1')
+        analyzer = HandAnalyzer(tiles)
+
+        outs, current_shanten = analyzer.outs()
+        self.assertEqual(current_shanten, shanten.calculate_shanten(tiles))
+
+        for item in outs:
+            tiles[item['discard']] -= 1
+            for tile in range(0, 34):
+                if tile == item['discard'] or tiles[tile] >= 4:
+                    continue
+
+                tiles[tile] += 1
+                improves = shanten.calculate_shanten(tiles) == current_shanten - 1
+                self.assertEqual(tile in item['waiting'], improves)
+                tiles[tile] -= 1
+            tiles[item['discard']] += 1
+
+    def test_two_steps_outs(self):
+        shanten = Shanten()
+        tiles = self._string_to_34_array(sou='11345', pin='2479', man='1358', honors='1')
+        visible_tiles = self._string_to_34_array(sou='2', pin='3', man='44')
+
+        outs, current_shanten = HandAnalyzer(tiles).outs(depth=2, visible_tiles=visible_tiles)
+
+        self.assertEqual(current_shanten, 2)
+
+        def remaining_tiles(hand):
+            return [max(0, 4 - hand[x] - visible_tiles[x]) for x in range(0, 34)]
+
+        # let's check values with plain shanten calculations
+        remaining = remaining_tiles(tiles)
+        for item in outs:
+            expected = 0
+            hand = list(tiles)
+            hand[item['discard']] -= 1
+            for draw in item['waiting']:
+                hand[draw] += 1
+                best_count = 0
+                for second_discard in range(0, 34):
+                    if not hand[second_discard]:
+                        continue
+
+                    hand[second_discard] -= 1
+                    count = 0
+                    for second_draw in range(0, 34):
+                        if hand[second_draw] >= 4:
+                            continue
+
+                        hand[second_draw] += 1
+                        if shanten.calculate_shanten(hand) == current_shanten - 2:
+                            count += remaining[second_draw] - (second_draw == draw and 1 or 0)
+                        hand[second_draw] -= 1
+                    hand[second_discard] += 1
+                    best_count = max(best_count, count)
+                hand[draw] -= 1
+                expected += remaining[draw] * best_count
+
+            self.assertEqual(item['second_step_count'], expected)
+
+        counts = [x['second_step_count'] for x in outs]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_two_steps_outs_in_tempai(self):
+        tiles = self._string_to_34_array(sou='11145677', pin='345', man='569')
+
+        outs, shanten = HandAnalyzer(tiles).outs(depth=2)
+
+        self.assertEqual(shanten, 0)
+        self.assertEqual(outs, HandAnalyzer(tiles).outs()[0])
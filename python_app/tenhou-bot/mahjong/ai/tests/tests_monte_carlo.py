@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.ai.monte_carlo import MonteCarloEstimator, confidence_interval
+from utils.tests import TestMixin
+
+
+class MonteCarloTestCase(unittest.TestCase, TestMixin):
+
+    def test_tempai_hand(self):
+        estimator = MonteCarloEstimator(samples=1000, time_budget=10, seed=0)
+        tiles = self._string_to_34_array(sou='123456789', pin='23', man='55')
+        remaining_tiles = [4 - x for x in tiles]
+
+        result = estimator.estimate(tiles, remaining_tiles, 1)
+        self.assertEqual(result['samples'], 1000)
+        self.assertEqual(result['tempai'], 1)
+        # 8 pin 1 and pin 4 tiles in the wall of 123 tiles
+        low, high = result['win_interval']
+        self.assertTrue(low < 8 / 123 < high)
+
+        # we can't win, when there are no waiting tiles in the wall
+        remaining_tiles[self._string_to_34_tile(pin='1')] = 0
+        remaining_tiles[self._string_to_34_tile(pin='4')] = 0
+        self.assertEqual(estimator.estimate(tiles, remaining_tiles, 10)['win'], 0)
+
+    def test_hand_before_discard(self):
+        estimator = MonteCarloEstimator(samples=500, time_budget=10, seed=42)
+
+        tiles = self._string_to_34_array(sou='123456789', pin='123', man='55')
+        self.assertEqual(estimator.estimate(tiles, [0] * 34, 0)['win'], 1)
+
+        tiles = self._string_to_34_array(sou='123456789', pin='239', man='55')
+        remaining_tiles = [4 - x for x in tiles]
+        self.assertEqual(estimator.estimate(tiles, remaining_tiles, 0)['tempai'], 1)
+        self.assertTrue(estimator.estimate(tiles, remaining_tiles, 10)['win'] > 0)
+
+    def test_more_draws_better_chances(self):
+        estimator = MonteCarloEstimator(samples=1000, time_budget=10, seed=42)
+        tiles = self._string_to_34_array(sou='1589', pin='13588', man='1358', honors='1')
+        remaining_tiles = [4 - x for x in tiles]
+
+        short = estimator.estimate(tiles, remaining_tiles, 3)
+        long = estimator.estimate(tiles, remaining_tiles, 15)
+        self.assertEqual(short['tempai'], 0)
+        self.assertTrue(long['tempai'] > 0)
+        self.assertTrue(long['tempai'] >= long['win'])
+
+    def test_time_budget(self):
+        estimator = MonteCarloEstimator(samples=10000, time_budget=0, batch_size=100, seed=42)
+        tiles = self._string_to_34_array(sou='123456789', pin='23', man='55')
+
+        self.assertEqual(estimator.estimate(tiles, [4 - x for x in tiles], 5)['samples'], 100)
+
+    def test_wrong_count_of_tiles(self):
+        with self.assertRaises(ValueError):
+            MonteCarloEstimator().estimate(self._string_to_34_array(sou='123'), [0] * 34, 1)
+
+    def test_confidence_interval(self):
+        low, high = confidence_interval(50, 100)
+        self.assertTrue(0.39 < low < 0.41)
+        self.assertTrue(0.59 < high < 0.61)
+
+        self.assertAlmostEqual(confidence_interval(0, 100)[0], 0)
+        self.assertAlmostEqual(confidence_interval(100, 100)[1], 1)
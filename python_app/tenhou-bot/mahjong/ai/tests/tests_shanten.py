@@ -69,3 +69,25 @@ class ShantenTestCase(unittest.TestCase, TestMixin):
 
         tiles = self._string_to_136_array(sou='129', pin='129', man='129', honors='12345')
         self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), 2)
+
+    def test_shanten_number_and_open_sets(self):
+        shanten = Shanten()
+
+        tiles = self._string_to_136_array(sou='123', pin='55', man='789', honors='11')
+        self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), 0)
+
+        tiles = self._string_to_136_array(sou='12', pin='5', man='7')
+        self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), 1)
+
+        tiles = self._string_to_136_array(sou='55')
+        self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), Shanten.AGARI_STATE)
+
+    def test_shanten_number_and_four_identical_tiles(self):
+        shanten = Shanten()
+
+        # we can't wait for the fifth tile, so it is not a tempai
+        tiles = self._string_to_136_array(sou='2222', honors='1111222333')
+        self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), 1)
+
+        tiles = self._string_to_136_array(sou='2222', honors='111222333')
+        self.assertEqual(shanten.calculate_shanten(self._to_34_array(tiles)), 1)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from mahjong.meld import Meld
 from mahjong.stat import Statistics
 from mahjong.table import Table
 from utils.general import make_random_letters_and_digit_string
@@ -8,8 +9,8 @@ class Client(object):
     id = ''
     position = 0
 
-    def __init__(self, use_previous_ai_version=False):
-        self.table = Table(use_previous_ai_version)
+    def __init__(self, use_previous_ai_version=False, ruleset=None):
+        self.table = Table(use_previous_ai_version, ruleset)
         self.statistics = Statistics()
         self.player = self.table.get_main_player()
 
@@ -40,7 +41,15 @@ class Client(object):
         # so, we need to compensate "-" from enemy discard method
         self.table.count_of_remaining_tiles += 1
 
-        return self.table.get_player(meld.who).add_meld(meld)
+        # the called tile is the last discard of the other player
+        # and it is already visible with the discards
+        called_tile = None
+        if meld.type in [Meld.CHI, Meld.PON, Meld.KAN] and meld.from_who:
+            discards = self.table.get_player((meld.who + meld.from_who) % 4).discards
+            if discards and discards[-1] in meld.tiles:
+                called_tile = discards[-1]
+
+        return self.table.get_player(meld.who).add_meld(meld, called_tile)
 
     def enemy_discard(self, player_seat, tile):
         self.table.get_player(player_seat).add_discarded_tile(tile)
@@ -49,6 +58,7 @@ class Client(object):
         for player in self.table.players:
             if player.in_riichi:
                 player.safe_tiles.append(tile)
+                self.table.index.add_safe_tile(player.seat, tile)
 
     def enemy_riichi(self, player_seat):
         self.table.get_player(player_seat).in_riichi = True
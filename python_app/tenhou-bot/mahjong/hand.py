@@ -5,14 +5,28 @@ import itertools
 from functools import reduce
 
 from mahjong.ai.agari import Agari
+from mahjong.ai.decompositions import decomposition_table
 from mahjong import yaku
+from mahjong.yaku import Yaku
+from mahjong.hand_features import HandFeatures
+from mahjong.packed_hand import PackedHand
+from mahjong.ruleset import Ruleset
 from mahjong.tile import TilesConverter
 from mahjong.constants import EAST, SOUTH, WEST, NORTH, CHUN, HATSU, HAKU, TERMINAL_INDICES, HONOR_INDICES
-from mahjong.utils import is_chi, is_pon, is_pair, is_sou, is_pin, is_man, plus_dora, is_aka_dora, simplify
-from utils.settings_handler import settings
+from mahjong.utils import is_chi, is_pon, is_pair, plus_dora, simplify
 
 
 class FinishedHand(object):
+    cache = None
+    ruleset = None
+
+    def __init__(self, cache=None, ruleset=None):
+        """
+        :param cache: LRUCache shared between calculators, results are not cached without it
+        :param ruleset: Ruleset of the game, by default it is rules from the settings
+        """
+        self.cache = cache
+        self.ruleset = ruleset or Ruleset.from_settings()
 
     def estimate_hand_value(self,
                             tiles,
@@ -60,15 +74,15 @@ class FinishedHand(object):
 
         {"cost": {'main': 1000, 'additional': 0}, "han": 1, "fu": 30, "error": None, "hand_yaku": []}
         {"cost": None, "han": 0, "fu": 0, "error": "Hand is not valid", "hand_yaku": []}
+
+        Arguments are not changed, so the same hand with the same situation always has the same value
+        and it can be taken from the cache
         """
         if not open_sets:
             open_sets = []
         else:
-            # cast 136 format to 34 format
-            for item in open_sets:
-                item[0] //= 4
-                item[1] //= 4
-                item[2] //= 4
+            # cast 136 format to 34 format, caller's sets are not changed
+            open_sets = [[x // 4 for x in item] for item in open_sets]
         is_open_hand = len(open_sets) > 0
 
         if not dora_indicators:
@@ -81,7 +95,6 @@ class FinishedHand(object):
             kan_indices_136 = called_kan_indices
             called_kan_indices = [x // 4 for x in called_kan_indices]
 
-        agari = Agari()
         cost = None
         error = None
         hand_yaku = []
@@ -115,17 +128,167 @@ class FinishedHand(object):
             error = "Ippatsu can't be declared without riichi"
             return return_response()
 
+        tiles_for_dora = tiles + kan_indices_136
+        count_of_dora = 0
+        count_of_aka_dora = 0
+        aka_dora_tiles = self.ruleset.aka_dora_tiles
+        for tile in tiles_for_dora:
+            count_of_dora += plus_dora(tile, dora_indicators)
+
+            if tile in aka_dora_tiles:
+                count_of_aka_dora += 1
+
         tiles_34 = TilesConverter.to_34_array(tiles)
-        divider = HandDivider()
+        situation = (is_tsumo, is_riichi, is_dealer, is_ippatsu, is_rinshan, is_chankan, is_haitei, is_houtei,
+                     is_daburu_riichi, is_tenhou, is_renhou, is_chiihou)
+
+        if self.cache is None:
+            return self._estimate_hand_value(tiles_34, win_tile // 4, situation, open_sets, called_kan_indices,
+                                             player_wind, round_wind, count_of_dora, count_of_aka_dora)
+
+        # exact 136 tiles matter only for dora, so we can use counts in the key
+        key = (PackedHand.from_34_array(tiles_34).counts, win_tile // 4, situation,
+               tuple([tuple(x) for x in open_sets]), tuple(called_kan_indices),
+               player_wind, round_wind, count_of_dora, count_of_aka_dora, self.ruleset)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._estimate_hand_value(tiles_34, win_tile // 4, situation, open_sets, called_kan_indices,
+                                               player_wind, round_wind, count_of_dora, count_of_aka_dora)
+            self.cache.put(key, result)
+
+        # cached result is shared between calls, so the caller gets own copy of it
+        return {
+            'cost': result['cost'] and dict(result['cost']),
+            'error': result['error'],
+            'han': result['han'],
+            'fu': result['fu'],
+            'hand_yaku': list(result['hand_yaku']),
+        }
+
+    def estimate_tenpai_values(self,
+                               tiles,
+                               open_sets=None,
+                               dora_indicators=None,
+                               called_kan_indices=None,
+                               player_wind=None,
+                               round_wind=None,
+                               is_dealer=False):
+        """
+        Values of the tempai hand for the all its winning tiles.
+        Hand division and yaku features are calculated once for the every winning tile
+        and they are shared between ron, tsumo, riichi and dama values
+        :param tiles: array with 13 tiles in 136-tile format
+        :param open_sets: array of array with open sets in 136-tile format
+        :param dora_indicators: array of tiles in 136-tile format
+        :param called_kan_indices: array of tiles in 136-tile format
+        :param player_wind: index of player wind
+        :param round_wind: index of round wind
+        :param is_dealer:
+        :return: dictionary with winning tile in 34-tile format -> values,
+        every value is the same dictionary as estimate_hand_value result,
+        riichi values of the open hand are None
 
-        if not agari.is_agari(tiles_34):
+        {9: {'ron': {'riichi': {...}, 'dama': {...}}, 'tsumo': {'riichi': {...}, 'dama': {...}}}}
+        """
+        if not open_sets:
+            open_sets = []
+        else:
+            open_sets = [[x // 4 for x in item] for item in open_sets]
+        is_open_hand = len(open_sets) > 0
+
+        if not dora_indicators:
+            dora_indicators = []
+
+        kan_indices_136 = called_kan_indices or []
+        called_kan_indices = [x // 4 for x in kan_indices_136]
+
+        tiles_for_dora = tiles + kan_indices_136
+        count_of_dora = 0
+        count_of_aka_dora = 0
+        aka_dora_tiles = self.ruleset.aka_dora_tiles
+        for tile in tiles_for_dora:
+            count_of_dora += plus_dora(tile, dora_indicators)
+
+            if tile in aka_dora_tiles:
+                count_of_aka_dora += 1
+
+        tiles_34 = TilesConverter.to_34_array(tiles)
+        values = {}
+        for win_tile in range(0, 34):
+            # we can't wait for the fifth tile
+            if tiles_34[win_tile] == 4:
+                continue
+
+            tiles_34[win_tile] += 1
+            hand_options = self._hand_options(tiles_34, open_sets, called_kan_indices)
+            if hand_options is not None:
+                # we don't know the exact winning tile, so it is not a red five
+                win_tile_dora = count_of_dora + plus_dora(win_tile * 4, dora_indicators)
+
+                values[win_tile] = {}
+                for win_type, is_tsumo in [('ron', False), ('tsumo', True)]:
+                    values[win_tile][win_type] = {}
+                    for riichi_type, is_riichi in [('riichi', True), ('dama', False)]:
+                        if is_riichi and is_open_hand:
+                            values[win_tile][win_type][riichi_type] = None
+                            continue
+
+                        situation = (is_tsumo, is_riichi, is_dealer, False, False, False, False, False,
+                                     False, False, False, False)
+                        value = self._estimate_hand_value(tiles_34, win_tile, situation, open_sets,
+                                                          called_kan_indices, player_wind, round_wind,
+                                                          win_tile_dora, count_of_aka_dora, hand_options)
+                        values[win_tile][win_type][riichi_type] = value
+            tiles_34[win_tile] -= 1
+
+        return values
+
+    def _estimate_hand_value(self,
+                             tiles_34,
+                             win_tile,
+                             situation,
+                             open_sets,
+                             called_kan_indices,
+                             player_wind,
+                             round_wind,
+                             count_of_dora,
+                             count_of_aka_dora,
+                             hand_options=None):
+        """
+        Hand value without any side effects, the result depends only on arguments
+        :param tiles_34: 34 tiles format array
+        :param win_tile: 34 tiles format
+        :param situation: tuple of is_tsumo, is_riichi, is_dealer, is_ippatsu, is_rinshan, is_chankan, is_haitei,
+        is_houtei, is_daburu_riichi, is_tenhou, is_renhou and is_chiihou flags
+        :param open_sets: array of array with open sets in 34 tiles format
+        :param called_kan_indices: array of 34 tiles format
+        :param count_of_dora: count of dora in the hand and in the kan sets
+        :param count_of_aka_dora: count of red fives
+        :param hand_options: result of _hand_options for the same tiles, to not divide the hand again
+        :return: the same dictionary as estimate_hand_value
+        """
+        (is_tsumo, is_riichi, is_dealer, is_ippatsu, is_rinshan, is_chankan, is_haitei, is_houtei,
+         is_daburu_riichi, is_tenhou, is_renhou, is_chiihou) = situation
+        is_open_hand = len(open_sets) > 0
+
+        cost = None
+        error = None
+        hand_yaku = []
+        han = 0
+        fu = 0
+
+        def return_response():
+            return {'cost': cost, 'error': error, 'han': han, 'fu': fu, 'hand_yaku': hand_yaku}
+
+        if hand_options is None:
+            hand_options = self._hand_options(tiles_34, open_sets, called_kan_indices)
+
+        if hand_options is None:
             error = 'Hand is not winning'
             return return_response()
 
-        hand_options = divider.divide_hand(tiles_34, open_sets, called_kan_indices)
-
         calculated_hands = []
-        for hand in hand_options:
+        for hand, features in hand_options:
             cost = None
             error = None
             hand_yaku = []
@@ -137,9 +300,7 @@ class FinishedHand(object):
             else:
                 fu += 30
 
-            pon_sets = [x for x in hand if is_pon(x)]
-            chi_sets = [x for x in hand if is_chi(x)]
-            additional_fu = self.calculate_additional_fu(win_tile,
+            additional_fu = self.calculate_additional_fu(win_tile * 4,
                                                          hand,
                                                          is_tsumo,
                                                          player_wind,
@@ -147,7 +308,7 @@ class FinishedHand(object):
                                                          open_sets,
                                                          called_kan_indices)
 
-            if additional_fu == 0 and len(chi_sets) == 4:
+            if additional_fu == 0 and features.count_of_chi == 4:
                 """
                 - A hand without pon and kan sets, so it should contains all sequences and a pair
                 - The pair should be not valued
@@ -174,7 +335,7 @@ class FinishedHand(object):
             if is_pinfu:
                 hand_yaku.append(yaku.pinfu)
 
-            is_chitoitsu = self.is_chitoitsu(hand)
+            is_chitoitsu = features.is_chitoitsu()
             # let's skip hand that looks like chitoitsu, but it contains open sets
             if is_chitoitsu and is_open_hand:
                 continue
@@ -182,8 +343,8 @@ class FinishedHand(object):
             if is_chitoitsu:
                 hand_yaku.append(yaku.chiitoitsu)
 
-            is_tanyao = self.is_tanyao(hand)
-            if is_open_hand and not settings.OPEN_TANYAO:
+            is_tanyao = features.is_tanyao()
+            if is_open_hand and not self.ruleset.open_tanyao:
                 is_tanyao = False
 
             if is_tanyao:
@@ -219,147 +380,132 @@ class FinishedHand(object):
             if is_chiihou:
                 hand_yaku.append(yaku.chiihou)
 
-            if self.is_honitsu(hand):
+            if features.is_honitsu():
                 hand_yaku.append(yaku.honitsu)
 
-            if self.is_chinitsu(hand):
+            if features.is_chinitsu():
                 hand_yaku.append(yaku.chinitsu)
 
-            if self.is_tsuisou(hand):
+            if features.is_tsuisou():
                 hand_yaku.append(yaku.tsuisou)
 
-            if self.is_honroto(hand):
+            if features.is_honroto():
                 hand_yaku.append(yaku.honroto)
 
-            if self.is_chinroto(hand):
+            if features.is_chinroto():
                 hand_yaku.append(yaku.chinroto)
 
             # small optimization, try to detect yaku with chi required sets only if we have chi sets in hand
-            if len(chi_sets):
-                if self.is_chanta(hand):
+            if features.count_of_chi:
+                if features.is_chanta():
                     hand_yaku.append(yaku.chanta)
 
-                if self.is_junchan(hand):
+                if features.is_junchan():
                     hand_yaku.append(yaku.junchan)
 
-                if self.is_ittsu(hand):
+                if features.is_ittsu():
                     hand_yaku.append(yaku.ittsu)
 
                 if not is_open_hand:
-                    if self.is_ryanpeiko(hand):
+                    if features.is_ryanpeiko():
                         hand_yaku.append(yaku.ryanpeiko)
-                    elif self.is_iipeiko(hand):
+                    elif features.is_iipeiko():
                         hand_yaku.append(yaku.iipeiko)
 
-                if self.is_sanshoku(hand):
+                if features.is_sanshoku():
                     hand_yaku.append(yaku.sanshoku)
 
             # small optimization, try to detect yaku with pon required sets only if we have pon sets in hand
-            if len(pon_sets):
-                if self.is_toitoi(hand):
+            if features.count_of_pon:
+                if features.is_toitoi():
                     hand_yaku.append(yaku.toitoi)
 
-                if self.is_sanankou(win_tile, hand, open_sets, is_tsumo):
+                if features.is_sanankou(win_tile, open_sets, is_tsumo):
                     hand_yaku.append(yaku.sanankou)
 
-                if self.is_sanshoku_douko(hand):
+                if features.is_sanshoku_douko():
                     hand_yaku.append(yaku.sanshoku_douko)
 
-                if self.is_shosangen(hand):
+                if features.is_shosangen():
                     hand_yaku.append(yaku.shosangen)
 
-                if self.is_haku(hand):
+                if features.is_pon_of(HAKU):
                     hand_yaku.append(yaku.haku)
 
-                if self.is_hatsu(hand):
+                if features.is_pon_of(HATSU):
                     hand_yaku.append(yaku.hatsu)
 
-                if self.is_chun(hand):
+                if features.is_pon_of(CHUN):
                     hand_yaku.append(yaku.hatsu)
 
-                if self.is_east(hand, player_wind, round_wind):
+                if features.is_wind(EAST, player_wind, round_wind):
                     if player_wind == EAST:
                         hand_yaku.append(yaku.yakuhai_place)
 
                     if round_wind == EAST:
                         hand_yaku.append(yaku.yakuhai_round)
 
-                if self.is_south(hand, player_wind, round_wind):
+                if features.is_wind(SOUTH, player_wind, round_wind):
                     if player_wind == SOUTH:
                         hand_yaku.append(yaku.yakuhai_place)
 
                     if round_wind == SOUTH:
                         hand_yaku.append(yaku.yakuhai_round)
 
-                if self.is_west(hand, player_wind, round_wind):
+                if features.is_wind(WEST, player_wind, round_wind):
                     if player_wind == WEST:
                         hand_yaku.append(yaku.yakuhai_place)
 
                     if round_wind == WEST:
                         hand_yaku.append(yaku.yakuhai_round)
 
-                if self.is_north(hand, player_wind, round_wind):
+                if features.is_wind(NORTH, player_wind, round_wind):
                     if player_wind == NORTH:
                         hand_yaku.append(yaku.yakuhai_place)
 
                     if round_wind == NORTH:
                         hand_yaku.append(yaku.yakuhai_round)
 
-                if self.is_daisangen(hand):
+                if features.is_daisangen():
                     hand_yaku.append(yaku.daisangen)
 
-                if self.is_shosuushi(hand):
+                if features.is_shosuushi():
                     hand_yaku.append(yaku.shosuushi)
 
-                if self.is_daisuushi(hand):
+                if features.is_daisuushi():
                     hand_yaku.append(yaku.daisuushi)
 
-                if self.is_ryuisou(hand):
+                if features.is_ryuisou():
                     hand_yaku.append(yaku.ryuisou)
 
-                if not is_open_hand and self.is_chuuren_poutou(hand):
-                    if tiles_34[win_tile // 4] == 2:
+                if not is_open_hand and features.is_chuuren_poutou():
+                    if tiles_34[win_tile] == 2:
                         hand_yaku.append(yaku.daburu_chuuren_poutou)
                     else:
                         hand_yaku.append(yaku.chuuren_poutou)
 
-                if not is_open_hand and self.is_suuankou(win_tile, hand, is_tsumo):
-                    if tiles_34[win_tile // 4] == 2:
+                if not is_open_hand and features.is_suuankou(win_tile, is_tsumo):
+                    if tiles_34[win_tile] == 2:
                         hand_yaku.append(yaku.suuankou_tanki)
                     else:
                         hand_yaku.append(yaku.suuankou)
 
-                if self.is_sankantsu(hand, called_kan_indices):
+                if features.is_sankantsu(called_kan_indices):
                     hand_yaku.append(yaku.sankantsu)
 
-                if self.is_suukantsu(hand, called_kan_indices):
+                if features.is_suukantsu(called_kan_indices):
                     hand_yaku.append(yaku.suukantsu)
 
             # chitoitsu is always 25 fu
             if is_chitoitsu:
                 fu = 25
 
-            tiles_for_dora = tiles + kan_indices_136
-            count_of_dora = 0
-            count_of_aka_dora = 0
-            for tile in tiles_for_dora:
-                count_of_dora += plus_dora(tile, dora_indicators)
-
-            for tile in tiles_for_dora:
-                if is_aka_dora(tile):
-                    count_of_aka_dora += 1
-
+            # new yaku items, shared yaku.dora and yaku.aka_dora are not changed
             if count_of_dora:
-                yaku_item = yaku.dora
-                yaku_item.han['open'] = count_of_dora
-                yaku_item.han['closed'] = count_of_dora
-                hand_yaku.append(yaku_item)
+                hand_yaku.append(Yaku(yaku.dora.name, count_of_dora, count_of_dora))
 
             if count_of_aka_dora:
-                yaku_item = yaku.aka_dora
-                yaku_item.han['open'] = count_of_aka_dora
-                yaku_item.han['closed'] = count_of_aka_dora
-                hand_yaku.append(yaku_item)
+                hand_yaku.append(Yaku(yaku.aka_dora.name, count_of_aka_dora, count_of_aka_dora))
 
             # yakuman is not connected with other yaku
             yakuman_list = [x for x in hand_yaku if x.is_yakuman]
@@ -395,7 +541,7 @@ class FinishedHand(object):
 
         # exception hand
         if not is_open_hand and self.is_kokushi(tiles_34):
-            if tiles_34[win_tile // 4] == 2:
+            if tiles_34[win_tile] == 2:
                 han = yaku.daburu_kokushi.han['closed']
             else:
                 han = yaku.kokushi.han['closed']
@@ -420,6 +566,31 @@ class FinishedHand(object):
 
         return return_response()
 
+    def _hand_options(self, tiles_34, open_sets, called_kan_indices):
+        """
+        All possible divisions of the winning hand to sets,
+        yaku checks for them are bit operations over the hand features
+        :param tiles_34: 34 tiles format array
+        :param open_sets: array of array with open sets in 34 tiles format
+        :param called_kan_indices: array of 34 tiles format
+        :return: list of (hand, HandFeatures) tuples or None for not winning hand
+        """
+        agari = Agari()
+        if not agari.is_agari(tiles_34):
+            return None
+
+        # closed hand decompositions are already in the agari suit patterns
+        if not open_sets and not called_kan_indices:
+            hands = agari.divide_hand(tiles_34)
+        else:
+            hands = HandDivider().divide_hand(tiles_34[:], open_sets, called_kan_indices)
+            # the tiles are complete, but there is no division with the called sets
+            # (closed hand without divisions is kokushi, it is checked separately)
+            if not hands:
+                return None
+
+        return [(hand, HandFeatures(hand)) for hand in hands]
+
     def calculate_scores(self, han, fu, is_tsumo, is_dealer):
         """
         Calculate how much scores cost a hand with given han and fu
@@ -589,7 +760,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        return len(hand) == 7
+        return HandFeatures(hand).is_chitoitsu()
 
     def is_tanyao(self, hand):
         """
@@ -597,9 +768,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        indices = reduce(lambda z, y: z + y, hand)
-        result = TERMINAL_INDICES + HONOR_INDICES
-        return not any(x in result for x in indices)
+        return HandFeatures(hand).is_tanyao()
 
     def is_iipeiko(self, hand):
         """
@@ -607,18 +776,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        chi_sets = [i for i in hand if is_chi(i)]
-
-        count_of_identical_chi = 0
-        for x in chi_sets:
-            count = 0
-            for y in chi_sets:
-                if x == y:
-                    count += 1
-            if count > count_of_identical_chi:
-                count_of_identical_chi = count
-
-        return count_of_identical_chi >= 2
+        return HandFeatures(hand).is_iipeiko()
 
     def is_ryanpeiko(self, hand):
         """
@@ -626,16 +784,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        chi_sets = [i for i in hand if is_chi(i)]
-        count_of_identical_chi = []
-        for x in chi_sets:
-            count = 0
-            for y in chi_sets:
-                if x == y:
-                    count += 1
-            count_of_identical_chi.append(count)
-
-        return len([x for x in count_of_identical_chi if x >= 2]) == 4
+        return HandFeatures(hand).is_ryanpeiko()
 
     def is_toitoi(self, hand):
         """
@@ -643,8 +792,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        count_of_pon = len([i for i in hand if is_pon(i)])
-        return count_of_pon == 4
+        return HandFeatures(hand).is_toitoi()
 
     def is_sankantsu(self, hand, called_kan_indices):
         """
@@ -653,16 +801,7 @@ class FinishedHand(object):
         :param called_kan_indices: array of 34 tiles format
         :return: true|false
         """
-        if len(called_kan_indices) != 3:
-            return False
-
-        pon_sets = [i for i in hand if is_pon(i)]
-        count_of_kan_sets = 0
-        for item in pon_sets:
-            if item[0] in called_kan_indices:
-                count_of_kan_sets += 1
-
-        return count_of_kan_sets == 3
+        return HandFeatures(hand).is_sankantsu(called_kan_indices)
 
     def is_honroto(self, hand):
         """
@@ -670,9 +809,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        indices = reduce(lambda z, y: z + y, hand)
-        result = HONOR_INDICES + TERMINAL_INDICES
-        return all(x in result for x in indices)
+        return HandFeatures(hand).is_honroto()
 
     def is_sanankou(self, win_tile, hand, open_sets, is_tsumo):
         """
@@ -683,24 +820,7 @@ class FinishedHand(object):
         :param is_tsumo:
         :return: true|false
         """
-        win_tile //= 4
-
-        chi_sets = [x for x in hand if (is_chi(x) and win_tile in x and x not in open_sets)]
-        pon_sets = [x for x in hand if is_pon(x)]
-
-        closed_pon_sets = []
-        for item in pon_sets:
-            if item in open_sets:
-                continue
-
-            # if we do the ron on syanpon wait our pon will be consider as open
-            # and it is not 789999 set
-            if win_tile in item and not is_tsumo and not len(chi_sets):
-                continue
-
-            closed_pon_sets.append(item)
-
-        return len(closed_pon_sets) == 3
+        return HandFeatures(hand).is_sanankou(win_tile // 4, open_sets, is_tsumo)
 
     def is_shosangen(self, hand):
         """
@@ -708,14 +828,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        dragons = [CHUN, HAKU, HATSU]
-        count_of_conditions = 0
-        for item in hand:
-            # dragon pon or pair
-            if (is_pair(item) or is_pon(item)) and item[0] in dragons:
-                count_of_conditions += 1
-
-        return count_of_conditions == 3
+        return HandFeatures(hand).is_shosangen()
 
     def is_chanta(self, hand):
         """
@@ -724,30 +837,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-
-        def tile_in_indices(item_set, indices_array):
-            for x in item_set:
-                if x in indices_array:
-                    return True
-            return False
-
-        honor_sets = 0
-        terminal_sets = 0
-        count_of_chi = 0
-        for item in hand:
-            if is_chi(item):
-                count_of_chi += 1
-
-            if tile_in_indices(item, TERMINAL_INDICES):
-                terminal_sets += 1
-
-            if tile_in_indices(item, HONOR_INDICES):
-                honor_sets += 1
-
-        if count_of_chi == 0:
-            return False
-
-        return terminal_sets + honor_sets == 5 and terminal_sets != 0 and honor_sets != 0
+        return HandFeatures(hand).is_chanta()
 
     def is_junchan(self, hand):
         """
@@ -756,26 +846,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-
-        def tile_in_indices(item_set, indices_array):
-            for x in item_set:
-                if x in indices_array:
-                    return True
-            return False
-
-        terminal_sets = 0
-        count_of_chi = 0
-        for item in hand:
-            if is_chi(item):
-                count_of_chi += 1
-
-            if tile_in_indices(item, TERMINAL_INDICES):
-                terminal_sets += 1
-
-        if count_of_chi == 0:
-            return False
-
-        return terminal_sets == 5
+        return HandFeatures(hand).is_junchan()
 
     def is_ittsu(self, hand):
         """
@@ -783,40 +854,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-
-        chi_sets = [i for i in hand if is_chi(i)]
-        if len(chi_sets) < 3:
-            return False
-
-        sou_chi = []
-        pin_chi = []
-        man_chi = []
-        for item in chi_sets:
-            if is_sou(item[0]):
-                sou_chi.append(item)
-            elif is_pin(item[0]):
-                pin_chi.append(item)
-            elif is_man(item[0]):
-                man_chi.append(item)
-
-        sets = [sou_chi, pin_chi, man_chi]
-
-        for suit_item in sets:
-            if len(suit_item) < 3:
-                continue
-
-            casted_sets = []
-
-            for set_item in suit_item:
-                # cast tiles indices to 0..8 representation
-                casted_sets.append([simplify(set_item[0]),
-                                    simplify(set_item[1]),
-                                    simplify(set_item[2])])
-
-            if [0, 1, 2] in casted_sets and [3, 4, 5] in casted_sets and [6, 7, 8] in casted_sets:
-                return True
-
-        return False
+        return HandFeatures(hand).is_ittsu()
 
     def is_sanshoku(self, hand):
         """
@@ -824,31 +862,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        chi_sets = [i for i in hand if is_chi(i)]
-        if len(chi_sets) < 3:
-            return False
-
-        sou_chi = []
-        pin_chi = []
-        man_chi = []
-        for item in chi_sets:
-            if is_sou(item[0]):
-                sou_chi.append(item)
-            elif is_pin(item[0]):
-                pin_chi.append(item)
-            elif is_man(item[0]):
-                man_chi.append(item)
-
-        for sou_item in sou_chi:
-            for pin_item in pin_chi:
-                for man_item in man_chi:
-                    # cast tile indices to 0..8 representation
-                    sou_item = [simplify(x) for x in sou_item]
-                    pin_item = [simplify(x) for x in pin_item]
-                    man_item = [simplify(x) for x in man_item]
-                    if sou_item == pin_item == man_item:
-                        return True
-        return False
+        return HandFeatures(hand).is_sanshoku()
 
     def is_sanshoku_douko(self, hand):
         """
@@ -856,31 +870,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        pon_sets = [i for i in hand if is_pon(i)]
-        if len(pon_sets) < 3:
-            return False
-
-        sou_pon = []
-        pin_pon = []
-        man_pon = []
-        for item in pon_sets:
-            if is_sou(item[0]):
-                sou_pon.append(item)
-            elif is_pin(item[0]):
-                pin_pon.append(item)
-            elif is_man(item[0]):
-                man_pon.append(item)
-
-        for sou_item in sou_pon:
-            for pin_item in pin_pon:
-                for man_item in man_pon:
-                    # cast tile indices to 1..9 representation
-                    sou_item = [simplify(x) for x in sou_item]
-                    pin_item = [simplify(x) for x in pin_item]
-                    man_item = [simplify(x) for x in man_item]
-                    if sou_item == pin_item == man_item:
-                        return True
-        return False
+        return HandFeatures(hand).is_sanshoku_douko()
 
     def is_honitsu(self, hand):
         """
@@ -888,25 +878,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        honor_sets = 0
-        sou_sets = 0
-        pin_sets = 0
-        man_sets = 0
-        for item in hand:
-            if item[0] in HONOR_INDICES:
-                honor_sets += 1
-
-            if is_sou(item[0]):
-                sou_sets += 1
-            elif is_pin(item[0]):
-                pin_sets += 1
-            elif is_man(item[0]):
-                man_sets += 1
-
-        sets = [sou_sets, pin_sets, man_sets]
-        only_one_suit = len([x for x in sets if x != 0]) == 1
-
-        return only_one_suit and honor_sets != 0
+        return HandFeatures(hand).is_honitsu()
 
     def is_chinitsu(self, hand):
         """
@@ -914,25 +886,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        honor_sets = 0
-        sou_sets = 0
-        pin_sets = 0
-        man_sets = 0
-        for item in hand:
-            if item[0] in HONOR_INDICES:
-                honor_sets += 1
-
-            if is_sou(item[0]):
-                sou_sets += 1
-            elif is_pin(item[0]):
-                pin_sets += 1
-            elif is_man(item[0]):
-                man_sets += 1
-
-        sets = [sou_sets, pin_sets, man_sets]
-        only_one_suit = len([x for x in sets if x != 0]) == 1
-
-        return only_one_suit and honor_sets == 0
+        return HandFeatures(hand).is_chinitsu()
 
     def is_haku(self, hand):
         """
@@ -940,7 +894,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        return len([x for x in hand if is_pon(x) and x[0] == HAKU]) == 1
+        return HandFeatures(hand).is_pon_of(HAKU)
 
     def is_hatsu(self, hand):
         """
@@ -948,7 +902,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        return len([x for x in hand if is_pon(x) and x[0] == HATSU]) == 1
+        return HandFeatures(hand).is_pon_of(HATSU)
 
     def is_chun(self, hand):
         """
@@ -956,7 +910,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        return len([x for x in hand if is_pon(x) and x[0] == CHUN]) == 1
+        return HandFeatures(hand).is_pon_of(CHUN)
 
     def is_east(self, hand, player_wind, round_wind):
         """
@@ -966,14 +920,7 @@ class FinishedHand(object):
         :param round_wind: index of round wind
         :return: true|false
         """
-
-        if len([x for x in hand if is_pon(x) and x[0] == player_wind]) == 1 and player_wind == EAST:
-            return True
-
-        if len([x for x in hand if is_pon(x) and x[0] == round_wind]) == 1 and round_wind == EAST:
-            return True
-
-        return False
+        return HandFeatures(hand).is_wind(EAST, player_wind, round_wind)
 
     def is_south(self, hand, player_wind, round_wind):
         """
@@ -983,14 +930,7 @@ class FinishedHand(object):
         :param round_wind: index of round wind
         :return: true|false
         """
-
-        if len([x for x in hand if is_pon(x) and x[0] == player_wind]) == 1 and player_wind == SOUTH:
-            return True
-
-        if len([x for x in hand if is_pon(x) and x[0] == round_wind]) == 1 and round_wind == SOUTH:
-            return True
-
-        return False
+        return HandFeatures(hand).is_wind(SOUTH, player_wind, round_wind)
 
     def is_west(self, hand, player_wind, round_wind):
         """
@@ -1000,14 +940,7 @@ class FinishedHand(object):
         :param round_wind: index of round wind
         :return: true|false
         """
-
-        if len([x for x in hand if is_pon(x) and x[0] == player_wind]) == 1 and player_wind == WEST:
-            return True
-
-        if len([x for x in hand if is_pon(x) and x[0] == round_wind]) == 1 and round_wind == WEST:
-            return True
-
-        return False
+        return HandFeatures(hand).is_wind(WEST, player_wind, round_wind)
 
     def is_north(self, hand, player_wind, round_wind):
         """
@@ -1017,14 +950,7 @@ class FinishedHand(object):
         :param round_wind: index of round wind
         :return: true|false
         """
-
-        if len([x for x in hand if is_pon(x) and x[0] == player_wind]) == 1 and player_wind == NORTH:
-            return True
-
-        if len([x for x in hand if is_pon(x) and x[0] == round_wind]) == 1 and round_wind == NORTH:
-            return True
-
-        return False
+        return HandFeatures(hand).is_wind(NORTH, player_wind, round_wind)
 
     def is_daisangen(self, hand):
         """
@@ -1032,11 +958,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        count_of_dragon_pon_sets = 0
-        for item in hand:
-            if is_pon(item) and item[0] in [CHUN, HAKU, HATSU]:
-                count_of_dragon_pon_sets += 1
-        return count_of_dragon_pon_sets == 3
+        return HandFeatures(hand).is_daisangen()
 
     def is_shosuushi(self, hand):
         """
@@ -1044,21 +966,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        pon_sets = [x for x in hand if is_pon(x)]
-        if len(pon_sets) < 3:
-            return False
-
-        count_of_wind_sets = 0
-        wind_pair = 0
-        winds = [EAST, SOUTH, WEST, NORTH]
-        for item in hand:
-            if is_pon(item) and item[0] in winds:
-                count_of_wind_sets += 1
-
-            if is_pair(item) and item[0] in winds:
-                wind_pair += 1
-
-        return count_of_wind_sets == 3 and wind_pair == 1
+        return HandFeatures(hand).is_shosuushi()
 
     def is_daisuushi(self, hand):
         """
@@ -1066,17 +974,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        pon_sets = [x for x in hand if is_pon(x)]
-        if len(pon_sets) != 4:
-            return False
-
-        count_wind_sets = 0
-        winds = [EAST, SOUTH, WEST, NORTH]
-        for item in pon_sets:
-            if is_pon(item) and item[0] in winds:
-                count_wind_sets += 1
-
-        return count_wind_sets == 4
+        return HandFeatures(hand).is_daisuushi()
 
     def is_tsuisou(self, hand):
         """
@@ -1084,8 +982,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        indices = reduce(lambda z, y: z + y, hand)
-        return all(x in HONOR_INDICES for x in indices)
+        return HandFeatures(hand).is_tsuisou()
 
     def is_chinroto(self, hand):
         """
@@ -1093,8 +990,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        indices = reduce(lambda z, y: z + y, hand)
-        return all(x in TERMINAL_INDICES for x in indices)
+        return HandFeatures(hand).is_chinroto()
 
     def is_kokushi(self, tiles_34):
         """
@@ -1114,9 +1010,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-        green_indices = [19, 20, 21, 23, 25, HATSU]
-        indices = reduce(lambda z, y: z + y, hand)
-        return all(x in green_indices for x in indices)
+        return HandFeatures(hand).is_ryuisou()
 
     def is_suuankou(self, win_tile, hand, is_tsumo):
         """
@@ -1126,17 +1020,7 @@ class FinishedHand(object):
         :param is_tsumo:
         :return: true|false
         """
-        win_tile //= 4
-        closed_hand = []
-        for item in hand:
-            # if we do the ron on syanpon wait our pon will be consider as open
-            if is_pon(item) and win_tile in item and not is_tsumo:
-                continue
-
-            closed_hand.append(item)
-
-        count_of_pon = len([i for i in closed_hand if is_pon(i)])
-        return count_of_pon == 4
+        return HandFeatures(hand).is_suuankou(win_tile // 4, is_tsumo)
 
     def is_chuuren_poutou(self, hand):
         """
@@ -1144,51 +1028,7 @@ class FinishedHand(object):
         :param hand: list of hand's sets
         :return: true|false
         """
-
-        sou_sets = 0
-        pin_sets = 0
-        man_sets = 0
-        honor_sets = 0
-        for item in hand:
-            if is_sou(item[0]):
-                sou_sets += 1
-            elif is_pin(item[0]):
-                pin_sets += 1
-            elif is_man(item[0]):
-                man_sets += 1
-            else:
-                honor_sets += 1
-
-        sets = [sou_sets, pin_sets, man_sets]
-        only_one_suit = len([x for x in sets if x != 0]) == 1
-        if not only_one_suit or honor_sets > 0:
-            return False
-
-        indices = reduce(lambda z, y: z + y, hand)
-        # cast tile indices to 0..8 representation
-        indices = [simplify(x) for x in indices]
-
-        # 1-1-1
-        if len([x for x in indices if x == 0]) < 3:
-            return False
-
-        # 9-9-9
-        if len([x for x in indices if x == 8]) < 3:
-            return False
-
-        # 1-2-3-4-5-6-7-8-9 and one tile to any of them
-        indices.remove(0)
-        indices.remove(0)
-        indices.remove(8)
-        indices.remove(8)
-        for x in range(0, 9):
-            if x in indices:
-                indices.remove(x)
-
-        if len(indices) == 1:
-            return True
-
-        return False
+        return HandFeatures(hand).is_chuuren_poutou()
 
     def is_suukantsu(self, hand, called_kan_indices):
         """
@@ -1197,16 +1037,7 @@ class FinishedHand(object):
         :param called_kan_indices: array of 34 tiles format
         :return: true|false
         """
-        if len(called_kan_indices) != 4:
-            return False
-
-        pon_sets = [i for i in hand if is_pon(i)]
-        count_of_kan_sets = 0
-        for item in pon_sets:
-            if item[0] in called_kan_indices:
-                count_of_kan_sets += 1
-
-        return count_of_kan_sets == 4
+        return HandFeatures(hand).is_suukantsu(called_kan_indices)
 
 
 class HandDivider(object):
@@ -1214,11 +1045,13 @@ class HandDivider(object):
     def divide_hand(self, tiles_34, open_sets, called_kan_indices):
         """
         Return a list of possible hands.
-        :param tiles_34:
+        :param tiles_34: 34 tiles format array or PackedHand
         :param open_sets: list of array with 34 arrays
         :param called_kan_indices: list of array with 34 tiles
         :return:
         """
+        if isinstance(tiles_34, PackedHand):
+            tiles_34 = tiles_34.to_34_array()
 
         # small optimization, we can't have a pair in open part of the hand,
         # so we don't need to try find pairs in open sets
@@ -1338,88 +1171,14 @@ class HandDivider(object):
         :param second_index:
         :return: list of valid combinations
         """
-        indices = []
+        key = 0
         for x in range(first_index, second_index + 1):
-            if tiles_34[x] > 0:
-                indices.extend([x] * tiles_34[x])
-
-        if not indices:
-            return []
-
-        all_possible_combinations = list(itertools.permutations(indices, 3))
-
-        def is_valid_combination(possible_set):
-            if is_chi(possible_set):
-                return True
-
-            if is_pon(possible_set):
-                return True
-
-            return False
-
-        valid_combinations = []
-        for combination in all_possible_combinations:
-            if is_valid_combination(combination):
-                valid_combinations.append(list(combination))
+            key |= tiles_34[x] << (x - first_index) * 3
 
-        if not valid_combinations:
+        if not key:
             return []
 
-        count_of_needed_combinations = int(len(indices) / 3)
-
-        # simple case, we have count of sets == count of tiles
-        if count_of_needed_combinations == len(valid_combinations) and \
-                reduce(lambda z, y: z + y, valid_combinations) == indices:
-            return [valid_combinations]
-
-        # filter and remove not possible pon sets
-        for item in valid_combinations:
-            if is_pon(item):
-                count_of_sets = 1
-                count_of_tiles = 0
-                while count_of_sets > count_of_tiles:
-                    count_of_tiles = len([x for x in indices if x == item[0]]) / 3
-                    count_of_sets = len([x for x in valid_combinations
-                                         if x[0] == item[0] and x[1] == item[1] and x[2] == item[2]])
-
-                    if count_of_sets > count_of_tiles:
-                        valid_combinations.remove(item)
-
-        # filter and remove not possible chi sets
-        for item in valid_combinations:
-            if is_chi(item):
-                count_of_sets = 5
-                # TODO calculate real count of possible sets
-                count_of_possible_sets = 4
-                while count_of_sets > count_of_possible_sets:
-                    count_of_sets = len([x for x in valid_combinations
-                                         if x[0] == item[0] and x[1] == item[1] and x[2] == item[2]])
-
-                    if count_of_sets > count_of_possible_sets:
-                        valid_combinations.remove(item)
-
-        # hard case - we can build a lot of sets from our tiles
-        # for example we have 123456 tiles and we can build sets:
-        # [1, 2, 3] [4, 5, 6] [2, 3, 4] [3, 4, 5]
-        # and only two of them valid in the same time [1, 2, 3] [4, 5, 6]
-
-        possible_combinations = set(itertools.permutations(
-            range(0, len(valid_combinations)), count_of_needed_combinations
-        ))
-
-        combinations_results = []
-        for combination in possible_combinations:
-            result = []
-            for item in combination:
-                result += valid_combinations[item]
-            result = sorted(result)
-
-            if result == indices:
-                results = []
-                for item in combination:
-                    results.append(valid_combinations[item])
-                results = sorted(results, key=lambda z: z[0])
-                if results not in combinations_results:
-                    combinations_results.append(results)
-
-        return combinations_results
+        # suits with a pair have 3n + 2 tiles, so here we get only decompositions to sets
+        return [[[first_index + x for x in item] for item in combination]
+                for combination in decomposition_table().get(key)
+                if all([len(x) == 3 for x in combination])]
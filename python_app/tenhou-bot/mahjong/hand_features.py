@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Bit masks of one hand option, they are calculated once
+and every yaku check after that is a few bit operations.
+
+Every mask has one bit per 34 tile index.
+Chi sets are stored by the index of their first tile.
+"""
+from mahjong.constants import TERMINAL_INDICES, HONOR_INDICES, EAST, SOUTH, WEST, NORTH, HAKU, HATSU, CHUN
+
+
+def tiles_mask(indices):
+    mask = 0
+    for x in indices:
+        mask |= 1 << x
+    return mask
+
+
+SUIT_MASK = (1 << 9) - 1
+TERMINALS_MASK = tiles_mask(TERMINAL_INDICES)
+HONORS_MASK = tiles_mask(HONOR_INDICES)
+TERMINALS_AND_HONORS_MASK = TERMINALS_MASK | HONORS_MASK
+WINDS_MASK = tiles_mask([EAST, SOUTH, WEST, NORTH])
+DRAGONS_MASK = tiles_mask([HAKU, HATSU, CHUN])
+GREEN_MASK = tiles_mask([19, 20, 21, 23, 25, HATSU])
+# 123, 456 and 789 chi sets of the first suit
+ITTSU_MASK = tiles_mask([0, 3, 6])
+
+# suits of the first tile of the set: sou, pin, man and honors
+HONORS_SUIT = 3
+NUMBER_SUITS_MASK = 7
+
+
+def count_of_bits(mask):
+    return bin(mask).count('1')
+
+
+class HandFeatures(object):
+    """
+    :param hand: list of hand's sets
+    """
+    __slots__ = ('chi_mask', 'pon_mask', 'pair_mask', 'tiles_mask', 'suits_mask', 'counts',
+                 'count_of_chi', 'count_of_pon', 'count_of_sets', 'count_of_tiles',
+                 'identical_chi', 'terminal_sets', 'honor_sets')
+
+    def __init__(self, hand):
+        self.chi_mask = 0
+        self.pon_mask = 0
+        self.pair_mask = 0
+        self.tiles_mask = 0
+        self.suits_mask = 0
+        self.counts = [0] * 34
+        self.count_of_chi = 0
+        self.count_of_pon = 0
+        self.count_of_sets = len(hand)
+        self.count_of_tiles = 0
+        self.terminal_sets = 0
+        self.honor_sets = 0
+
+        chi_counts = {}
+        for item in hand:
+            first = item[0]
+            self.suits_mask |= 1 << min(first // 9, HONORS_SUIT)
+
+            if len(item) == 2:
+                self.pair_mask |= 1 << first
+            elif len(item) == 3 and first == item[1] == item[2]:
+                self.pon_mask |= 1 << first
+                self.count_of_pon += 1
+            elif len(item) == 3 and first == item[1] - 1 == item[2] - 2:
+                self.chi_mask |= 1 << first
+                self.count_of_chi += 1
+                chi_counts[first] = chi_counts.get(first, 0) + 1
+
+            item_mask = 0
+            for tile in item:
+                self.counts[tile] += 1
+                item_mask |= 1 << tile
+            self.tiles_mask |= item_mask
+            self.count_of_tiles += len(item)
+
+            if item_mask & TERMINALS_MASK:
+                self.terminal_sets += 1
+            if item_mask & HONORS_MASK:
+                self.honor_sets += 1
+
+        # count of chi sets that have the same chi in the hand
+        self.identical_chi = sum([x for x in chi_counts.values() if x >= 2])
+
+    def is_chitoitsu(self):
+        return self.count_of_sets == 7
+
+    def is_tanyao(self):
+        return not self.tiles_mask & TERMINALS_AND_HONORS_MASK
+
+    def is_iipeiko(self):
+        return self.identical_chi >= 2
+
+    def is_ryanpeiko(self):
+        return self.identical_chi == 4
+
+    def is_toitoi(self):
+        return self.count_of_pon == 4
+
+    def is_sankantsu(self, called_kan_indices):
+        if len(called_kan_indices) != 3:
+            return False
+        return count_of_bits(self.pon_mask & tiles_mask(called_kan_indices)) == 3
+
+    def is_suukantsu(self, called_kan_indices):
+        if len(called_kan_indices) != 4:
+            return False
+        return count_of_bits(self.pon_mask & tiles_mask(called_kan_indices)) == 4
+
+    def is_honroto(self):
+        return not self.tiles_mask & ~TERMINALS_AND_HONORS_MASK
+
+    def is_tsuisou(self):
+        return not self.tiles_mask & ~HONORS_MASK
+
+    def is_chinroto(self):
+        return not self.tiles_mask & ~TERMINALS_MASK
+
+    def is_ryuisou(self):
+        return not self.tiles_mask & ~GREEN_MASK
+
+    def is_sanankou(self, win_tile, open_sets, is_tsumo):
+        """
+        :param win_tile: 34 tiles format
+        :param open_sets: list of open sets in 34 tiles format
+        """
+        open_pon_mask = tiles_mask([x[0] for x in open_sets if x[0] == x[1]])
+        open_chi_mask = tiles_mask([x[0] for x in open_sets if x[0] != x[1]])
+        closed_pon_mask = self.pon_mask & ~open_pon_mask
+
+        # if we do the ron on syanpon wait our pon will be consider as open
+        # and it is not 789999 set
+        if not is_tsumo and not (self.chi_mask & ~open_chi_mask & self._chi_with_tile_mask(win_tile)):
+            closed_pon_mask &= ~(1 << win_tile)
+
+        return count_of_bits(closed_pon_mask) == 3
+
+    def is_suuankou(self, win_tile, is_tsumo):
+        """
+        :param win_tile: 34 tiles format
+        """
+        closed_pon_mask = self.pon_mask
+        # if we do the ron on syanpon wait our pon will be consider as open
+        if not is_tsumo:
+            closed_pon_mask &= ~(1 << win_tile)
+        return count_of_bits(closed_pon_mask) == 4
+
+    def is_shosangen(self):
+        return count_of_bits((self.pon_mask | self.pair_mask) & DRAGONS_MASK) == 3
+
+    def is_daisangen(self):
+        return count_of_bits(self.pon_mask & DRAGONS_MASK) == 3
+
+    def is_shosuushi(self):
+        if self.count_of_pon < 3:
+            return False
+        return count_of_bits(self.pon_mask & WINDS_MASK) == 3 and count_of_bits(self.pair_mask & WINDS_MASK) == 1
+
+    def is_daisuushi(self):
+        return self.count_of_pon == 4 and count_of_bits(self.pon_mask & WINDS_MASK) == 4
+
+    def is_chanta(self):
+        if not self.count_of_chi:
+            return False
+        return self.terminal_sets + self.honor_sets == 5 and self.terminal_sets != 0 and self.honor_sets != 0
+
+    def is_junchan(self):
+        if not self.count_of_chi:
+            return False
+        return self.terminal_sets == 5
+
+    def is_ittsu(self):
+        if self.count_of_chi < 3:
+            return False
+
+        for suit in range(0, 3):
+            if (self.chi_mask >> suit * 9) & ITTSU_MASK == ITTSU_MASK:
+                return True
+        return False
+
+    def is_sanshoku(self):
+        if self.count_of_chi < 3:
+            return False
+        return bool(self._same_in_three_suits(self.chi_mask))
+
+    def is_sanshoku_douko(self):
+        if self.count_of_pon < 3:
+            return False
+        return bool(self._same_in_three_suits(self.pon_mask))
+
+    def is_honitsu(self):
+        return count_of_bits(self.suits_mask & NUMBER_SUITS_MASK) == 1 and bool(self.suits_mask >> HONORS_SUIT)
+
+    def is_chinitsu(self):
+        return count_of_bits(self.suits_mask & NUMBER_SUITS_MASK) == 1 and not self.suits_mask >> HONORS_SUIT
+
+    def is_pon_of(self, tile):
+        """
+        :param tile: 34 tiles format, it can be None for the unknown wind
+        """
+        return tile is not None and bool((self.pon_mask >> tile) & 1)
+
+    def is_wind(self, wind, player_wind, round_wind):
+        """
+        Pon of the wind, when it is player or round wind
+        """
+        return (player_wind == wind and self.is_pon_of(player_wind)) or \
+            (round_wind == wind and self.is_pon_of(round_wind))
+
+    def is_chuuren_poutou(self):
+        if self.suits_mask >> HONORS_SUIT or count_of_bits(self.suits_mask) != 1:
+            return False
+
+        suit = count_of_bits(self.suits_mask - 1) * 9
+        counts = self.counts[suit:suit + 9]
+        # 1-1-1, 9-9-9, 2-3-4-5-6-7-8 and one tile to any of them
+        if counts[0] < 3 or counts[8] < 3 or not all(counts[1:8]):
+            return False
+        return self.count_of_tiles == 14
+
+    def _chi_with_tile_mask(self, tile):
+        """
+        :return: mask of the first tiles of chi sets that contain the tile
+        """
+        if tile >= 27:
+            return 0
+        first = tile - tile % 9
+        mask = 0
+        for start in range(max(first, tile - 2), min(tile, first + 6) + 1):
+            mask |= 1 << start
+        return mask
+
+    def _same_in_three_suits(self, mask):
+        return mask & (mask >> 9) & (mask >> 18) & SUIT_MASK
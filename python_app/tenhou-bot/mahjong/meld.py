@@ -8,10 +8,13 @@ class Meld(object):
     CHAKAN = 'chakan'
     NUKI = 'nuki'
 
-    who = None
-    tiles = []
-    type = None
-    from_who = None
+    __slots__ = ('who', 'tiles', 'type', 'from_who')
+
+    def __init__(self):
+        self.who = None
+        self.tiles = []
+        self.type = None
+        self.from_who = None
 
     def __str__(self):
         return 'Who: {0}, Type: {1}, Tiles: {2}'.format(self.who, self.type, self.tiles)
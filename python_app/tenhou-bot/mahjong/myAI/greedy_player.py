@@ -11,6 +11,7 @@ from libgames import *
 
 from mahjong.ai.agari import Agari
 from mahjong.ai.base import BaseAI
+from mahjong.ai.cache import shanten_cache
 from mahjong.ai.defence import Defence
 from mahjong.ai.shanten import Shanten
 from mahjong.tile import TilesConverter
@@ -20,7 +21,7 @@ class GreedyAII(BaseAI):
 
     def __init__(self, table, player):
         super(GreedyAII, self).__init__(table, player)
-        self.shanten = Shanten()
+        self.shanten = Shanten(shanten_cache)
 
     def discard_tile(self):
         gd_player = GreedyPlayer("Me")
@@ -11,13 +11,21 @@ from libgames import *
 from keras.models import load_model
 
 import numpy as np
+import tensorflow as tf
 
 from mahjong.ai.agari import Agari
 from mahjong.ai.base import BaseAI
+from mahjong.ai.cache import shanten_cache
 from mahjong.ai.defence import Defence
 from mahjong.ai.shanten import Shanten
 from mahjong.tile import TilesConverter
 
+MODEL_FILE = "../supervised_learning/cnn_model.h5"
+WEIGHTS_FILE = "../supervised_learning/cnn_weights.h5"
+
+# the model is loaded once per process and it is shared by the all players of the all tables
+_model = None
+
 
 def expandHandToCSV(byte_hand):
     ret_hand = []
@@ -41,19 +49,55 @@ def transformCSVHandToCNNMatrix(csv_hand):
         return csv_hand[0][:224].reshape(csv_hand.shape[0], 14, 16, 1)
 
 
+class SharedModel(object):
+    """
+    Keras model that can be called from any thread.
+    Tensorflow graph is not shared between the threads, so the predict function
+    is built in the loading thread and every call is made in the graph of the model
+    """
+
+    def __init__(self, model, graph):
+        self.model = model
+        self.graph = graph
+
+    def predict(self, inputs, **kwargs):
+        with self.graph.as_default():
+            return self.model.predict(inputs, **kwargs)
+
+
+def get_model():
+    global _model
+    if _model is None:
+        model = load_model(MODEL_FILE)
+        model.load_weights(WEIGHTS_FILE)
+        model._make_predict_function()
+        _model = SharedModel(model, tf.get_default_graph())
+    return _model
+
+
 class SLCNNPlayer(BaseAI):
     version = '0.0.2'
 
     def __init__(self, table, player):
         super(SLCNNPlayer, self).__init__(table, player)
-        self.model = load_model("../supervised_learning/cnn_model.h5")
-        self.model.load_weights("../supervised_learning/cnn_weights.h5")
-        self.shanten = Shanten()
+        self.model = get_model()
+        self.shanten = Shanten(shanten_cache)
 
     def mahjong_tile_to_discard_tile(self, t):
         return TilesConverter.find_34_tile_in_136_array(
             t.get_number() + (t.get_type() >> 4) * 9 - 1, self.player.tiles)
 
+    def discard_model_input(self):
+        h = Hand(TilesConverter.to_one_line_string(self.player.tiles))
+        if h.test_win() or self.player.in_tempai:
+            return None
+
+        tiles = TilesConverter.to_34_array(self.player.tiles)
+        if self.shanten.calculate_shanten(tiles) == 0:
+            return None
+
+        return transformCSVHandToCNNMatrix(expandHandToCSV(h.get_data()))
+
     def discard_tile(self):
         h = Hand(TilesConverter.to_one_line_string(self.player.tiles))
 
@@ -71,8 +115,11 @@ class SLCNNPlayer(BaseAI):
             return tile_in_hand
         else:
             hand_data = h.get_data()
-            it = int(self.model.predict_classes(
-                transformCSVHandToCNNMatrix(expandHandToCSV(hand_data)), verbose=0)[0])
+            prediction = self.prediction
+            self.prediction = None
+            if prediction is None:
+                prediction = self.model.predict(transformCSVHandToCNNMatrix(expandHandToCSV(hand_data)), verbose=0)[0]
+            it = int(np.argmax(prediction))
             t = hand_data[it]
             tile_in_hand = self.mahjong_tile_to_discard_tile(t)
             return tile_in_hand
@@ -81,63 +128,4 @@ class SLCNNPlayer(BaseAI):
     Adding this bit for calculating which tile to discard when calling Richii.
     '''
     def calculate_outs(self):
-        tiles = TilesConverter.to_34_array(self.player.tiles)
-
-        shanten = self.shanten.calculate_shanten(tiles)
-        # win
-        if shanten == Shanten.AGARI_STATE:
-            return [], shanten
-
-        raw_data = {}
-        for i in range(0, 34):
-            if not tiles[i]:
-                continue
-
-            tiles[i] -= 1
-
-            raw_data[i] = []
-            for j in range(0, 34):
-                if i == j or tiles[j] >= 4:
-                    continue
-
-                tiles[j] += 1
-                if self.shanten.calculate_shanten(tiles) == shanten - 1:
-                    raw_data[i].append(j)
-                tiles[j] -= 1
-
-            tiles[i] += 1
-
-            if raw_data[i]:
-                raw_data[i] = {'tile': i,
-                               'tiles_count': self.count_tiles(raw_data[i], tiles),
-                               'waiting': raw_data[i]}
-
-        results = []
-        tiles = TilesConverter.to_34_array(self.player.tiles)
-        for tile in range(0, len(tiles)):
-            if tile in raw_data and raw_data[tile] and raw_data[tile]['tiles_count']:
-                item = raw_data[tile]
-
-                waiting = []
-
-                for item2 in item['waiting']:
-                    waiting.append(item2)
-
-                results.append({
-                    'discard': item['tile'],
-                    'waiting': waiting,
-                    'tiles_count': item['tiles_count']
-                })
-
-        # if we have character and honor candidates to discard with same tiles count,
-        # we need to discard honor tile first
-        results = sorted(results, key=lambda x: (x['tiles_count'], x['discard']), reverse=True)
-
-        return results, shanten
-
-    def count_tiles(self, raw_data, tiles):
-        n = 0
-        for i in range(0, len(raw_data)):
-            n += 4 - tiles[raw_data[i]]
-        return n
-
+        return self.player.hand_analyzer.outs()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from mahjong.tile import TilesConverter
+
+SUIT_BITS = 27
+SUIT_MASK = (1 << SUIT_BITS) - 1
+
+
+class PackedHand(object):
+    """
+    Immutable hand value.
+    counts - 34 tile counts in one int, 3 bits per tile (the same layout as Agari._to_meld),
+    owned - optional bitset of 136 tiles, when we know the exact tiles of the hand.
+    Every suit takes 27 bits of counts, so the suit can be extracted with one shift and mask.
+    """
+    __slots__ = ('counts', 'owned', 'count_of_tiles')
+
+    def __init__(self, counts=0, owned=None, count_of_tiles=None):
+        self.counts = counts
+        self.owned = owned
+        if count_of_tiles is None:
+            count_of_tiles = sum(self)
+        self.count_of_tiles = count_of_tiles
+
+    @staticmethod
+    def from_34_array(tiles):
+        counts = 0
+        for count in reversed(tiles):
+            counts = (counts << 3) | count
+        return PackedHand(counts, None, sum(tiles))
+
+    @staticmethod
+    def from_136_array(tiles):
+        """
+        Tests build hands with the same 136 tile repeated,
+        for such hands we keep only counts
+        """
+        counts = 0
+        owned = 0
+        for tile in tiles:
+            counts += 1 << (tile // 4 * 3)
+            owned |= 1 << tile
+        if bin(owned).count('1') != len(tiles):
+            owned = None
+        return PackedHand(counts, owned, len(tiles))
+
+    def add_tile(self, tile):
+        """
+        :param tile: 136 tile format
+        :return: new hand with the tile
+        """
+        owned = self.owned
+        if owned is not None:
+            if (owned >> tile) & 1:
+                owned = None
+            else:
+                owned |= 1 << tile
+        return PackedHand(self.counts + (1 << (tile // 4 * 3)), owned, self.count_of_tiles + 1)
+
+    def remove_tile(self, tile):
+        """
+        :param tile: 136 tile format
+        :return: new hand without the tile
+        """
+        owned = self.owned
+        if owned is not None:
+            if not (owned >> tile) & 1:
+                raise ValueError('Tile {0} is not in the hand'.format(tile))
+            owned &= ~(1 << tile)
+        elif not self.count(tile // 4):
+            raise ValueError('Tile {0} is not in the hand'.format(tile))
+        return PackedHand(self.counts - (1 << (tile // 4 * 3)), owned, self.count_of_tiles - 1)
+
+    def add_34(self, tile34):
+        """
+        We don't know which one of 136 tiles was added,
+        so the new hand doesn't have the ownership bitset
+        """
+        return PackedHand(self.counts + (1 << (tile34 * 3)), None, self.count_of_tiles + 1)
+
+    def remove_34(self, tile34):
+        if not self.count(tile34):
+            raise ValueError('Tile {0} is not in the hand'.format(tile34))
+        return PackedHand(self.counts - (1 << (tile34 * 3)), None, self.count_of_tiles - 1)
+
+    def count(self, tile34):
+        return (self.counts >> (tile34 * 3)) & 7
+
+    def suit_counts(self, suit):
+        """
+        :param suit: 0 - man, 1 - pin, 2 - sou, 3 - honors
+        :return: packed counts of the suit, 3 bits per tile
+        """
+        return (self.counts >> (suit * SUIT_BITS)) & SUIT_MASK
+
+    def to_34_array(self):
+        return list(self)
+
+    def to_136_array(self):
+        if self.owned is None:
+            raise ValueError('Hand was built without 136 tiles')
+        return [x for x in range(0, 136) if (self.owned >> x) & 1]
+
+    def __getitem__(self, tile34):
+        return (self.counts >> (tile34 * 3)) & 7
+
+    def __iter__(self):
+        counts = self.counts
+        for _ in range(0, 34):
+            yield counts & 7
+            counts >>= 3
+
+    def __eq__(self, other):
+        return isinstance(other, PackedHand) and self.counts == other.counts and self.owned == other.owned
+
+    def __hash__(self):
+        return hash((self.counts, self.owned))
+
+    def __str__(self):
+        if self.owned is not None:
+            return TilesConverter.to_one_line_string(self.to_136_array())
+        return TilesConverter.to_one_line_string([x * 4 for x in range(0, 34) for _ in range(0, self[x])])
+
+    def __repr__(self):
+        return 'PackedHand({0})'.format(self)
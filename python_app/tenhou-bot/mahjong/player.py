@@ -1,46 +1,63 @@
 # -*- coding: utf-8 -*-
+import bisect
 import logging
 import random
+import struct
 
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from utils.settings_handler import settings
+from mahjong.ai.hand_analyzer import HandAnalyzer
 from mahjong.ai.shanten import Shanten
-from mahjong.tile import Tile
+from mahjong.meld import Meld
+from mahjong.packed_hand import PackedHand
+from mahjong.tile import Tile, TilesConverter
 
 logger = logging.getLogger('tenhou')
 
+# scores, uma, position, dealer seat, flags, waiting mask
+# and counts of tiles, discards, safe tiles and melds
+PLAYER_STATE = struct.Struct('<idBBBQBBBB')
+# type, who, from who and count of tiles
+MELD_STATE = struct.Struct('<BBBB')
+MELD_TYPES = [None, Meld.CHI, Meld.PON, Meld.KAN, Meld.CHAKAN, Meld.NUKI]
+# meld without who or from who
+NO_SEAT = 255
+
+
 class Player(object):
-    # the place where is player is sitting
-    # always = 0 for our player
-    seat = 0
-    # where is sitting dealer, based on this information we can calculate player wind
-    dealer_seat = 0
-    # position based on scores
-    position = 0
-    scores = 0
-    uma = 0
-
-    name = ''
-    rank = ''
-
-    discards = []
-    # tiles that were discarded after player's riichi
-    safe_tiles = []
-    tiles = []
-    melds = []
-    table = None
-    in_tempai = False
-    in_riichi = False
-    in_defence_mode = False
+    __slots__ = ('seat', 'dealer_seat', 'position', 'scores', 'uma', 'name', 'rank',
+                 'discards', 'safe_tiles', 'tiles', 'melds', 'packed_hand', 'hand_analyzer', 'waiting_mask',
+                 'table', 'in_tempai', 'in_riichi', 'in_defence_mode', 'ai')
 
     def __init__(self, seat, dealer_seat, table, use_previous_ai_version=False):
+        # the place where is player is sitting
+        # always = 0 for our player
+        self.seat = seat
+        # where is sitting dealer, based on this information we can calculate player wind
+        self.dealer_seat = dealer_seat
+        # position based on scores
+        self.position = 0
+        self.scores = 0
+        self.uma = 0
+
+        self.name = ''
+        self.rank = ''
+
         self.discards = []
-        self.melds = []
-        self.tiles = []
+        # tiles that were discarded after player's riichi
         self.safe_tiles = []
-        self.seat = seat
+        self.tiles = []
+        self.melds = []
+        # the same closed hand as tiles, but in the packed format
+        self.packed_hand = PackedHand(0, 0, 0)
+        # suit state of the closed hand, it is updated with each draw and discard
+        self.hand_analyzer = HandAnalyzer()
+        # 34 bits of tiles that complete the closed hand, it is updated with each hand change
+        self.waiting_mask = 0
         self.table = table
-        self.dealer_seat = dealer_seat
+        self.in_tempai = False
+        self.in_riichi = False
+        self.in_defence_mode = False
 
         if use_previous_ai_version:
             try:
@@ -58,7 +75,9 @@ class Player(object):
 
         from mahjong.myAI.slcnn_player import SLCNNPlayer
         from mahjong.myAI.greedy_player import GreedyAII
-        self.ai = random.choice([MainAI(table, self), SLCNNPlayer(table, self)])
+        # only the chosen AI is created, models are shared between the all players
+        ai_class = random.choice([MainAI, SLCNNPlayer])
+        self.ai = ai_class(table, self)
         #self.ai = SLCNNPlayer(table, self)
         #self.ai = GreedyAII(table, self)
         #from time import sleep
@@ -79,37 +98,79 @@ class Player(object):
     def __repr__(self):
         return self.__str__()
 
-    def add_meld(self, meld):
+    def add_meld(self, meld, called_tile=None):
+        """
+        :param called_tile: 136 tiles format, tile from the other player discard
+        """
+        tiles = meld.tiles
+        # pon tiles of the chakan are already in the index, only the added tile is new
+        if meld.type == Meld.CHAKAN:
+            tiles = [x for x in tiles if not any(x in item.tiles for item in self.melds)]
+
         self.melds.append(meld)
+        self.table.index.add_meld(self.seat, tiles, called_tile)
+        self._update_waiting_mask()
 
     def add_discarded_tile(self, tile):
         self.discards.append(Tile(tile))
+        self.table.index.add_discard(self.seat, tile)
 
     def init_hand(self, tiles):
-        self.tiles = [Tile(i) for i in tiles]
+        self.tiles = sorted([Tile(i) for i in tiles])
+        self.packed_hand = PackedHand.from_136_array(tiles)
+        self.hand_analyzer.init_hand(TilesConverter.to_34_array(self.tiles))
+        self._update_waiting_mask()
 
     def draw_tile(self, tile):
-        self.tiles.append(Tile(tile))
-        # we need sort it to have a better string presentation
-        self.tiles = sorted(self.tiles)
+        # we need to keep it sorted to have a better string presentation
+        bisect.insort(self.tiles, Tile(tile))
+        self.packed_hand = self.packed_hand.add_tile(tile)
+        self.hand_analyzer.draw(tile // 4)
+        self._update_waiting_mask()
 
     def discard_tile(self):
         tile_to_discard = self.ai.discard_tile()
         if tile_to_discard != Shanten.AGARI_STATE:
             self.add_discarded_tile(tile_to_discard)
             self.tiles.remove(tile_to_discard)
+            self.packed_hand = self.packed_hand.remove_tile(tile_to_discard)
+            self.hand_analyzer.discard(tile_to_discard // 4)
+            self._update_waiting_mask()
         return tile_to_discard
 
     def erase_state(self):
         self.discards = []
         self.melds = []
         self.tiles = []
+        self.packed_hand = PackedHand(0, 0, 0)
+        self.hand_analyzer.init_hand([0] * 34)
+        self.waiting_mask = 0
         self.safe_tiles = []
         self.in_tempai = False
         self.in_riichi = False
         self.in_defence_mode = False
         self.dealer_seat = 0
 
+    def is_waiting_on(self, tile):
+        """
+        :param tile: 136 tile format
+        :return: boolean, will the tile complete the hand or not
+        """
+        return bool((self.waiting_mask >> (tile // 4)) & 1)
+
+    def waiting_tiles(self):
+        """
+        :return: list of 34 tile indices that complete the hand
+        """
+        return [x for x in range(0, 34) if (self.waiting_mask >> x) & 1]
+
+    @property
+    def is_furiten(self):
+        discards_mask = 0
+        for tile in self.discards:
+            discards_mask |= 1 << (tile // 4)
+        return bool(self.waiting_mask & discards_mask)
+
     def can_call_riichi(self):
         return all([
             self.in_tempai,
@@ -118,6 +179,70 @@ class Player(object):
             self.table.count_of_remaining_tiles > 4
         ])
 
+    def snapshot(self):
+        """
+        Round state of the player, the AI state is not stored
+        :return: bytes, the tiles are stored as one byte per tile
+        """
+        flags = self.in_tempai | self.in_riichi << 1 | self.in_defence_mode << 2
+        data = [
+            PLAYER_STATE.pack(int(self.scores), self.uma, self.position, self.dealer_seat, flags, self.waiting_mask,
+                              len(self.tiles), len(self.discards), len(self.safe_tiles), len(self.melds)),
+            bytes(self.tiles),
+            bytes(self.discards),
+            bytes(self.safe_tiles),
+        ]
+        for meld in self.melds:
+            data.append(MELD_STATE.pack(MELD_TYPES.index(meld.type),
+                                        NO_SEAT if meld.who is None else meld.who,
+                                        NO_SEAT if meld.from_who is None else meld.from_who,
+                                        len(meld.tiles)))
+            data.append(bytes(meld.tiles))
+        return b''.join(data)
+
+    def restore(self, data, offset=0):
+        """
+        :param data: bytes from the snapshot method
+        :param offset: position of the player state in the data
+        :return: position after the player state
+        """
+        state = PLAYER_STATE.unpack_from(data, offset)
+        (self.scores, self.uma, self.position, self.dealer_seat, flags, self.waiting_mask,
+         count_of_tiles, count_of_discards, count_of_safe_tiles, count_of_melds) = state
+        self.in_tempai = bool(flags & 1)
+        self.in_riichi = bool(flags & 2)
+        self.in_defence_mode = bool(flags & 4)
+        offset += PLAYER_STATE.size
+
+        self.tiles = [Tile(x) for x in data[offset:offset + count_of_tiles]]
+        offset += count_of_tiles
+        self.discards = [Tile(x) for x in data[offset:offset + count_of_discards]]
+        offset += count_of_discards
+        self.safe_tiles = list(data[offset:offset + count_of_safe_tiles])
+        offset += count_of_safe_tiles
+
+        self.melds = []
+        for _ in range(0, count_of_melds):
+            meld_type, who, from_who, count_of_meld_tiles = MELD_STATE.unpack_from(data, offset)
+            offset += MELD_STATE.size
+
+            meld = Meld()
+            meld.type = MELD_TYPES[meld_type]
+            meld.who = None if who == NO_SEAT else who
+            meld.from_who = None if from_who == NO_SEAT else from_who
+            meld.tiles = list(data[offset:offset + count_of_meld_tiles])
+            offset += count_of_meld_tiles
+            self.melds.append(meld)
+
+        self.packed_hand = PackedHand.from_136_array(self.tiles)
+        # we don't know enemies hands, so their analyzers are always empty
+        if self.tiles or self.hand_analyzer.count_of_tiles:
+            self.hand_analyzer.init_hand(TilesConverter.to_34_array(self.tiles))
+        return offset
+
+    def _update_waiting_mask(self):
+        self.waiting_mask = self.hand_analyzer.waiting_mask()
+
     @property
     def player_wind(self):
         position = self.dealer_seat
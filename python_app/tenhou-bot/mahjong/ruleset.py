@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+
+from mahjong.constants import FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU
+from utils.settings_handler import settings
+
+AKA_DORA_TILES = frozenset([FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU])
+NO_AKA_DORA_TILES = frozenset()
+
+
+class Ruleset(namedtuple('Ruleset', ['aka_dora', 'open_tanyao', 'hanchan', 'sanma', 'fast'])):
+    """
+    Game rules that change the hand value and the game flow.
+    It is immutable and hashable, so it can be shared between tables
+    and it can be a part of the cache keys.
+
+    Tenhou GO type bits:
+      0 - 1 - online, 0 - bots
+      1 - aka forbidden
+      2 - kuitan forbidden
+      3 - hanchan
+      4 - 3man
+      5 - dan flag
+      6 - fast game
+      7 - dan flag
+    """
+    __slots__ = ()
+
+    def __new__(cls, aka_dora=False, open_tanyao=True, hanchan=True, sanma=False, fast=False):
+        return super(Ruleset, cls).__new__(cls, aka_dora, open_tanyao, hanchan, sanma, fast)
+
+    @classmethod
+    def from_game_type(cls, game_type):
+        """
+        :param game_type: int or string with the tenhou GO type
+        :return: Ruleset
+        """
+        game_type = int(game_type)
+        return cls(aka_dora=not game_type & 0x02,
+                   open_tanyao=not game_type & 0x04,
+                   hanchan=bool(game_type & 0x08),
+                   sanma=bool(game_type & 0x10),
+                   fast=bool(game_type & 0x40))
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Rules of the settings game type with the red fives and the open tanyao from the settings
+        """
+        ruleset = cls.from_game_type(settings.GAME_TYPE)
+        return ruleset._replace(aka_dora=settings.FIVE_REDS, open_tanyao=settings.OPEN_TANYAO)
+
+    @property
+    def aka_dora_tiles(self):
+        """
+        :return: set of the red fives in 136 tiles format, it is empty without the aka dora
+        """
+        return self.aka_dora and AKA_DORA_TILES or NO_AKA_DORA_TILES
+
+    @property
+    def count_of_players(self):
+        return self.sanma and 3 or 4
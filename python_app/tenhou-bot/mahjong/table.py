@@ -1,23 +1,36 @@
 # -*- coding: utf-8 -*-
+import struct
+
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from mahjong.player import Player
-from mahjong.utils import plus_dora, is_aka_dora
+from mahjong.ruleset import Ruleset
+from mahjong.table_index import TableIndex
+
+# round number, honba sticks, riichi sticks, dealer seat, remaining tiles and count of dora indicators
+TABLE_STATE = struct.Struct('<HHHBhB')
 
 
 class Table(object):
-    players = []
+    __slots__ = ('players', '_dora_indicators', 'dealer_seat', 'round_number', 'count_of_riichi_sticks',
+                 'count_of_honba_sticks', 'count_of_remaining_tiles', 'index', 'ruleset')
 
-    dora_indicators = []
+    count_of_players = 4
 
-    dealer_seat = 0
-    round_number = 0
-    count_of_riichi_sticks = 0
-    count_of_honba_sticks = 0
+    def __init__(self, use_previous_ai_version=False, ruleset=None):
+        # rules of the game, it can be replaced when the game type is known
+        self.ruleset = ruleset or Ruleset.from_settings()
+        self.players = []
+        self._dora_indicators = None
 
-    count_of_remaining_tiles = 0
-    count_of_players = 4
+        self.dealer_seat = 0
+        self.round_number = 0
+        self.count_of_riichi_sticks = 0
+        self.count_of_honba_sticks = 0
+
+        self.count_of_remaining_tiles = 0
 
-    def __init__(self, use_previous_ai_version=False):
+        # derived state, it is updated with dora indicators, discards and melds
+        self.index = TableIndex(self.count_of_players)
         self.dora_indicators = []
         self._init_players(use_previous_ai_version)
 
@@ -34,6 +47,7 @@ class Table(object):
         self.count_of_riichi_sticks = count_of_riichi_sticks
 
         self.dora_indicators = []
+        self.index.reset()
         self.add_dora_indicator(dora_indicator)
 
         # erase players state
@@ -54,11 +68,67 @@ class Table(object):
     def add_open_set(self, meld):
         self.get_player(meld.who).add_meld(meld)
 
+    @property
+    def dora_indicators(self):
+        return self._dora_indicators
+
+    @dora_indicators.setter
+    def dora_indicators(self, tiles):
+        # indicators can be replaced all at once, the index should know about it too
+        for tile in self._dora_indicators or []:
+            self.index.remove_dora_indicator(tile)
+
+        self._dora_indicators = []
+        for tile in tiles:
+            self.add_dora_indicator(tile)
+
     def add_dora_indicator(self, tile):
         self.dora_indicators.append(tile)
+        self.index.add_dora_indicator(tile)
 
     def is_dora(self, tile):
-        return plus_dora(tile, self.dora_indicators) or is_aka_dora(tile)
+        return self.index.dora[tile // 4] or tile in self.ruleset.aka_dora_tiles
+
+    def visible_tiles(self, player_seat=0):
+        """
+        :param player_seat: seat of the player, his closed hand and melds are not counted
+        :return: 34 tiles format array of tiles that the player sees outside of his hand
+        """
+        return self.index.visible_tiles(player_seat)
+
+    def snapshot(self):
+        """
+        Round state of the table and players in the fixed layout:
+        table header, dora indicators, players states and table index.
+        Players and their AI are not created again on restore,
+        so the snapshot can be used to go back after the search or rollout
+        :return: bytes
+        """
+        data = [
+            TABLE_STATE.pack(self.round_number, self.count_of_honba_sticks, self.count_of_riichi_sticks,
+                             self.dealer_seat, self.count_of_remaining_tiles, len(self.dora_indicators)),
+            bytes(self.dora_indicators),
+        ]
+        for player in self.players:
+            data.append(player.snapshot())
+        data.append(self.index.snapshot())
+        return b''.join(data)
+
+    def restore(self, snapshot):
+        """
+        :param snapshot: bytes from the snapshot method
+        """
+        (self.round_number, self.count_of_honba_sticks, self.count_of_riichi_sticks,
+         self.dealer_seat, self.count_of_remaining_tiles, count_of_dora) = TABLE_STATE.unpack_from(snapshot, 0)
+        offset = TABLE_STATE.size
+
+        # the index is restored below, so we don't use the dora_indicators setter here
+        self._dora_indicators = list(snapshot[offset:offset + count_of_dora])
+        offset += count_of_dora
+
+        for player in self.players:
+            offset = player.restore(snapshot, offset)
+        self.index.restore(snapshot, offset)
 
     def set_players_scores(self, scores, uma=None):
         for i in range(0, len(scores)):
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import struct
+
+from mahjong.constants import EAST
+
+
+def dora_tile(indicator):
+    """
+    :param indicator: 34 tiles format
+    :return: 34 tiles format tile that is dora for the indicator
+    """
+    # sou, pin, man
+    if indicator < EAST:
+        # with indicator 9, dora will be 1
+        if indicator % 9 == 8:
+            return indicator - 8
+        return indicator + 1
+
+    # winds: east, south, west, north
+    if indicator < 31:
+        return indicator == 30 and EAST or indicator + 1
+
+    # dragons: haku, hatsu, chun
+    return indicator == 33 and 31 or indicator + 1
+
+
+class TableIndex(object):
+    """
+    Table state that AI reads a lot of times on the every turn.
+    It is updated with the table events, so the reads are array lookups
+    instead of loops over the all discards and melds.
+    """
+    __slots__ = ('count_of_players', 'visible', 'remaining', 'dora', 'meld_tiles', 'genbutsu')
+
+    def __init__(self, count_of_players=4):
+        self.count_of_players = count_of_players
+        self.reset()
+
+    def reset(self):
+        # 34 tiles format counts of dora indicators, discards and melds tiles
+        self.visible = [0] * 34
+        # count of tiles that we don't see, 4 - visible
+        self.remaining = [4] * 34
+        # count of dora for the 34 tiles format tile
+        self.dora = [0] * 34
+        # 34 tiles format counts of every player melds tiles
+        self.meld_tiles = [[0] * 34 for _ in range(0, self.count_of_players)]
+        # 34 bits of tiles for every player: his discards and tiles that were discarded after his riichi
+        self.genbutsu = [0] * self.count_of_players
+
+    def add_dora_indicator(self, tile):
+        """
+        :param tile: 136 tiles format
+        """
+        self._add_visible(tile // 4)
+        self.dora[dora_tile(tile // 4)] += 1
+
+    def remove_dora_indicator(self, tile):
+        """
+        :param tile: 136 tiles format
+        """
+        self.visible[tile // 4] -= 1
+        self.remaining[tile // 4] += 1
+        self.dora[dora_tile(tile // 4)] -= 1
+
+    def add_discard(self, player_seat, tile):
+        """
+        :param tile: 136 tiles format
+        """
+        self._add_visible(tile // 4)
+        self.genbutsu[player_seat] |= 1 << (tile // 4)
+
+    def add_safe_tile(self, player_seat, tile):
+        """
+        Tile that was discarded by other player after player's riichi
+        :param tile: 136 tiles format
+        """
+        self.genbutsu[player_seat] |= 1 << (tile // 4)
+
+    def add_meld(self, player_seat, tiles, called_tile=None):
+        """
+        :param tiles: meld tiles in 136 tiles format
+        :param called_tile: 136 tiles format, tile from the other player discard, it is already visible
+        """
+        for tile in tiles:
+            if tile == called_tile:
+                called_tile = None
+            else:
+                self._add_visible(tile // 4)
+            self.meld_tiles[player_seat][tile // 4] += 1
+
+    def visible_tiles(self, player_seat=0):
+        """
+        :param player_seat: seat of the player, his melds are not counted
+        :return: 34 tiles format array
+        """
+        melds = self.meld_tiles[player_seat]
+        return [self.visible[x] - melds[x] for x in range(0, 34)]
+
+    def safe_mask(self, player_seats):
+        """
+        :param player_seats: list of players seats
+        :return: 34 bits of tiles that are genbutsu at least for one of these players
+        """
+        mask = 0
+        for seat in player_seats:
+            mask |= self.genbutsu[seat]
+        return mask
+
+    def snapshot(self):
+        """
+        :return: bytes, one byte per tile count and 8 bytes per genbutsu mask
+        """
+        data = bytearray(self.visible)
+        data += bytearray(self.dora)
+        for tiles in self.meld_tiles:
+            data += bytearray(tiles)
+        data += struct.pack('<{0}Q'.format(self.count_of_players), *self.genbutsu)
+        return bytes(data)
+
+    def restore(self, data, offset=0):
+        """
+        :param data: bytes from the snapshot method
+        :param offset: position of the index in the data
+        :return: position after the index
+        """
+        self.visible = list(data[offset:offset + 34])
+        self.remaining = [4 - x for x in self.visible]
+        offset += 34
+        self.dora = list(data[offset:offset + 34])
+        offset += 34
+
+        self.meld_tiles = []
+        for _ in range(0, self.count_of_players):
+            self.meld_tiles.append(list(data[offset:offset + 34]))
+            offset += 34
+
+        self.genbutsu = list(struct.unpack_from('<{0}Q'.format(self.count_of_players), data, offset))
+        return offset + self.count_of_players * 8
+
+    def _add_visible(self, tile34):
+        self.visible[tile34] += 1
+        self.remaining[tile34] -= 1
@@ -46,6 +46,37 @@ class ClientTestCase(unittest.TestCase):
         self.assertEqual(len(client.table.get_player(3).melds), 1)
         self.assertEqual(client.table.count_of_remaining_tiles, 71)
 
+    def test_call_meld_visible_tiles(self):
+        client = Client()
+        client.table.init_round(0, 0, 0, 0, 0, [0, 0, 0, 0])
+        haku = 31
+
+        # second player calls pon on the first player discard
+        tiles = [haku * 4, haku * 4 + 1, haku * 4 + 2, haku * 4 + 3]
+        client.enemy_discard(1, tiles[0])
+
+        meld = Meld()
+        meld.who = 2
+        meld.from_who = 3
+        meld.type = Meld.PON
+        meld.tiles = tiles[0:3]
+        client.call_meld(meld)
+
+        self.assertEqual(client.table.index.visible[haku], 3)
+        self.assertEqual(client.table.index.remaining[haku], 1)
+
+        # and upgrades it to the kan, only the added tile is new
+        meld = Meld()
+        meld.who = 2
+        meld.from_who = 3
+        meld.type = Meld.CHAKAN
+        meld.tiles = tiles
+        client.call_meld(meld)
+
+        self.assertEqual(client.table.index.visible[haku], 4)
+        self.assertEqual(client.table.index.remaining[haku], 0)
+        self.assertEqual(client.table.index.meld_tiles[2][haku], 4)
+
     def test_enemy_discard(self):
         client = Client()
         client.table.init_round(0, 0, 0, 0, 0, [0, 0, 0, 0])
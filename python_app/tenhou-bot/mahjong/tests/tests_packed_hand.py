@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from mahjong.ai.agari import Agari
+from mahjong.ai.shanten import Shanten
+from mahjong.hand import HandDivider
+from mahjong.packed_hand import PackedHand
+from utils.tests import TestMixin
+
+
+class PackedHandTestCase(unittest.TestCase, TestMixin):
+
+    def test_add_and_remove_tiles(self):
+        # 123s 55p 9m 7z
+        tiles = [72, 76, 80, 52, 53, 32, 132]
+        hand = PackedHand.from_136_array(tiles)
+
+        self.assertEqual(hand.to_34_array(), self._to_34_array(tiles))
+        self.assertEqual(hand.to_136_array(), sorted(tiles))
+        self.assertEqual(hand.count_of_tiles, 7)
+
+        tile = self._string_to_136_tile(pin='5') + 2
+        new_hand = hand.add_tile(tile)
+        self.assertEqual(new_hand.count(self._string_to_34_tile(pin='5')), 3)
+        self.assertEqual(new_hand.count_of_tiles, 8)
+        self.assertTrue(tile in new_hand.to_136_array())
+        # packed hand is immutable
+        self.assertEqual(hand.count(self._string_to_34_tile(pin='5')), 2)
+
+        self.assertEqual(new_hand.remove_tile(tile), hand)
+        self.assertEqual(hash(new_hand.remove_tile(tile)), hash(hand))
+
+        with self.assertRaises(ValueError):
+            hand.remove_tile(tile)
+
+    def test_34_tiles(self):
+        tiles = self._string_to_34_array(sou='1111', man='19', honors='77')
+        hand = PackedHand.from_34_array(tiles)
+
+        self.assertEqual(list(hand), tiles)
+        self.assertEqual(hand[self._string_to_34_tile(sou='1')], 4)
+        self.assertEqual(hand.add_34(0).remove_34(0), hand)
+        self.assertEqual(str(hand), '19m1111s77z')
+
+        with self.assertRaises(ValueError):
+            hand.remove_34(1)
+
+    def test_suit_counts(self):
+        hand = PackedHand.from_34_array(self._string_to_34_array(sou='19', pin='22', man='123', honors='7'))
+
+        self.assertEqual(hand.suit_counts(0), 1 | 1 << 3 | 1 << 6)
+        self.assertEqual(hand.suit_counts(1), 2 << 3)
+        self.assertEqual(hand.suit_counts(2), 1 | 1 << 24)
+        self.assertEqual(hand.suit_counts(3), 1 << 18)
+
+    def test_calculators_accept_packed_hand(self):
+        tiles = self._string_to_34_array(sou='123456789', pin='123', man='33')
+        hand = PackedHand.from_34_array(tiles)
+
+        self.assertTrue(Agari().is_agari(hand))
+        self.assertEqual(Shanten().calculate_shanten(hand), Shanten.AGARI_STATE)
+        self.assertEqual(HandDivider().divide_hand(hand, [], []), HandDivider().divide_hand(tiles, [], []))
+
+        hand = PackedHand.from_34_array(self._string_to_34_array(sou='111345677', pin='15', man='567'))
+        self.assertFalse(Agari().is_agari(hand))
+        self.assertEqual(Shanten().calculate_shanten(hand), 1)
+
+    def test_repeated_136_tiles(self):
+        tiles = self._string_to_136_array(sou='111')
+        hand = PackedHand.from_136_array(tiles)
+
+        self.assertEqual(hand.owned, None)
+        self.assertEqual(hand.count(self._string_to_34_tile(sou='1')), 3)
+        self.assertEqual(hand.remove_tile(tiles[0]).remove_tile(tiles[0]).count_of_tiles, 1)
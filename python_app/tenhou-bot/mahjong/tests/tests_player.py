@@ -4,9 +4,10 @@ import unittest
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from mahjong.player import Player
 from mahjong.table import Table
+from utils.tests import TestMixin
 
 
-class PlayerTestCase(unittest.TestCase):
+class PlayerTestCase(unittest.TestCase, TestMixin):
 
     def test_can_call_riichi_and_tempai(self):
         table = Table()
@@ -82,3 +83,24 @@ class PlayerTestCase(unittest.TestCase):
 
         player = Player(0, 3, table)
         self.assertEqual(player.player_wind, SOUTH)
+
+    def test_waiting_mask(self):
+        table = Table()
+        player = Player(0, 0, table)
+
+        player.init_hand(self._string_to_136_array(sou='123456789', pin='123', man='3'))
+        self.assertEqual(player.waiting_tiles(), [self._string_to_34_tile(man='3')])
+        self.assertTrue(player.is_waiting_on(self._string_to_136_tile(man='3')))
+        self.assertFalse(player.is_waiting_on(self._string_to_136_tile(man='4')))
+
+        # 14 tiles hand doesn't wait anything
+        player.draw_tile(self._string_to_136_tile(man='4'))
+        self.assertEqual(player.waiting_mask, 0)
+
+        player.erase_state()
+        player.init_hand(self._string_to_136_array(sou='123456789', pin='23', man='55'))
+        self.assertEqual(player.waiting_tiles(), [self._string_to_34_tile(pin='1'), self._string_to_34_tile(pin='4')])
+
+        self.assertFalse(player.is_furiten)
+        player.add_discarded_tile(self._string_to_136_tile(pin='4'))
+        self.assertTrue(player.is_furiten)
@@ -2,9 +2,10 @@
 import unittest
 
 from mahjong.constants import FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU, EAST, SOUTH, WEST, NORTH
+from mahjong.meld import Meld
+from mahjong.ruleset import Ruleset
 from mahjong.table import Table
 from utils.tests import TestMixin
-from utils.settings_handler import settings
 
 
 class TableTestCase(unittest.TestCase, TestMixin):
@@ -156,7 +157,7 @@ class TableTestCase(unittest.TestCase, TestMixin):
         table.dora_indicators = [self._string_to_136_tile(pin='1')]
         self.assertFalse(table.is_dora(self._string_to_136_tile(sou='2')))
 
-        settings.FIVE_REDS = True
+        table.ruleset = Ruleset(aka_dora=True)
 
         # red five man
         self.assertTrue(table.is_dora(FIVE_RED_MAN))
@@ -167,7 +168,95 @@ class TableTestCase(unittest.TestCase, TestMixin):
         # red five sou
         self.assertTrue(table.is_dora(FIVE_RED_SOU))
 
-        settings.FIVE_REDS = False
+        table.ruleset = Ruleset(aka_dora=False)
+        self.assertFalse(table.is_dora(FIVE_RED_SOU))
+
+    def test_table_index(self):
+        table = Table()
+        table.init_round(0, 0, 0, self._string_to_136_tile(man='1'), 0, [])
+
+        self.assertEqual(table.index.dora[self._string_to_34_tile(man='2')], 1)
+        self.assertEqual(table.index.remaining[self._string_to_34_tile(man='1')], 3)
+
+        table.get_player(1).add_discarded_tile(self._string_to_136_tile(sou='5'))
+        table.get_player(1).in_riichi = True
+        table.index.add_safe_tile(1, self._string_to_136_tile(pin='3'))
+
+        # pon of the discarded tile, it is counted only once
+        meld = Meld()
+        meld.tiles = self._string_to_136_array(sou='555')
+        table.get_player(2).add_meld(meld, self._string_to_136_tile(sou='5'))
+
+        sou_5 = self._string_to_34_tile(sou='5')
+        self.assertEqual(table.index.visible[sou_5], 3)
+        self.assertEqual(table.index.remaining[sou_5], 1)
+        self.assertEqual(table.visible_tiles(0)[sou_5], 3)
+        self.assertEqual(table.visible_tiles(2)[sou_5], 0)
+
+        self.assertEqual(table.index.genbutsu[1], (1 << sou_5) | (1 << self._string_to_34_tile(pin='3')))
+        self.assertEqual(table.index.safe_mask([2, 3]), 0)
+
+        # new round
+        table.init_round(0, 0, 0, self._string_to_136_tile(man='1'), 0, [])
+        self.assertEqual(table.index.visible[sou_5], 0)
+        self.assertEqual(table.index.genbutsu[1], 0)
+        self.assertEqual(sum(table.index.dora), 1)
+
+    def test_snapshot_and_restore(self):
+        table = Table()
+        table.init_round(4, 1, 2, self._string_to_136_tile(man='1'), 1, [250, 250, 250, 250])
+        table.get_main_player().init_hand(self._string_to_136_array(sou='123456789', pin='23', man='55'))
+
+        table.get_player(1).add_discarded_tile(self._string_to_136_tile(sou='5'))
+        table.get_player(2).in_riichi = True
+        meld = Meld()
+        meld.who = 3
+        meld.from_who = 0
+        meld.type = Meld.PON
+        meld.tiles = self._string_to_136_array(honors='555')
+        table.get_player(3).add_meld(meld)
+
+        snapshot = table.snapshot()
+        main_player = table.get_main_player()
+        waiting_mask = main_player.waiting_mask
+        visible_tiles = table.visible_tiles()
+
+        table.init_round(0, 0, 0, self._string_to_136_tile(pin='1'), 0, [100, 100, 100, 100])
+        table.restore(snapshot)
+
+        # the same objects with the previous state
+        self.assertIs(table.get_main_player(), main_player)
+        self.assertEqual(table.round_number, 4)
+        self.assertEqual(table.count_of_riichi_sticks, 2)
+        self.assertEqual(table.dora_indicators, [self._string_to_136_tile(man='1')])
+        self.assertEqual(table.visible_tiles(), visible_tiles)
+        self.assertEqual(main_player.scores, 25000)
+        self.assertEqual(main_player.waiting_mask, waiting_mask)
+        self.assertEqual(main_player.hand_analyzer.shanten(), 0)
+        self.assertEqual(len(main_player.tiles), 13)
+        self.assertEqual(table.get_player(1).discards, [self._string_to_136_tile(sou='5')])
+        self.assertEqual(table.get_player(2).in_riichi, True)
+        self.assertEqual(table.get_player(3).melds[0].from_who, 0)
+        self.assertEqual(table.get_player(3).melds[0].type, Meld.PON)
+        self.assertEqual(table.get_player(3).melds[0].tiles, self._string_to_136_array(honors='555'))
+
+    def test_compact_model_objects(self):
+        table = Table()
+        table.init_round(0, 0, 0, 0, 0, [])
+        table.init_main_player_hand(self._string_to_136_array(sou='123456', pin='12345', man='11'))
+        table.get_player(1).add_discarded_tile(self._string_to_136_tile(sou='5'))
+
+        meld = Meld()
+        meld.tiles = self._string_to_136_array(honors='555')
+        table.get_player(3).add_meld(meld)
+
+        items = [table, table.index, table.get_main_player(), table.get_main_player().tiles[0],
+                 table.get_player(1).discards[0], meld]
+        for item in items:
+            self.assertFalse(hasattr(item, '__dict__'))
+
+        with self.assertRaises(AttributeError):
+            table.get_main_player().unknown_attribute = True
 
     def test_round_wind(self):
         table = Table()
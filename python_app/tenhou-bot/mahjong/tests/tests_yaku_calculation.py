@@ -2,17 +2,16 @@
 import unittest
 
 from mahjong.hand import FinishedHand, HandDivider
-from mahjong.constants import EAST, SOUTH, WEST, NORTH, FIVE_RED_SOU
+from mahjong.hand_features import HandFeatures
+from mahjong.ai.cache import LRUCache
+from mahjong import yaku
+from mahjong.constants import EAST, SOUTH, WEST, NORTH, CHUN, FIVE_RED_SOU
+from mahjong.ruleset import Ruleset
 from utils.tests import TestMixin
-from utils.settings_handler import settings
 
 
 class YakuCalculationTestCase(unittest.TestCase, TestMixin):
 
-    def tearDown(self):
-        settings.FIVE_REDS = False
-        settings.OPEN_TANYAO = True
-
     def test_hand_dividing(self):
         hand = HandDivider()
 
@@ -54,6 +53,41 @@ class YakuCalculationTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0], [[10, 11, 12], [15, 16, 17], [15, 16, 17], [15, 16, 17], [28, 28]])
 
+    def test_find_valid_combinations(self):
+        hand = HandDivider()
+
+        tiles_34 = self._string_to_34_array(man='111222333')
+        result = hand.find_valid_combinations(tiles_34, 0, 8)
+        self.assertEqual(result, [[[0, 1, 2], [0, 1, 2], [0, 1, 2]], [[0, 0, 0], [1, 1, 1], [2, 2, 2]]])
+
+        tiles_34 = self._string_to_34_array(man='111123456999')
+        result = hand.find_valid_combinations(tiles_34, 0, 8)
+        self.assertEqual(result, [[[0, 0, 0], [0, 1, 2], [3, 4, 5], [8, 8, 8]]])
+
+        tiles_34 = self._string_to_34_array(man='1245')
+        self.assertEqual(hand.find_valid_combinations(tiles_34, 0, 8), [])
+        self.assertEqual(hand.find_valid_combinations(tiles_34, 9, 17), [])
+
+    def test_hand_features(self):
+        tiles = self._string_to_34_array(man='123123', pin='555', sou='99', honors='777')
+        features = HandFeatures(self._hand(tiles))
+
+        self.assertEqual(features.chi_mask, 1)
+        self.assertEqual(features.pon_mask, (1 << 13) | (1 << CHUN))
+        self.assertEqual(features.pair_mask, 1 << 26)
+        self.assertEqual(features.suits_mask, 0b1111)
+        self.assertEqual(features.count_of_chi, 2)
+        self.assertEqual(features.count_of_pon, 2)
+        self.assertEqual(features.identical_chi, 2)
+        self.assertEqual(features.terminal_sets, 3)
+        self.assertEqual(features.honor_sets, 1)
+
+        self.assertTrue(features.is_iipeiko())
+        self.assertTrue(features.is_pon_of(CHUN))
+        self.assertFalse(features.is_pon_of(None))
+        self.assertFalse(features.is_tanyao())
+        self.assertFalse(features.is_chanta())
+
     def test_fu_calculation(self):
         hand = FinishedHand()
         player_wind, round_wind = EAST, WEST
@@ -401,6 +435,79 @@ class YakuCalculationTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(result['fu'], 60)
         self.assertEqual(result['han'], 1)
 
+    def test_hand_value_cache(self):
+        cache = LRUCache(10)
+        hand = FinishedHand(cache)
+
+        tiles = self._string_to_136_array(sou='123456678', honors='11555')
+        win_tile = self._string_to_136_tile(sou='6')
+        open_sets = [self._string_to_136_array(sou='456'), self._string_to_136_array(honors='555')]
+        dora_indicators = [self._string_to_136_tile(sou='9')]
+
+        first = hand.estimate_hand_value(tiles, win_tile, is_tsumo=True, open_sets=open_sets,
+                                         dora_indicators=dora_indicators)
+        # arguments and shared yaku are not changed
+        self.assertEqual(open_sets[0], self._string_to_136_array(sou='456'))
+        self.assertEqual(yaku.dora.han, {'open': 1, 'closed': 1})
+
+        first['hand_yaku'].append(yaku.riichi)
+        second = hand.estimate_hand_value(tiles, win_tile, is_tsumo=True, open_sets=open_sets,
+                                          dora_indicators=dora_indicators)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(second['han'], 4)
+        self.assertEqual(second['fu'], 30)
+        self.assertNotIn(yaku.riichi, second['hand_yaku'])
+
+        # another situation is another cache item
+        hand.estimate_hand_value(tiles, win_tile, open_sets=open_sets, dora_indicators=dora_indicators)
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(len(cache), 2)
+
+    def test_estimate_tenpai_values(self):
+        hand = FinishedHand()
+
+        tiles = self._string_to_136_array(man='234567', pin='23455', sou='67')
+        dora_indicators = [self._string_to_136_tile(sou='7')]
+        values = hand.estimate_tenpai_values(tiles, dora_indicators=dora_indicators, player_wind=EAST)
+        self.assertEqual(sorted(values.keys()), [22, 25])
+
+        # tanyao, pinfu and dora for the 8 sou
+        self.assertEqual(values[25]['ron']['dama']['han'], 3)
+        self.assertEqual(values[25]['ron']['dama']['fu'], 30)
+        self.assertEqual(values[22]['tsumo']['riichi']['han'], 4)
+        self.assertEqual(values[22]['tsumo']['riichi']['fu'], 20)
+
+        for win_tile in values:
+            for win_type, is_tsumo in [('ron', False), ('tsumo', True)]:
+                for riichi_type, is_riichi in [('riichi', True), ('dama', False)]:
+                    result = hand.estimate_hand_value(tiles + [win_tile * 4], win_tile * 4, is_tsumo=is_tsumo,
+                                                      is_riichi=is_riichi, dora_indicators=dora_indicators,
+                                                      player_wind=EAST)
+                    value = values[win_tile][win_type][riichi_type]
+                    self.assertEqual((value['han'], value['fu'], value['cost'], value['error']),
+                                     (result['han'], result['fu'], result['cost'], result['error']))
+                    self.assertEqual([str(x) for x in value['hand_yaku']], [str(x) for x in result['hand_yaku']])
+
+        tiles = self._string_to_136_array(man='234567', pin='23455', sou='67')
+        open_sets = [self._string_to_136_array(man='234')]
+        values = hand.estimate_tenpai_values(tiles, open_sets=open_sets)
+        self.assertEqual(open_sets[0], self._string_to_136_array(man='234'))
+        self.assertEqual(values[22]['ron']['riichi'], None)
+        self.assertEqual(values[22]['ron']['dama']['han'], 1)
+        self.assertEqual(values[22]['ron']['dama']['fu'], 30)
+
+        # there is no yaku
+        tiles = self._string_to_136_array(man='234567', pin='23455', sou='11')
+        values = hand.estimate_tenpai_values(tiles, open_sets=open_sets)
+        self.assertEqual(values[18]['ron']['dama']['error'], 'Not valid han (0) and fu (30)')
+
+        # some tiles complete the all 14 tiles, but there is no division with the called chi sets
+        tiles = self._string_to_136_array(man='1223345777789')
+        open_sets = [self._string_to_136_array(man='789'), self._string_to_136_array(man='234')]
+        values = hand.estimate_tenpai_values(tiles, open_sets=open_sets)
+        self.assertEqual(sorted(values.keys()), [4, 5])
+        self.assertEqual(values[4]['ron']['dama']['han'], 5)
+
     def test_is_riichi(self):
         hand = FinishedHand()
 
@@ -581,7 +688,7 @@ class YakuCalculationTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(result['fu'], 30)
         self.assertEqual(len(result['hand_yaku']), 1)
 
-        settings.OPEN_TANYAO = False
+        hand = FinishedHand(ruleset=Ruleset(open_tanyao=False))
 
         tiles = self._string_to_136_array(sou='234567', man='234567', pin='22')
         win_tile = self._string_to_136_tile(man='7')
@@ -589,8 +696,6 @@ class YakuCalculationTestCase(unittest.TestCase, TestMixin):
         result = hand.estimate_hand_value(tiles, win_tile, open_sets=open_sets)
         self.assertNotEqual(result['error'], None)
 
-        settings.OPEN_TANYAO = True
-
     def test_is_pinfu_hand(self):
         player_wind, round_wind = EAST, WEST
         hand = FinishedHand()
@@ -1220,21 +1325,18 @@ class YakuCalculationTestCase(unittest.TestCase, TestMixin):
         self.assertEqual(result['fu'], 40)
         self.assertEqual(len(result['hand_yaku']), 2)
 
-        settings.FIVE_REDS = True
-
         # double dora indicators and red fives
+        aka_hand = FinishedHand(ruleset=Ruleset(aka_dora=True))
         tiles = self._string_to_136_array(sou='12346', man='123678', pin='44')
         win_tile = self._string_to_136_tile(pin='4')
         tiles.append(FIVE_RED_SOU)
         dora_indicators = [self._string_to_136_tile(pin='2'), self._string_to_136_tile(pin='2')]
-        result = hand.estimate_hand_value(tiles, win_tile, dora_indicators=dora_indicators)
+        result = aka_hand.estimate_hand_value(tiles, win_tile, dora_indicators=dora_indicators)
         self.assertEqual(result['error'], None)
         self.assertEqual(result['han'], 1)
         self.assertEqual(result['fu'], 40)
         self.assertEqual(len(result['hand_yaku']), 1)
 
-        settings.FIVE_REDS = False
-
         # dora in kan
         tiles = self._string_to_136_array(man='777', pin='34577', sou='123345')
         win_tile = self._string_to_136_tile(pin='7')
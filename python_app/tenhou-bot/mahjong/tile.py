@@ -2,6 +2,9 @@
 
 
 class Tile(int):
+    # tile is the int value only, without the instance dictionary
+    __slots__ = ()
+
     TILES = '''
         1s 2s 3s 4s 5s 6s 7s 8s 9s
         1p 2p 3p 4p 5p 6p 7p 8p 9p
@@ -1,13 +1,13 @@
 from mahjong.constants import EAST, FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU
-from utils.settings_handler import settings
 
 
-def is_aka_dora(tile):
+def is_aka_dora(tile, aka_enabled):
     """
     :param tile: int 136 tiles format
+    :param aka_enabled: boolean, are red fives used in the game
     :return: boolean
     """
-    if not settings.FIVE_REDS:
+    if not aka_enabled:
         return False
 
     if tile in [FIVE_RED_MAN, FIVE_RED_PIN, FIVE_RED_SOU]:
@@ -1,7 +1,5 @@
 class Yaku(object):
-    name = ''
-    han = {'open': None, 'closed': None}
-    is_yakuman = False
+    __slots__ = ('name', 'han', 'is_yakuman')
 
     def __init__(self, name, open_value, closed_value, is_yakuman=False):
         self.name = name
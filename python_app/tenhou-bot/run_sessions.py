@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Endpoint to run many bots in one process. Every bot plays games on tenhou.net with its own account.
+
+Accounts file has one account per line: user id, lobby and game type, lobby and game type are optional.
+IDXXXXXXXX-XXXXXXXX,0,9
+
+python run_sessions.py -a accounts.txt -g 10
+"""
+import logging
+from optparse import OptionParser
+
+from tenhou.client import TenhouAccount
+from tenhou.inference import InferenceBatcher, MAX_BATCH_SIZE
+from tenhou.main import run_until_complete
+from tenhou.runner import TenhouSession, SessionRunner, HEALTH_REPORT_INTERVAL
+from utils.logger import set_up_logging
+from utils.settings_handler import settings
+
+logger = logging.getLogger('tenhou')
+
+
+def read_accounts(file_name):
+    """
+    :return: list of TenhouAccount from the accounts file
+    """
+    accounts = []
+    with open(file_name, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            values = [x.strip() for x in line.split(',')]
+            accounts.append(TenhouAccount(user_id=values[0],
+                                          lobby=len(values) > 1 and values[1] or settings.LOBBY,
+                                          game_type=len(values) > 2 and values[2] or settings.GAME_TYPE,
+                                          waiting_timeout=settings.WAITING_GAME_TIMEOUT_MINUTES))
+    return accounts
+
+
+def create_inference(batch_size):
+    """
+    :return: InferenceBatcher for the shared model, None if the model is not used
+    """
+    if not batch_size:
+        return None
+
+    from mahjong.myAI.slcnn_player import get_model
+    return InferenceBatcher(get_model(), max_batch_size=batch_size)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-a', '--accounts', type='string', help='File with tenhou accounts')
+    parser.add_option('-n', '--anonymous', type='int', default=0, help='Count of the sessions with NoName account')
+    parser.add_option('-g', '--games', type='int', default=1,
+                      help='Count of games for the every session, 0 to play until the script is stopped')
+    parser.add_option('-b', '--batch_size', type='int', default=MAX_BATCH_SIZE,
+                      help='Max count of predictions in one model call, 0 to disable the batching')
+    parser.add_option('-i', '--health_interval', type='int', default=HEALTH_REPORT_INTERVAL,
+                      help='Seconds between the health reports')
+
+    opts, _ = parser.parse_args()
+
+    accounts = opts.accounts and read_accounts(opts.accounts) or []
+    for _ in range(opts.anonymous):
+        account = TenhouAccount.from_settings()
+        account.user_id = 'NoName'
+        accounts.append(account)
+
+    if not accounts:
+        parser.error('Accounts file or count of anonymous sessions is required')
+
+    set_up_logging()
+
+    inference = create_inference(opts.batch_size)
+    sessions = [TenhouSession('{0} #{1}'.format(account.user_id, i + 1), account, opts.games, inference=inference)
+                for i, account in enumerate(accounts)]
+    runner = SessionRunner(sessions, inference, opts.health_interval)
+
+    try:
+        run_until_complete(runner.run())
+    except KeyboardInterrupt:
+        logger.info(runner.health_report())
+
+
+if __name__ == '__main__':
+    main()
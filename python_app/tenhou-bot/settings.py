@@ -17,6 +17,10 @@ STAT_TOKEN = ''
 
 ENABLE_AI = True
 
+# pauses before the bot answers on tenhou (discard, riichi, calls and the next round),
+# without them the bot answers immediately
+HUMAN_LIKE_DELAYS = False
+
 """
   0 - 1 - online, 0 - bots
   1 - aka forbidden
@@ -36,11 +40,28 @@ ENABLE_AI = True
 GAME_TYPE = '1'
 
 
-# game related settings
-# TODO put them to the separate settings files
+# game related settings, they are defaults of the Ruleset.from_settings
+# tenhou games use rules from the GO type instead
 FIVE_REDS = False
 OPEN_TANYAO = True
 
+# count of hands in the process-wide shanten cache, 0 disables the cache
+SHANTEN_CACHE_SIZE = 100000
+
+# count of hand values in the process-wide FinishedHand cache, 0 disables the cache
+HAND_VALUE_CACHE_SIZE = 10000
+
+# Monte Carlo estimation of tempai and win chances
+# maximum count of simulated draw sequences and time limit in seconds for one estimation
+MONTE_CARLO_SAMPLES = 2000
+MONTE_CARLO_TIME_BUDGET = 0.05
+# against riichi we continue to push only with this or bigger chance to win
+PUSH_WIN_PROBABILITY = 0.3
+# push or fold decision is estimated with the fixed count of samples and the seed, without the time limit,
+# so the same table state gives the same decision on any machine
+DEFENCE_MONTE_CARLO_SAMPLES = 1000
+DEFENCE_MONTE_CARLO_SEED = 0
+
 try:
     from settings_local import *
 except ImportError:
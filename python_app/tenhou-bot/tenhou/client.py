@@ -1,43 +1,152 @@
 # -*- coding: utf-8 -*-
-import datetime
+import asyncio
 import logging
-import socket
-from threading import Thread
-from time import sleep
+import time
 from urllib.parse import quote
 
-import re
-
 from mahjong.constants import DISPLAY_WINDS
 from utils.settings_handler import settings
 from mahjong.client import Client
 from mahjong.meld import Meld
-from mahjong.table import Table
 from mahjong.tile import TilesConverter
 from tenhou.decoder import TenhouDecoder
+from tenhou.tokenizer import tokenize
 
 logger = logging.getLogger('tenhou')
 
+# t attribute of the discard, when we can call the meld
+# t="7" - suggest to open kan
+OPEN_SET_SUGGESTIONS = ['1', '2', '3', '4', '5', '7']
+# seats of the players in the discard tags: <e, <f, <g + tile number
+DISCARD_SEATS = {'e': 1, 'f': 2, 'g': 3}
+
+# tenhou messages are delimited by the empty byte
+MESSAGE_DELIMITER = b'\x00'
+KEEP_ALIVE_INTERVAL = 15
+# sometimes tenhou send an empty tag after authentication (in tournament mode),
+# so we wait for the lobby tag this count of seconds
+AUTH_TIMEOUT = 3
+# tenhou needs time to move us to the other lobby
+LOBBY_SWITCH_TIMEOUT = 2
+# sometimes log is not available just after the game
+STATISTICS_DELAY = 60
+
+
+async def read_message(reader):
+    """
+    :param reader: asyncio.StreamReader of the tenhou connection
+    :return: one message without the delimiter in lower case, None if the connection was closed
+    """
+    try:
+        message = await reader.readuntil(MESSAGE_DELIMITER)
+    except asyncio.IncompleteReadError:
+        return None
+
+    message = message[:-1].decode('utf-8')
+    logger.debug('Get: {0}'.format(message))
+
+    # sometimes tenhou send messages in lower case, sometime in upper case, let's unify the behaviour
+    return message.lower()
+
+
+class DelayPolicy(object):
+    """
+    Pauses in seconds before the bot answers, without them the bot answers immediately
+    """
+    discard = 0
+    riichi = 0
+    call = 0
+    next_round = 0
+
+    def __init__(self, discard=0, riichi=0, call=0, next_round=0):
+        self.discard = discard
+        self.riichi = riichi
+        self.call = call
+        self.next_round = next_round
+
+    @staticmethod
+    def from_settings():
+        if settings.HUMAN_LIKE_DELAYS:
+            return DelayPolicy(discard=1, riichi=2, call=1, next_round=2)
+        return DelayPolicy()
+
+
+class TenhouAccount(object):
+    """
+    Who plays and in which lobby
+    """
+    user_id = 'NoName'
+    lobby = '0'
+    game_type = '1'
+    is_tournament = False
+    # how much minutes we are looking for a game
+    waiting_timeout = 10
+
+    def __init__(self, user_id='NoName', lobby='0', game_type='1', is_tournament=False, waiting_timeout=10):
+        self.user_id = user_id
+        self.lobby = lobby
+        self.game_type = game_type
+        self.is_tournament = is_tournament
+        self.waiting_timeout = waiting_timeout
+
+    @staticmethod
+    def from_settings():
+        return TenhouAccount(user_id=settings.USER_ID,
+                             lobby=settings.LOBBY,
+                             game_type=settings.GAME_TYPE,
+                             is_tournament=settings.IS_TOURNAMENT,
+                             waiting_timeout=settings.WAITING_GAME_TIMEOUT_MINUTES)
+
 
 class TenhouClient(Client):
-    socket = None
+    reader = None
+    writer = None
     game_is_continue = True
     looking_for_game = True
-    keep_alive_thread = None
-
-    decoder = TenhouDecoder()
-
-    def __init__(self):
-        super(TenhouClient, self).__init__(Table(False))
+    keep_alive_task = None
+    delays = None
+    account = None
+    inference = None
 
-    def setSocketObject(self, socket_object):
-        self.socket = socket_object
+    # what the client is doing now and when it got the last message, for the health reports
+    state = 'created'
+    last_message_time = None
+    count_of_rounds = 0
 
-    def authenticate(self):
-        self._send_message('<HELO name="{0}" tid="f0" sx="M" />'.format(quote(settings.USER_ID)))
-        auth_message = self._read_message()
+    decoder = TenhouDecoder()
 
-        auth_string = self.decoder.parse_auth_string(auth_message)
+    def __init__(self, delays=None, account=None, inference=None):
+        """
+        :param delays: DelayPolicy, by default it is from the settings
+        :param account: TenhouAccount, by default it is from the settings
+        :param inference: InferenceBatcher to predict our discards together with the other clients,
+        without it the AI calls the model itself
+        """
+        super(TenhouClient, self).__init__()
+        self.delays = delays or DelayPolicy.from_settings()
+        self.account = account or TenhouAccount.from_settings()
+        self.inference = inference
+
+    async def connect(self, host, port):
+        self.state = 'connecting'
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def play(self):
+        """
+        Authenticate, play one game and close the connection
+        """
+        try:
+            if await self.authenticate():
+                await self.start_game()
+        finally:
+            await self.end_game()
+
+    async def authenticate(self):
+        self.state = 'authenticating'
+        self._send_message('<HELO name="{0}" tid="f0" sx="M" />'.format(quote(self.account.user_id)))
+        auth_message = await self._read_message()
+
+        auth_string = auth_message and self.decoder.parse_auth_string(auth_message)
         if not auth_string:
             return False
 
@@ -48,271 +157,299 @@ class TenhouClient(Client):
 
         # sometimes tenhou send an empty tag after authentication (in tournament mode)
         # and bot thinks that he was not auth
-        # to prevent it lets wait a little
-        # and read a group of tags
-        sleep(3)
+        # to prevent it we are waiting for the lobby tag
         authenticated = False
-        messages = self._get_multiple_messages()
-        for message in messages:
-            if '<ln' in message:
-                authenticated = True
+        try:
+            authenticated = await asyncio.wait_for(self._wait_for_tag('ln'), AUTH_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
 
         if authenticated:
-            self._send_keep_alive_ping()
+            self.keep_alive_task = asyncio.ensure_future(self._send_keep_alive_ping())
             logger.info('Successfully authenticated')
             return True
         else:
+            self.state = 'not authenticated'
             logger.info('Failed to authenticate')
             return False
 
-    def start_game(self):
-        log_link = ''
+    async def start_game(self):
+        account = self.account
+        self.state = 'looking for game'
 
-        if settings.LOBBY != '0':
-            if settings.IS_TOURNAMENT:
-                logger.info('Go to the tournament lobby: {0}'.format(settings.LOBBY))
-                self._send_message('<CS lobby="{0}" />'.format(settings.LOBBY))
-                sleep(2)
+        if account.lobby != '0':
+            if account.is_tournament:
+                logger.info('Go to the tournament lobby: {0}'.format(account.lobby))
+                self._send_message('<CS lobby="{0}" />'.format(account.lobby))
+                await asyncio.sleep(LOBBY_SWITCH_TIMEOUT)
                 self._send_message('<DATE />')
             else:
-                logger.info('Go to the lobby: {0}'.format(settings.LOBBY))
-                self._send_message('<CHAT text="{0}" />'.format(quote('/lobby {0}'.format(settings.LOBBY))))
-                sleep(2)
+                logger.info('Go to the lobby: {0}'.format(account.lobby))
+                self._send_message('<CHAT text="{0}" />'.format(quote('/lobby {0}'.format(account.lobby))))
+                await asyncio.sleep(LOBBY_SWITCH_TIMEOUT)
 
-        game_type = '{0},{1}'.format(settings.LOBBY, settings.GAME_TYPE)
+        game_type = '{0},{1}'.format(account.lobby, account.game_type)
 
-        if not settings.IS_TOURNAMENT:
+        if not account.is_tournament:
             self._send_message('<JOIN t="{0}" />'.format(game_type))
             logger.info('Looking for the game...')
 
-        start_time = datetime.datetime.now()
-
-        while self.looking_for_game:
-            sleep(1)
-
-            messages = self._get_multiple_messages()
-
-            for message in messages:
-
-                if '<rejoin' in message:
-                    # game wasn't found, continue to wait
-                    self._send_message('<JOIN t="{0},r" />'.format(game_type))
-
-                if '<go' in message:
-                    self._send_message('<GOK />')
-                    self._send_message('<NEXTREADY />')
-
-                if '<taikyoku' in message:
-                    self.looking_for_game = False
-                    game_id, seat = self.decoder.parse_log_link(message)
-                    log_link = 'http://tenhou.net/0/?log={0}&tw={1}'.format(game_id, seat)
-                    self.statistics.game_id = game_id
-
-                if '<un' in message:
-                    values = self.decoder.parse_names_and_ranks(message)
-                    self.table.set_players_names_and_ranks(values)
-
-                if '<ln' in message:
-                    self._send_message(self._pxr_tag())
-
-            current_time = datetime.datetime.now()
-            time_difference = current_time - start_time
-
-            if time_difference.seconds > 60 * settings.WAITING_GAME_TIMEOUT_MINUTES:
-                break
+        try:
+            log_link = await asyncio.wait_for(self._look_for_game(game_type), 60 * account.waiting_timeout)
+        except asyncio.TimeoutError:
+            log_link = None
 
         # we wasn't able to find the game in timeout minutes
         # sometimes it happens and we need to end process
         # and try again later
         if self.looking_for_game:
+            self.state = 'game not found'
             logger.error('Game is not started. Can\'t find the game')
-            self.end_game()
             return
 
+        self.state = 'playing'
         logger.info('Game started')
         logger.info('Log: {0}'.format(log_link))
         logger.info('Players: {0}'.format(self.table.players))
 
-        main_player = self.table.get_main_player()
+        handlers = {
+            'init': self._init_round,
+            't': self._draw_and_discard,
+            'dora': self._new_dora_indicator,
+            'reach': self._riichi,
+            'agari': self._end_of_round,
+            'ryuukyoku': self._end_of_round,
+            'n': self._meld,
+            'e': self._enemy_discard,
+            'f': self._enemy_discard,
+            'g': self._enemy_discard,
+            'prof': self._end_of_game,
+        }
 
         while self.game_is_continue:
-            sleep(1)
-
-            messages = self._get_multiple_messages()
-
-            for message in messages:
-
-                if '<init' in message:
-                    values = self.decoder.parse_initial_values(message)
-                    self.table.init_round(
-                        values['round_number'],
-                        values['count_of_honba_sticks'],
-                        values['count_of_riichi_sticks'],
-                        values['dora_indicator'],
-                        values['dealer'],
-                        values['scores'],
-                    )
-
-                    tiles = self.decoder.parse_initial_hand(message)
-                    self.table.init_main_player_hand(tiles)
-
-                    logger.info(self.table.__str__())
-                    logger.info('Players: {}'.format(self.table.get_players_sorted_by_scores()))
-                    logger.info('Dealer: {}'.format(self.table.get_player(values['dealer'])))
-                    logger.info('Round  wind: {}'.format(DISPLAY_WINDS[self.table.round_wind]))
-                    logger.info('Player wind: {}'.format(DISPLAY_WINDS[main_player.player_wind]))
-
-                # draw and discard
-                if '<t' in message:
-                    tile = self.decoder.parse_tile(message)
-
-                    if not main_player.in_riichi:
-                        self.draw_tile(tile)
-                        sleep(1)
-
-                        logger.info('Hand: {0}'.format(TilesConverter.to_one_line_string(main_player.tiles)))
-
-                        tile = self.discard_tile()
-
-                    if 't="16"' in message:
-                        # we win by self draw (tsumo)
-                        self._send_message('<N type="7" />')
-                    else:
-                        # let's call riichi and after this discard tile
-                        if main_player.can_call_riichi():
-                            self._send_message('<REACH hai="{0}" />'.format(tile))
-                            sleep(2)
-                            main_player.in_riichi = True
-
-                        # tenhou format: <D p="133" />
-                        self._send_message('<D p="{0}"/>'.format(tile))
-
-                        logger.info('Remaining tiles: {0}'.format(self.table.count_of_remaining_tiles))
-
-                # new dora indicator after kan
-                if '<dora' in message:
-                    tile = self.decoder.parse_dora_indicator(message)
-                    self.table.add_dora_indicator(tile)
-                    logger.info('New dora indicator: {0}'.format(tile))
-
-                if '<reach' in message and 'step="2"' in message:
-                    who_called_riichi = self.decoder.parse_who_called_riichi(message)
-                    self.enemy_riichi(who_called_riichi)
-                    logger.info('Riichi called by {0} player'.format(who_called_riichi))
-
-                # the end of round
-                if 'agari' in message or 'ryuukyoku' in message:
-                    sleep(2)
-                    self._send_message('<NEXTREADY />')
-
-                # t="7" - suggest to open kan
-                open_sets = ['t="1"', 't="2"', 't="3"', 't="4"', 't="5"', 't="7"']
-                if any(i in message for i in open_sets):
-                    sleep(1)
-                    self._send_message('<N />')
-
-                # set call
-                if '<n who=' in message:
-                    meld = self.decoder.parse_meld(message)
-                    self.call_meld(meld)
-                    logger.info('Meld: {0}, who {1}'.format(meld.type, meld.who))
-
-                    # other player upgraded pon to kan, and it is our winning tile
-                    if meld.type == Meld.CHAKAN and 't="8"' in message:
-                        # actually I don't know what exactly client response should be
-                        # let's try usual ron response
-                        self._send_message('<N type="6" />')
-
-                # other players discards: <e, <f, <g + tile number
-                match_discard = re.match(r"^<[efg]+\d.*", message)
-                if match_discard:
-                    # we win by other player's discard
-                    if 't="8"' in message:
-                        self._send_message('<N type="6" />')
-
-                    tile = self.decoder.parse_tile(message)
-
-                    if '<e' in message:
-                        player_seat = 1
-                    elif '<f' in message:
-                        player_seat = 2
-                    else:
-                        player_seat = 3
-
-                    self.enemy_discard(player_seat, tile)
-
-                if 'owari' in message:
-                    values = self.decoder.parse_final_scores_and_uma(message)
-                    self.table.set_players_scores(values['scores'], values['uma'])
-
-                if '<prof' in message:
-                    self.game_is_continue = False
+            message = await self._read_message()
+            if message is None:
+                self.state = 'disconnected'
+                logger.error('Connection was closed by tenhou')
+                break
+
+            token = tokenize(message)
+
+            handler = handlers.get(token[0])
+            if handler:
+                await handler(token)
+
+            if token[1].get('t') in OPEN_SET_SUGGESTIONS:
+                await asyncio.sleep(self.delays.call)
+                self._send_message('<N />')
+
+            await self.writer.drain()
 
         logger.info('Final results: {0}'.format(self.table.get_players_sorted_by_scores()))
 
         # we need to finish the game, and only after this try to send statistics
         # if order will be different, tenhou will return 404 on log download endpoint
-        self.end_game()
+        await self.end_game()
 
         # sometimes log is not available just after the game
         # let's wait one minute before the statistics update
         if settings.STAT_SERVER_URL:
-            sleep(60)
-            result = self.statistics.send_statistics()
+            await asyncio.sleep(STATISTICS_DELAY)
+            result = await asyncio.get_event_loop().run_in_executor(None, self.statistics.send_statistics)
             logger.info('Statistics sent: {0}'.format(result))
 
-    def end_game(self):
+    async def end_game(self):
+        if not self.writer or self.writer.transport.is_closing():
+            return
+
         self.game_is_continue = False
         self._send_message('<BYE />')
 
-        if self.keep_alive_thread:
-            self.keep_alive_thread.join()
+        if self.state == 'playing':
+            self.state = 'finished'
 
-        self.socket.shutdown(socket.SHUT_RDWR)
-        self.socket.close()
+        if self.keep_alive_task:
+            self.keep_alive_task.cancel()
+            # wait for the cancellation, to not leave the pending task in the loop
+            try:
+                await self.keep_alive_task
+            except asyncio.CancelledError:
+                pass
+
+        self.writer.close()
 
         logger.info('End of the game')
 
-    def _send_message(self, message):
-        # tenhou required the empty byte in the end of each sending message
-        logger.debug('Send: {0}'.format(message))
-        message += '\0'
-        self.socket.sendall(message.encode())
+    async def _look_for_game(self, game_type):
+        """
+        :return: log link, when the game is started
+        """
+        while self.looking_for_game:
+            message = await self._read_message()
+            if message is None:
+                return None
 
-    def _read_message(self):
-        message = self.socket.recv(1024)
-        logger.debug('Get: {0}'.format(message.decode('utf-8').replace('\x00', ' ')))
+            tag, attrs = tokenize(message)
 
-        message = message.decode('utf-8')
-        # sometimes tenhou send messages in lower case, sometime in upper case, let's unify the behaviour
-        message = message.lower()
+            if tag == 'rejoin':
+                # game wasn't found, continue to wait
+                self._send_message('<JOIN t="{0},r" />'.format(game_type))
 
-        return message
+            if tag == 'go':
+                self.table.ruleset = self.decoder.parse_game_type((tag, attrs))
+                self._send_message('<GOK />')
+                self._send_message('<NEXTREADY />')
+
+            if tag == 'taikyoku':
+                self.looking_for_game = False
+                game_id, seat = self.decoder.parse_log_link((tag, attrs))
+                self.statistics.game_id = game_id
+                return 'http://tenhou.net/0/?log={0}&tw={1}'.format(game_id, seat)
 
-    def _get_multiple_messages(self):
-        # tenhou can send multiple messages in one request
-        messages = self._read_message()
-        messages = messages.split('\x00')
-        # last message always is empty after split, so let's exclude it
-        messages = messages[0:-1]
+            if tag == 'un':
+                values = self.decoder.parse_names_and_ranks((tag, attrs))
+                self.table.set_players_names_and_ranks(values)
 
-        return messages
+            if tag == 'ln':
+                self._send_message(self._pxr_tag())
 
-    def _send_keep_alive_ping(self):
-        def send_request():
-            while self.game_is_continue:
-                self._send_message('<Z />')
-                sleep(15)
+    async def _wait_for_tag(self, name):
+        while True:
+            message = await self._read_message()
+            if message is None:
+                return False
 
-        self.keep_alive_thread = Thread(target=send_request)
-        self.keep_alive_thread.start()
+            if tokenize(message)[0] == name:
+                return True
+
+    async def _init_round(self, token):
+        main_player = self.table.get_main_player()
+
+        values = self.decoder.parse_initial_values(token)
+        self.table.init_round(
+            values['round_number'],
+            values['count_of_honba_sticks'],
+            values['count_of_riichi_sticks'],
+            values['dora_indicator'],
+            values['dealer'],
+            values['scores'],
+        )
+
+        tiles = self.decoder.parse_initial_hand(token)
+        self.table.init_main_player_hand(tiles)
+        self.count_of_rounds += 1
+
+        logger.info(self.table.__str__())
+        logger.info('Players: {}'.format(self.table.get_players_sorted_by_scores()))
+        logger.info('Dealer: {}'.format(self.table.get_player(values['dealer'])))
+        logger.info('Round  wind: {}'.format(DISPLAY_WINDS[self.table.round_wind]))
+        logger.info('Player wind: {}'.format(DISPLAY_WINDS[main_player.player_wind]))
+
+    async def _draw_and_discard(self, token):
+        main_player = self.table.get_main_player()
+        tile = self.decoder.parse_tile(token)
+
+        if not main_player.in_riichi:
+            self.draw_tile(tile)
+            await asyncio.sleep(self.delays.discard)
+
+            logger.info('Hand: {0}'.format(TilesConverter.to_one_line_string(main_player.tiles)))
+
+            tile = await self._discard_tile()
+
+        if token[1].get('t') == '16':
+            # we win by self draw (tsumo)
+            self._send_message('<N type="7" />')
+        else:
+            # let's call riichi and after this discard tile
+            if main_player.can_call_riichi():
+                self._send_message('<REACH hai="{0}" />'.format(tile))
+                await asyncio.sleep(self.delays.riichi)
+                main_player.in_riichi = True
+
+            # tenhou format: <D p="133" />
+            self._send_message('<D p="{0}"/>'.format(tile))
+
+            logger.info('Remaining tiles: {0}'.format(self.table.count_of_remaining_tiles))
+
+    async def _new_dora_indicator(self, token):
+        # new dora indicator after kan
+        tile = self.decoder.parse_dora_indicator(token)
+        self.table.add_dora_indicator(tile)
+        logger.info('New dora indicator: {0}'.format(tile))
+
+    async def _riichi(self, token):
+        if token[1].get('step') != '2':
+            return
+
+        who_called_riichi = self.decoder.parse_who_called_riichi(token)
+        self.enemy_riichi(who_called_riichi)
+        logger.info('Riichi called by {0} player'.format(who_called_riichi))
+
+    async def _end_of_round(self, token):
+        await asyncio.sleep(self.delays.next_round)
+        self._send_message('<NEXTREADY />')
+
+        if 'owari' in token[1]:
+            values = self.decoder.parse_final_scores_and_uma(token)
+            self.table.set_players_scores(values['scores'], values['uma'])
+
+    async def _meld(self, token):
+        meld = self.decoder.parse_meld(token)
+        self.call_meld(meld)
+        logger.info('Meld: {0}, who {1}'.format(meld.type, meld.who))
+
+        # other player upgraded pon to kan, and it is our winning tile
+        if meld.type == Meld.CHAKAN and token[1].get('t') == '8':
+            # actually I don't know what exactly client response should be
+            # let's try usual ron response
+            self._send_message('<N type="6" />')
+
+    async def _enemy_discard(self, token):
+        tag, attrs = token
+        if 'tile' not in attrs:
+            return
+
+        # we win by other player's discard
+        if attrs.get('t') == '8':
+            self._send_message('<N type="6" />')
+
+        tile = self.decoder.parse_tile(token)
+        self.enemy_discard(DISCARD_SEATS[tag], tile)
+
+    async def _end_of_game(self, token):
+        self.game_is_continue = False
+
+    async def _discard_tile(self):
+        ai = self.player.ai
+        if self.inference:
+            model_input = ai.discard_model_input()
+            if model_input is not None:
+                ai.prediction = await self.inference.predict(model_input)
+        return self.discard_tile()
+
+    async def _read_message(self):
+        message = await read_message(self.reader)
+        self.last_message_time = time.time()
+        return message
+
+    def _send_message(self, message):
+        # tenhou required the empty byte in the end of each sending message
+        logger.debug('Send: {0}'.format(message))
+        message += '\0'
+        self.writer.write(message.encode())
+
+    async def _send_keep_alive_ping(self):
+        while self.game_is_continue:
+            self._send_message('<Z />')
+            await asyncio.sleep(KEEP_ALIVE_INTERVAL)
 
     def _pxr_tag(self):
         # I have no idea why we need to send it, but better to do it
-        if settings.IS_TOURNAMENT:
+        if self.account.is_tournament:
             return '<PXR V="-1" />'
 
-        if settings.USER_ID == 'NoName':
+        if self.account.user_id == 'NoName':
             return '<PXR V="1" />'
         else:
             return '<PXR V="9" />'
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 from urllib.parse import unquote
 
-from bs4 import BeautifulSoup
-
 from mahjong.meld import Meld
+from mahjong.ruleset import Ruleset
 from mahjong.tile import Tile
+from tenhou.tokenizer import tokenize
 
 
 class TenhouDecoder(object):
@@ -33,10 +33,9 @@ class TenhouDecoder(object):
     ]
 
     def parse_auth_string(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        soup = soup.find('helo')
-        if soup and 'auth' in soup.attrs:
-            return soup.attrs['auth']
+        tag, attrs = self._tokenize(message)
+        if tag == 'helo' and 'auth' in attrs:
+            return attrs['auth']
         else:
             return None
 
@@ -50,20 +49,18 @@ class TenhouDecoder(object):
             - Second dice minus one,
             - Dora indicator.
         """
+        _, attrs = self._tokenize(message)
 
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('init')
-
-        seed = tag.attrs['seed'].split(',')
+        seed = attrs['seed'].split(',')
         seed = [int(i) for i in seed]
 
         round_number = seed[0]
         count_of_honba_sticks = seed[1]
         count_of_riichi_sticks = seed[2]
         dora_indicator = seed[5]
-        dealer = int(tag.attrs['oya'])
+        dealer = int(attrs['oya'])
 
-        scores = tag.attrs['ten'].split(',')
+        scores = attrs['ten'].split(',')
         scores = [int(i) for i in scores]
 
         return {
@@ -76,21 +73,18 @@ class TenhouDecoder(object):
         }
 
     def parse_initial_hand(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('init')
+        _, attrs = self._tokenize(message)
 
-        tiles = tag.attrs['hai']
+        tiles = attrs['hai']
         tiles = [int(i) for i in tiles.split(',')]
 
         return tiles
 
     def parse_final_scores_and_uma(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('agari')
-        if not tag:
-            tag = soup.find('ryuukyoku')
+        # it is agari or ryuukyoku tag
+        _, attrs = self._tokenize(message)
 
-        data = tag.attrs['owari']
+        data = attrs['owari']
         data = [float(i) for i in data.split(',')]
 
         # start at the beginning at take every second item (even)
@@ -101,43 +95,46 @@ class TenhouDecoder(object):
         return {'scores': scores, 'uma': uma}
 
     def parse_names_and_ranks(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('un')
+        _, attrs = self._tokenize(message)
 
-        ranks = tag.attrs['dan']
+        ranks = attrs['dan']
         ranks = [int(i) for i in ranks.split(',')]
 
         return [
-            {'name': unquote(tag.attrs['n0']), 'rank': TenhouDecoder.RANKS[ranks[0]]},
-            {'name': unquote(tag.attrs['n1']), 'rank': TenhouDecoder.RANKS[ranks[1]]},
-            {'name': unquote(tag.attrs['n2']), 'rank': TenhouDecoder.RANKS[ranks[2]]},
-            {'name': unquote(tag.attrs['n3']), 'rank': TenhouDecoder.RANKS[ranks[3]]},
+            {'name': unquote(attrs['n0']), 'rank': TenhouDecoder.RANKS[ranks[0]]},
+            {'name': unquote(attrs['n1']), 'rank': TenhouDecoder.RANKS[ranks[1]]},
+            {'name': unquote(attrs['n2']), 'rank': TenhouDecoder.RANKS[ranks[2]]},
+            {'name': unquote(attrs['n3']), 'rank': TenhouDecoder.RANKS[ranks[3]]},
         ]
 
     def parse_log_link(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('taikyoku')
+        _, attrs = self._tokenize(message)
 
-        seat = int(tag.attrs['oya'])
+        seat = int(attrs['oya'])
         seat = (4 - seat) % 4
-        game_id = tag.attrs['log']
+        game_id = attrs['log']
 
         return game_id, seat
 
+    def parse_game_type(self, message):
+        """
+        :param message: <GO type="169" lobby="0"/>
+        :return: Ruleset of the game
+        """
+        _, attrs = self._tokenize(message)
+        return Ruleset.from_game_type(attrs['type'])
+
     def parse_tile(self, message):
         # tenhou format: <t23/>, <e23/>, <f23 t="4"/>, <f23/>, <g23/>
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.findChildren()[0].name
-        tile = tag.replace('t', '').replace('e', '').replace('f', '').replace('g', '')
-        return int(tile)
+        _, attrs = self._tokenize(message)
+        return int(attrs['tile'])
 
     def parse_meld(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        data = soup.find('n').attrs['m']
-        data = int(data)
+        _, attrs = self._tokenize(message)
+        data = int(attrs['m'])
 
         meld = Meld()
-        meld.who = int(soup.find('n').attrs['who'])
+        meld.who = int(attrs['who'])
         meld.from_who = data & 0x3
 
         if data & 0x4:
@@ -182,14 +179,12 @@ class TenhouDecoder(object):
         meld.tiles = [Tile(data >> 8)]
 
     def parse_dora_indicator(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('dora')
-        return int(tag.attrs['hai'])
+        _, attrs = self._tokenize(message)
+        return int(attrs['hai'])
 
     def parse_who_called_riichi(self, message):
-        soup = BeautifulSoup(message, 'html.parser')
-        tag = soup.find('reach')
-        return int(tag.attrs['who'])
+        _, attrs = self._tokenize(message)
+        return int(attrs['who'])
 
     def generate_auth_token(self, auth_string):
         translation_table = [63006, 9570, 49216, 45888, 9822, 23121, 59830, 51114, 54831, 4189, 580, 5203, 42174, 59972,
@@ -214,3 +209,12 @@ class TenhouDecoder(object):
         result = first_part + '-' + postfix
 
         return result
+
+    def _tokenize(self, message):
+        """
+        :param message: string with the message or (tag name, attributes) tuple,
+        if the message was already tokenized
+        """
+        if isinstance(message, tuple):
+            return message
+        return tokenize(message)
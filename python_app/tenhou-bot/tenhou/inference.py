@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Model predictions for the many tables in one event loop.
+
+Every table asks for one sample, the samples that were asked in a short time window
+are stacked and predicted with one model call. The model is called in one worker thread,
+so the event loop is not blocked and the model is never called concurrently.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# how long the first sample waits for the other samples, in seconds
+MAX_DELAY = 0.005
+MAX_BATCH_SIZE = 64
+
+
+class InferenceBatcher(object):
+    model = None
+    max_batch_size = MAX_BATCH_SIZE
+    max_delay = MAX_DELAY
+
+    # statistics for the health report
+    count_of_batches = 0
+    count_of_samples = 0
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_delay=MAX_DELAY):
+        """
+        :param model: object with keras like predict(inputs, batch_size, verbose) method
+        :param max_batch_size: the batch is predicted immediately, when it has this count of samples
+        :param max_delay: seconds, the batch is predicted after this delay even if it is not full
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.count_of_batches = 0
+        self.count_of_samples = 0
+
+        self._pending = []
+        self._timer = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def predict(self, model_input):
+        """
+        :param model_input: array with one sample, the first axis is the batch axis
+        :return: model output for the sample
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((model_input, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif not self._timer:
+            self._timer = asyncio.get_event_loop().call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._predict_batch(pending))
+
+    async def _predict_batch(self, pending):
+        inputs = np.concatenate([x[0] for x in pending])
+        predict = functools.partial(self.model.predict, inputs, batch_size=len(inputs), verbose=0)
+
+        try:
+            outputs = await asyncio.get_event_loop().run_in_executor(self._executor, predict)
+        # the error is for the every table from the batch
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.count_of_batches += 1
+        self.count_of_samples += len(pending)
+
+        for (_, future), output in zip(pending, outputs):
+            # the table could be closed while it waited for the prediction
+            if not future.done():
+                future.set_result(output)
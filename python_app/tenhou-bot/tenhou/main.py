@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import logging
-import socket
 
 from tenhou.client import TenhouClient
 from utils.settings_handler import settings
@@ -9,23 +9,39 @@ from utils.settings_handler import settings
 logger = logging.getLogger('tenhou')
 
 
-def connect_and_play():
-    logger.info('Bot AI enabled: {}'.format(settings.ENABLE_AI))
-
+async def play_game():
     client = TenhouClient()
+    await client.connect(settings.TENHOU_HOST, settings.TENHOU_PORT)
+    await client.play()
+
+
+def run_until_complete(coroutine):
+    """
+    Run the coroutine in the new event loop, on ctrl+c the coroutine is cancelled
+    and the loop runs until the end of the cancellation (asyncio.run is not available in python 3.5)
+    :return: result of the coroutine
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    task = asyncio.ensure_future(coroutine, loop=loop)
+    try:
+        return loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        task.cancel()
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        raise
+    finally:
+        loop.close()
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((settings.TENHOU_HOST, settings.TENHOU_PORT))
 
-    client.setSocketObject(s)
+def connect_and_play():
+    logger.info('Bot AI enabled: {}'.format(settings.ENABLE_AI))
 
     try:
-        was_auth = client.authenticate()
-
-        if was_auth:
-            client.start_game()
-        else:
-            client.end_game()
+        run_until_complete(play_game())
     except KeyboardInterrupt:
-        logger.info('Ending the game... can take 15 seconds')
-        client.end_game()
+        # the game task was cancelled and the client already said bye to tenhou
+        logger.info('The game was ended')
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Many tenhou sessions in one process.
+
+Every session is one account that plays games one by one on its own connection,
+the all sessions are played concurrently in one event loop.
+Caches and models of the AI are module level objects, so they are shared by the all tables,
+and discards that need a model are predicted in batches by one InferenceBatcher.
+"""
+import asyncio
+import logging
+import time
+
+from terminaltables import AsciiTable
+
+from tenhou.client import TenhouClient
+from utils.settings_handler import settings
+
+logger = logging.getLogger('tenhou')
+
+# seconds before the next connection attempt after the error
+RECONNECT_DELAY = 30
+# the session is stopped after this count of errors in a row
+MAX_ERRORS_IN_ROW = 5
+HEALTH_REPORT_INTERVAL = 60
+
+
+class TenhouSession(object):
+    name = ''
+    account = None
+    count_of_games = 1
+    client = None
+
+    games_played = 0
+    errors = 0
+    last_error = ''
+    is_stopped = False
+    reconnect_delay = RECONNECT_DELAY
+
+    def __init__(self, name, account, count_of_games=1, delays=None, inference=None):
+        """
+        :param name: name of the session in the logs and the health reports
+        :param account: TenhouAccount of the session
+        :param count_of_games: how much games the session will play, 0 for the endless playing
+        :param delays: DelayPolicy of the clients
+        :param inference: shared InferenceBatcher
+        """
+        self.name = name
+        self.account = account
+        self.count_of_games = count_of_games
+        self.delays = delays
+        self.inference = inference
+
+        self.client = None
+        self.games_played = 0
+        self.errors = 0
+        self.last_error = ''
+        self.is_stopped = False
+
+    async def run(self, host, port):
+        errors_in_row = 0
+
+        while not self.count_of_games or self.games_played < self.count_of_games:
+            self.client = None
+
+            try:
+                self.client = self.create_client()
+                await self.client.connect(host, port)
+                await self.client.play()
+            # ctrl+c, the session should be stopped
+            except asyncio.CancelledError:
+                raise
+            # one broken session should not stop the other sessions,
+            # connection, decoder and AI errors are the errors of this game only
+            except Exception as e:
+                if self.client:
+                    self.client.state = 'error'
+                self.last_error = '{0}: {1}'.format(e.__class__.__name__, e)
+                logger.exception('{0}. {1}'.format(self.name, self.last_error))
+
+            if self.client and self.client.state == 'finished':
+                self.games_played += 1
+                errors_in_row = 0
+            else:
+                self.errors += 1
+                errors_in_row += 1
+
+                if errors_in_row >= MAX_ERRORS_IN_ROW:
+                    logger.error('{0}. Session was stopped after {1} errors'.format(self.name, errors_in_row))
+                    break
+
+                await asyncio.sleep(self.reconnect_delay)
+
+        self.is_stopped = True
+
+    def create_client(self):
+        return TenhouClient(self.delays, self.account, self.inference)
+
+    def health(self):
+        """
+        :return: dictionary with the state of the session
+        """
+        client = self.client
+        last_message = client and client.last_message_time
+        return {
+            'name': self.name,
+            'state': self.is_stopped and 'stopped' or (client and client.state or 'created'),
+            'games': self.games_played,
+            'rounds': client and client.count_of_rounds or 0,
+            'seconds since last message': last_message and int(time.time() - last_message),
+            'errors': self.errors,
+            'last error': self.last_error,
+        }
+
+
+class SessionRunner(object):
+    sessions = []
+    inference = None
+    health_interval = HEALTH_REPORT_INTERVAL
+
+    def __init__(self, sessions, inference=None, health_interval=HEALTH_REPORT_INTERVAL):
+        """
+        :param sessions: list of TenhouSession
+        :param inference: InferenceBatcher of the sessions, it is for the batches statistics
+        :param health_interval: seconds between the health reports
+        """
+        self.sessions = sessions
+        self.inference = inference
+        self.health_interval = health_interval
+
+    async def run(self, host=None, port=None):
+        host = host or settings.TENHOU_HOST
+        port = port or settings.TENHOU_PORT
+
+        reporter = asyncio.ensure_future(self._report_health())
+        try:
+            await asyncio.gather(*[x.run(host, port) for x in self.sessions])
+        finally:
+            # on ctrl+c the sessions are cancelled and every client says bye to tenhou by itself
+            reporter.cancel()
+            try:
+                await reporter
+            except asyncio.CancelledError:
+                pass
+            if self.inference:
+                self.inference.close()
+
+        logger.info(self.health_report())
+
+    def health_report(self):
+        columns = ['name', 'state', 'games', 'rounds', 'seconds since last message', 'errors', 'last error']
+        table_data = [[x.capitalize() for x in columns]]
+        for session in self.sessions:
+            health = session.health()
+            table_data.append([health[x] is None and '-' or health[x] for x in columns])
+
+        report = '\n' + AsciiTable(table_data).table
+
+        if self.inference and self.inference.count_of_batches:
+            report += '\nPredictions: {0}, batches: {1}, average batch: {2:.1f}'.format(
+                self.inference.count_of_samples,
+                self.inference.count_of_batches,
+                self.inference.count_of_samples / self.inference.count_of_batches
+            )
+
+        return report
+
+    async def _report_health(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            logger.info(self.health_report())
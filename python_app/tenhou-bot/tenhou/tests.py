@@ -1,11 +1,36 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import logging
 import unittest
 
+import numpy as np
+
+from benchmarks.decoder import RECORDED_STREAM
+from tenhou.client import read_message, DelayPolicy, TenhouAccount, TenhouClient
 from tenhou.decoder import TenhouDecoder, Meld
+from tenhou.inference import InferenceBatcher
+from tenhou.main import run_until_complete
+from tenhou.runner import TenhouSession, SessionRunner
+from tenhou.tokenizer import tokenize, tokenize_stream
+from utils.settings_handler import settings
 
 
 class TenhouDecoderTestCase(unittest.TestCase):
 
+    def test_tokenize(self):
+        tag, attrs = tokenize('<INIT seed="0,2,3,0,1,126" ten="250,250,250,250" oya="3"/>')
+        self.assertEqual(tag, 'init')
+        self.assertEqual(attrs, {'seed': '0,2,3,0,1,126', 'ten': '250,250,250,250', 'oya': '3'})
+
+        # tile number is the attribute
+        self.assertEqual(tokenize('<e45 t="8"/>'), ('e', {'t': '8', 'tile': '45'}))
+        self.assertEqual(tokenize('<T23/>'), ('t', {'tile': '23'}))
+        self.assertEqual(tokenize('<U/>'), ('u', {}))
+        self.assertEqual(tokenize(''), (None, {}))
+
+        log = '<mjloggm ver="2.3"><GO type="169" lobby="0"/><TAIKYOKU oya="0"/><T12/><D12/></mjloggm>'
+        self.assertEqual([x[0] for x in tokenize_stream(log)], ['mjloggm', 'go', 'taikyoku', 't', 'd'])
+
     def test_parse_initial_round_values(self):
         decoder = TenhouDecoder()
         message = '<INIT seed="0,2,3,0,1,126" ten="250,250,250,250" oya="3" ' \
@@ -72,6 +97,33 @@ class TenhouDecoderTestCase(unittest.TestCase):
         self.assertEqual(game_id, '2016031911gm-0001-0000-381f693b')
         self.assertEqual(position, 3)
 
+    def test_parse_game_type(self):
+        decoder = TenhouDecoder()
+
+        # hanchan ari-ari
+        ruleset = decoder.parse_game_type('<GO type="9" lobby="0"/>')
+        self.assertEqual(ruleset.aka_dora, True)
+        self.assertEqual(ruleset.open_tanyao, True)
+        self.assertEqual(ruleset.hanchan, True)
+        self.assertEqual(ruleset.sanma, False)
+
+        # dan lobby hanchan without red fives and open tanyao
+        ruleset = decoder.parse_game_type('<GO type="175" lobby="0"/>')
+        self.assertEqual(ruleset.aka_dora, False)
+        self.assertEqual(ruleset.open_tanyao, False)
+        self.assertEqual(ruleset.hanchan, True)
+        self.assertEqual(ruleset.aka_dora_tiles, frozenset())
+
+        # three players game
+        ruleset = decoder.parse_game_type('<GO type="177" lobby="0"/>')
+        self.assertEqual(ruleset.sanma, True)
+        self.assertEqual(ruleset.count_of_players, 3)
+
+        # rulesets are values, so they can be a part of the cache key
+        self.assertEqual(decoder.parse_game_type('<GO type="169"/>'), decoder.parse_game_type('<GO type="169"/>'))
+        with self.assertRaises(AttributeError):
+            ruleset.aka_dora = True
+
     def test_auth_message(self):
         decoder = TenhouDecoder()
         message = '<HELO uname="%4E%6F%4E%61%6D%65" auth="20160318-54ebe070" ratingscale=""/>'
@@ -152,3 +204,266 @@ class TenhouDecoderTestCase(unittest.TestCase):
 
         who = decoder.parse_who_called_riichi('<REACH who="2" ten="255,216,261,258" step="2"/>')
         self.assertEqual(who, 2)
+
+
+class TenhouClientTestCase(unittest.TestCase):
+
+    class FakeWriter(object):
+        """
+        Stores the sent messages instead of the sending
+        """
+
+        def __init__(self):
+            self.messages = []
+            self.closed = False
+            self.transport = self
+
+        def write(self, data):
+            self.messages.append(data.decode()[:-1])
+
+        async def drain(self):
+            pass
+
+        def is_closing(self):
+            return self.closed
+
+        def close(self):
+            self.closed = True
+
+    def setUp(self):
+        logging.getLogger('tenhou').disabled = True
+
+    def tearDown(self):
+        logging.getLogger('tenhou').disabled = False
+
+    def _client(self):
+        client = TenhouClient(DelayPolicy(), TenhouAccount())
+        client.writer = self.FakeWriter()
+        return client
+
+    def _init_round(self, client):
+        init = '<init seed="0,2,3,0,1,126" ten="250,250,250,250" oya="3" ' \
+               'hai="30,67,44,21,133,123,87,69,36,34,94,4,128"/>'
+        run_until_complete(client._init_round(tokenize(init)))
+
+    def test_read_message(self):
+        async def read_all():
+            reader = asyncio.StreamReader()
+            # one message can come in the few chunks and one chunk can have the few messages
+            reader.feed_data(b'<INIT seed="0,2,3,0,1,126" ')
+            reader.feed_data(b'oya="3"/>\x00<T23/>\x00<U/')
+            reader.feed_data(b'>\x00<E45')
+            reader.feed_eof()
+
+            messages = []
+            message = await read_message(reader)
+            while message is not None:
+                messages.append(message)
+                message = await read_message(reader)
+            return messages
+
+        messages = run_until_complete(read_all())
+        self.assertEqual(messages, ['<init seed="0,2,3,0,1,126" oya="3"/>', '<t23/>', '<u/>'])
+
+    def test_play_recorded_game(self):
+        received = []
+        messages = RECORDED_STREAM.split('\x00')[:-1]
+
+        async def handle(reader, writer):
+            while True:
+                try:
+                    data = await reader.readuntil(b'\x00')
+                except asyncio.IncompleteReadError:
+                    break
+
+                message = data[:-1].decode()
+                received.append(message)
+
+                if message.startswith('<HELO'):
+                    writer.write((messages[0] + '\x00').upper().encode())
+                elif message.startswith('<PXR'):
+                    writer.write((messages[1] + '\x00').upper().encode())
+                elif message.startswith('<JOIN'):
+                    # tenhou sends upper case tags, one message can be split between the chunks
+                    game = ('\x00'.join(messages[2:]) + '\x00').upper().encode()
+                    for i in range(0, len(game), 37):
+                        writer.write(game[i:i + 37])
+                        await writer.drain()
+                elif message.startswith('<BYE'):
+                    writer.close()
+                    break
+
+        async def play():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            client = TenhouClient(DelayPolicy(), TenhouAccount())
+            await client.connect('127.0.0.1', server.sockets[0].getsockname()[1])
+            await client.play()
+            server.close()
+            await server.wait_closed()
+            return client
+
+        client = run_until_complete(play())
+
+        self.assertEqual(client.state, 'finished')
+        self.assertEqual(client.count_of_rounds, 1)
+        self.assertEqual(client.statistics.game_id, '2016031911gm-0001-0000-381f693b')
+        self.assertEqual(client.table.get_player(2).scores, 34300)
+
+        # keep alive ping is sent from the other task
+        self.assertIn('<Z />', received)
+        received = [x for x in received if x != '<Z />']
+        self.assertEqual(received[0:6], [
+            '<HELO name="NoName" tid="f0" sx="M" />',
+            '<AUTH val="20160318-72b5ba21"/>',
+            '<PXR V="1" />',
+            '<JOIN t="0,1" />',
+            '<GOK />',
+            '<NEXTREADY />',
+        ])
+        # four draws, two call suggestions, ron and the end of the round
+        self.assertEqual([x.startswith('<D p=') and '<D />' or x for x in received[6:]], [
+            '<D />', '<N />', '<D />', '<D />', '<N />', '<D />', '<N type="6" />', '<NEXTREADY />', '<BYE />'
+        ])
+
+    def test_tsumo_reply(self):
+        client = self._client()
+        self._init_round(client)
+        client.player.in_riichi = True
+
+        run_until_complete(client._draw_and_discard(tokenize('<t23 t="16"/>')))
+        self.assertEqual(client.writer.messages, ['<N type="7" />'])
+
+    def test_ron_reply(self):
+        client = self._client()
+        self._init_round(client)
+
+        run_until_complete(client._enemy_discard(tokenize('<f45 t="8"/>')))
+        self.assertEqual(client.writer.messages, ['<N type="6" />'])
+        self.assertEqual(client.table.get_player(2).discards, [45])
+
+        # tag without tile is not a discard
+        run_until_complete(client._enemy_discard(tokenize('<f/>')))
+        self.assertEqual(len(client.table.get_player(2).discards), 1)
+
+    def test_riichi_reply(self):
+        client = self._client()
+        self._init_round(client)
+        client.player.in_tempai = True
+
+        run_until_complete(client._draw_and_discard(tokenize('<t23/>')))
+
+        tile = client.player.discards[0]
+        self.assertEqual(client.writer.messages, ['<REACH hai="{0}" />'.format(tile), '<D p="{0}"/>'.format(tile)])
+        self.assertTrue(client.player.in_riichi)
+
+    def test_delay_policy(self):
+        human_like_delays = settings.HUMAN_LIKE_DELAYS
+        try:
+            settings.HUMAN_LIKE_DELAYS = False
+            delays = DelayPolicy.from_settings()
+            self.assertEqual((delays.discard, delays.riichi, delays.call, delays.next_round), (0, 0, 0, 0))
+
+            settings.HUMAN_LIKE_DELAYS = True
+            delays = DelayPolicy.from_settings()
+            self.assertEqual((delays.discard, delays.riichi, delays.call, delays.next_round), (1, 2, 1, 2))
+        finally:
+            settings.HUMAN_LIKE_DELAYS = human_like_delays
+
+    def test_end_game(self):
+        client = self._client()
+
+        async def end_game():
+            client.keep_alive_task = asyncio.ensure_future(client._send_keep_alive_ping())
+            await asyncio.sleep(0)
+            await client.end_game()
+            # the second call does nothing
+            await client.end_game()
+            await asyncio.sleep(0)
+            return client.keep_alive_task
+
+        keep_alive_task = run_until_complete(end_game())
+
+        self.assertEqual(client.writer.messages, ['<Z />', '<BYE />'])
+        self.assertTrue(keep_alive_task.cancelled())
+        self.assertFalse(client.game_is_continue)
+        self.assertTrue(client.writer.closed)
+
+
+class InferenceBatcherTestCase(unittest.TestCase):
+
+    class SumModel(object):
+        def __init__(self):
+            self.batch_sizes = []
+
+        def predict(self, inputs, batch_size=None, verbose=0):
+            self.batch_sizes.append(len(inputs))
+            return inputs.sum(axis=1)
+
+    def test_predictions_from_many_tables_in_one_batch(self):
+        model = self.SumModel()
+
+        async def predict_all():
+            batcher = InferenceBatcher(model, max_batch_size=4, max_delay=0.01)
+            results = await asyncio.gather(*[batcher.predict(np.array([[x, x]])) for x in range(0, 6)])
+            batcher.close()
+            return results, batcher
+
+        results, batcher = run_until_complete(predict_all())
+
+        self.assertEqual([int(x) for x in results], [0, 2, 4, 6, 8, 10])
+        # the first batch is full, the second one is predicted after the delay
+        self.assertEqual(model.batch_sizes, [4, 2])
+        self.assertEqual(batcher.count_of_batches, 2)
+        self.assertEqual(batcher.count_of_samples, 6)
+
+
+class SessionRunnerTestCase(unittest.TestCase):
+
+    class FakeClient(object):
+        last_message_time = None
+        count_of_rounds = 0
+
+        def __init__(self, error=None):
+            self.error = error
+            self.state = 'created'
+
+        async def connect(self, host, port):
+            self.state = 'connecting'
+
+        async def play(self):
+            await asyncio.sleep(0)
+            if self.error:
+                raise self.error
+            self.state = 'finished'
+
+    class FakeSession(TenhouSession):
+        reconnect_delay = 0
+
+        def __init__(self, name, count_of_games, error=None):
+            super(SessionRunnerTestCase.FakeSession, self).__init__(name, None, count_of_games)
+            self.error = error
+
+        def create_client(self):
+            return SessionRunnerTestCase.FakeClient(self.error)
+
+    def setUp(self):
+        logging.getLogger('tenhou').disabled = True
+
+    def tearDown(self):
+        logging.getLogger('tenhou').disabled = False
+
+    def test_broken_session_does_not_stop_other_sessions(self):
+        healthy = self.FakeSession('healthy', 3)
+        broken = self.FakeSession('broken', 3, KeyError('owari'))
+        runner = SessionRunner([healthy, broken], health_interval=60)
+
+        run_until_complete(runner.run('localhost', 10080))
+
+        self.assertEqual(healthy.games_played, 3)
+        self.assertEqual(healthy.errors, 0)
+
+        # the broken session was stopped after the errors in a row
+        self.assertEqual(broken.games_played, 0)
+        self.assertEqual(broken.errors, 5)
+        self.assertEqual(broken.last_error, "KeyError: 'owari'")
+        self.assertEqual(broken.health()['state'], 'stopped')
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Every tenhou message is one xml tag, for example <INIT seed="0,2,3,0,1,126" oya="3" hai="30,67,44"/>,
+so instead of the xml tree we need only the tag name and its attributes.
+
+Tag and attribute names are in lower case, attribute values are not changed.
+Draw and discard tags have the tile number in the tag name: <T23/>, <e45 t="8"/>,
+for them the tile is moved to the "tile" attribute and the tag name is only the letter.
+"""
+import re
+
+TAG_REGEX = re.compile(r'<\s*([a-zA-Z]+)(\d*)([^>]*)>')
+ATTRIBUTE_REGEX = re.compile(r'([a-zA-Z_][\w.-]*)\s*=\s*"([^"]*)"')
+
+
+def tokenize(message):
+    """
+    :param message: string with one tenhou message
+    :return: tuple of the tag name and the dictionary of attributes, (None, {}) if there is no tag
+    """
+    match = TAG_REGEX.search(message)
+    if not match:
+        return None, {}
+    return _token(match)
+
+
+def tokenize_stream(data):
+    """
+    :param data: string with the many tags: \0 delimited messages or the whole mjlog
+    :return: generator of (tag name, attributes) tuples in the order of tags
+    """
+    for match in TAG_REGEX.finditer(data):
+        yield _token(match)
+
+
+def _token(match):
+    name, tile, attributes = match.groups()
+
+    attrs = {}
+    if attributes:
+        for key, value in ATTRIBUTE_REGEX.findall(attributes):
+            attrs[key.lower()] = value
+
+    if tile:
+        attrs['tile'] = tile
+
+    return name.lower(), attrs
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from validate_corpus import init_worker, load_checkpoint, repair_summary, summarize, validate_file
+
+# two rounds with the same closed hand: 234m 567m 234p 678s 55s and ron on 2m,
+# riichi, pinfu and tanyao are 3 han 30 fu, 3900 for the non dealer.
+# in the second round tenhou values are changed: pinfu is missed, 2 han 40 fu 2600
+LOG = (
+    '<mjloggm ver="2.3"><GO type="169" lobby="0"/><TAIKYOKU oya="0"/>'
+    '<INIT seed="0,0,0,1,2,108" ten="250,250,250,250" oya="0" hai0="" hai1="" hai2="" hai3=""/>'
+    '<AGARI ba="0,0" hai="{hand}" machi="4" ten="30,3900,0" yaku="1,1,7,1,8,1" dorahai="120" who="1" fromwho="2"/>'
+    '<INIT seed="1,0,0,1,2,108" ten="250,250,250,250" oya="1" hai0="" hai1="" hai2="" hai3=""/>'
+    '<AGARI ba="0,0" hai="{hand}" machi="4" ten="40,2600,0" yaku="1,1,8,1" dorahai="120" who="2" fromwho="3"/>'
+    '</mjloggm>'
+).format(hand='4,8,12,17,20,24,40,44,48,92,96,100,89,90')
+
+
+class ValidateCorpusTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.summary_file = os.path.join(self.directory, 'summary.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        logging.getLogger('validate_hand').disabled = False
+
+    def _summary(self, path):
+        return {'path': path, 'log': path, 'total': 2, 'successful': 2, 'mismatches': []}
+
+    def test_resume_after_kill(self):
+        # validation was killed in the middle of the third line
+        with open(self.summary_file, 'w') as f:
+            f.write(json.dumps(self._summary('1.mjlog')) + '\n')
+            f.write(json.dumps(self._summary('2.mjlog')) + '\n')
+            f.write(json.dumps(self._summary('3.mjlog'))[:20])
+
+        repair_summary(self.summary_file)
+        self.assertEqual(load_checkpoint(self.summary_file), {'1.mjlog', '2.mjlog'})
+
+        # the same append as in the validation
+        with open(self.summary_file, 'a') as f:
+            f.write(json.dumps(self._summary('3.mjlog')) + '\n')
+            f.write(json.dumps(self._summary('4.mjlog')) + '\n')
+
+        self.assertEqual(load_checkpoint(self.summary_file), {'1.mjlog', '2.mjlog', '3.mjlog', '4.mjlog'})
+        totals, _, _ = summarize(self.summary_file)
+        self.assertEqual(totals['logs'], 4)
+        self.assertEqual(totals['hands'], 8)
+
+    def test_repair_complete_summary(self):
+        repair_summary(self.summary_file)
+        self.assertFalse(os.path.exists(self.summary_file))
+
+        line = json.dumps(self._summary('1.mjlog')) + '\n'
+        with open(self.summary_file, 'w') as f:
+            f.write(line)
+
+        repair_summary(self.summary_file)
+        with open(self.summary_file, 'r') as f:
+            self.assertEqual(f.read(), line)
+
+    def test_validate_and_summarize(self):
+        init_worker()
+        with open(os.path.join(self.directory, '2017010100gm-0009-0000-00000000.mjlog'), 'w') as f:
+            f.write(LOG)
+        with open(os.path.join(self.directory, 'broken.mjlog'), 'w') as f:
+            f.write('<mjloggm ver="2.3"><GO type="abc" lobby="0"/></mjloggm>')
+
+        summary = validate_file((self.directory, '2017010100gm-0009-0000-00000000.mjlog'))
+        self.assertEqual(summary['log'], '2017010100gm-0009-0000-00000000')
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['successful'], 1)
+        self.assertFalse('error' in summary)
+        self.assertEqual(len(summary['mismatches']), 1)
+
+        mismatch = summary['mismatches'][0]
+        self.assertEqual(mismatch['round'], 1)
+        self.assertEqual(mismatch['winner'], 2)
+        self.assertEqual(mismatch['yaku'], [1, 8])
+        self.assertEqual(mismatch['fu'], (30, 40))
+        self.assertEqual(mismatch['han'], (3, 2))
+        self.assertEqual(mismatch['cost'], (3900, 2600))
+        self.assertIsNone(mismatch['error'])
+
+        broken = validate_file((self.directory, 'broken.mjlog'))
+        self.assertEqual(broken['total'], 0)
+        self.assertEqual(broken['mismatches'], [])
+        self.assertTrue(broken['error'].startswith('ValueError'))
+
+        with open(self.summary_file, 'w') as f:
+            f.write(json.dumps(summary) + '\n')
+            f.write(json.dumps(broken) + '\n')
+
+        totals, yaku, differences = summarize(self.summary_file)
+        self.assertEqual(totals['logs'], 2)
+        self.assertEqual(totals['broken logs'], 1)
+        self.assertEqual(totals['hands'], 2)
+        self.assertEqual(totals['successful hands'], 1)
+        self.assertEqual(totals['calculation errors'], 0)
+        self.assertEqual(yaku, {'Riichi': 1, 'Tanyao': 1})
+        self.assertEqual(differences['fu'], {-10: 1})
+        self.assertEqual(differences['han'], {1: 1})
+        self.assertEqual(differences['cost'], {1300: 1})
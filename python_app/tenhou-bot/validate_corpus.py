@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Validate our hand calculation on the directory with tenhou.net replays.
+
+Logs (plain or gzipped mjlog files) are validated in the pool of processes.
+The result of every log is appended to the summary file as a one json line,
+so the validation can be stopped and started again with the same summary file:
+already validated logs will be skipped.
+
+python validate_corpus.py -d logs/ -s summary.jsonl -p 8
+"""
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from multiprocessing import Pool, cpu_count
+from optparse import OptionParser
+
+from terminaltables import AsciiTable
+from tqdm import tqdm
+
+from validate_hand import TenhouLogParser
+
+# yaku names in the order of tenhou yaku ids
+TENHOU_YAKU = [
+    'Menzen Tsumo', 'Riichi', 'Ippatsu', 'Chankan', 'Rinshan Kaihou', 'Haitei Raoyue', 'Houtei Raoyui', 'Pinfu',
+    'Tanyao', 'Iipeiko', 'Seat Wind (east)', 'Seat Wind (south)', 'Seat Wind (west)', 'Seat Wind (north)',
+    'Round Wind (east)', 'Round Wind (south)', 'Round Wind (west)', 'Round Wind (north)', 'Yakuhai (haku)',
+    'Yakuhai (hatsu)', 'Yakuhai (chun)', 'Double Riichi', 'Chiitoitsu', 'Chanta', 'Ittsu', 'Sanshoku Doujun',
+    'Sanshoku Doukou', 'San Kantsu', 'Toitoi', 'San Ankou', 'Shou Sangen', 'Honroto', 'Ryanpeikou', 'Junchan',
+    'Honitsu', 'Chinitsu', 'Renhou', 'Tenhou', 'Chiihou', 'Daisangen', 'Suu ankou', 'Suu ankou tanki',
+    'Tsuu iisou', 'Ryuu iisou', 'Chinroutou', 'Chuuren Poutou', 'Daburu Chuuren Poutou', 'Kokushi musou',
+    'Daburu Kokushi musou', 'Dai Suushii', 'Shou Suushii', 'Suu kantsu', 'Dora', 'Ura Dora', 'Aka Dora',
+]
+
+LOG_EXTENSIONS = ('.mjlog', '.xml', '.gz')
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def find_logs(directory):
+    """
+    :return: sorted list of the log paths, they are relative to the directory
+    """
+    paths = []
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            if file_name.endswith(LOG_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(root, file_name), directory))
+    return sorted(paths)
+
+
+def read_log(file_name):
+    """
+    :return: log xml, gzipped files are decompressed
+    """
+    with open(file_name, 'rb') as f:
+        content = f.read()
+
+    if content.startswith(GZIP_MAGIC):
+        content = gzip.decompress(content)
+
+    return content.decode('utf-8')
+
+
+def load_checkpoint(summary_file):
+    """
+    :return: set of the logs that are already in the summary
+    """
+    if not os.path.exists(summary_file):
+        return set()
+
+    validated = set()
+    with open(summary_file, 'r') as f:
+        for line in f:
+            # the last line can be broken, if the validation was killed
+            try:
+                validated.add(json.loads(line)['path'])
+            except ValueError:
+                continue
+    return validated
+
+
+def repair_summary(summary_file):
+    """
+    Remove the broken last line, if the validation was killed in the middle of the line.
+    Without it the first new result would be appended to the broken line and it would be lost
+    """
+    if not os.path.exists(summary_file):
+        return
+
+    with open(summary_file, 'rb+') as f:
+        content = f.read()
+        if content and not content.endswith(b'\n'):
+            f.truncate(content.rfind(b'\n') + 1)
+
+
+def init_worker():
+    # mismatches are stored in the summary, we don't need to log them in the every process
+    logging.getLogger('validate_hand').disabled = True
+
+
+def validate_file(task):
+    """
+    :param task: tuple with logs directory and log path
+    :return: dictionary with the log results, it is one line of the summary
+    """
+    directory, path = task
+    log_id = os.path.basename(path).split('.')[0]
+    summary = {'path': path, 'log': log_id, 'total': 0, 'successful': 0, 'mismatches': []}
+
+    try:
+        for result in TenhouLogParser().validate_log(read_log(os.path.join(directory, path)), log_id):
+            summary['total'] += 1
+            if result['success']:
+                summary['successful'] += 1
+            else:
+                summary['mismatches'].append(result)
+    # broken log should not stop the whole validation
+    except Exception as e:
+        summary['error'] = '{0}: {1}'.format(e.__class__.__name__, e)
+
+    return summary
+
+
+def summarize(summary_file):
+    """
+    :return: totals, per yaku counts of mismatched hands and fu, han and cost differences
+    """
+    totals = Counter()
+    yaku = Counter()
+    differences = {'fu': Counter(), 'han': Counter(), 'cost': Counter()}
+
+    with open(summary_file, 'r') as f:
+        for line in f:
+            try:
+                summary = json.loads(line)
+            except ValueError:
+                continue
+
+            totals['logs'] += 1
+            totals['broken logs'] += 'error' in summary
+            totals['hands'] += summary['total']
+            totals['successful hands'] += summary['successful']
+
+            for mismatch in summary['mismatches']:
+                totals['calculation errors'] += bool(mismatch['error'])
+                for yaku_id in mismatch['yaku']:
+                    yaku[yaku_id < len(TENHOU_YAKU) and TENHOU_YAKU[yaku_id] or str(yaku_id)] += 1
+
+                for name in differences.keys():
+                    ours, tenhou = mismatch[name]
+                    if ours != tenhou:
+                        differences[name][(ours or 0) - tenhou] += 1
+
+    return totals, yaku, differences
+
+
+def print_summary(summary_file):
+    totals, yaku, differences = summarize(summary_file)
+
+    columns = ['logs', 'broken logs', 'hands', 'successful hands', 'calculation errors']
+    table_data = [[x.capitalize() for x in columns], [totals[x] for x in columns]]
+    print(AsciiTable(table_data).table)
+
+    if yaku:
+        table_data = [['Yaku', 'Mismatched hands']]
+        table_data += [[name, count] for name, count in yaku.most_common()]
+        print(AsciiTable(table_data).table)
+
+    for name in ['fu', 'han', 'cost']:
+        if not differences[name]:
+            continue
+        table_data = [['Our {0} - tenhou {0}'.format(name), 'Hands']]
+        table_data += [[difference, count] for difference, count in sorted(differences[name].items())]
+        print(AsciiTable(table_data).table)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('-d', '--directory', type='string', help='Directory with tenhou logs')
+    parser.add_option('-s', '--summary', type='string', default='validate_corpus.jsonl',
+                      help='Summary file, validation continues from it')
+    parser.add_option('-p', '--processes', type='int', default=cpu_count(), help='Count of processes')
+
+    opts, _ = parser.parse_args()
+    if not opts.directory:
+        parser.error('Logs directory is required')
+
+    repair_summary(opts.summary)
+    validated = load_checkpoint(opts.summary)
+    tasks = [(opts.directory, x) for x in find_logs(opts.directory) if x not in validated]
+
+    with open(opts.summary, 'a') as f:
+        pool = Pool(opts.processes, initializer=init_worker)
+        try:
+            for summary in tqdm(pool.imap_unordered(validate_file, tasks, chunksize=8), total=len(tasks)):
+                f.write(json.dumps(summary) + '\n')
+                f.flush()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    print_summary(opts.summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,14 +10,14 @@ import logging
 import sys
 
 import os
-from bs4 import BeautifulSoup
 from functools import reduce
 
 from mahjong.constants import EAST, SOUTH, WEST, NORTH
 from mahjong.hand import FinishedHand
+from mahjong.ruleset import Ruleset
 from mahjong.tile import TilesConverter
 from tenhou.decoder import TenhouDecoder
-from utils.settings_handler import settings
+from tenhou.tokenizer import tokenize_stream
 
 
 logger = logging.getLogger('validate_hand')
@@ -68,51 +68,55 @@ def main():
 class TenhouLogParser(object):
 
     def parse_log(self, log_data, log_id):
-        decoder = TenhouDecoder()
-        finished_hand = FinishedHand()
+        total_hand = 0
+        successful_hand = 0
 
-        soup = BeautifulSoup(log_data, 'html.parser')
-        elements = soup.find_all()
+        for result in self.validate_log(log_data, log_id):
+            if result['success']:
+                successful_hand += 1
+            total_hand += 1
 
-        settings.FIVE_REDS = True
+        print('{},{}'.format(successful_hand, total_hand))
+
+    def validate_log(self, log_data, log_id):
+        """
+        Compare our hand values with tenhou values of the all log agari
+        :param log_data: string with the log xml
+        :param log_id: tenhou log id, it is used in the error messages
+        :return: generator of the dictionaries, one per agari:
+        success, tenhou yaku ids, round, winner and (our value, tenhou value) pairs of fu, han and cost
+        """
+        decoder = TenhouDecoder()
+        # rules of the log are known only after the GO tag
+        finished_hand = FinishedHand(ruleset=Ruleset(aka_dora=True))
 
-        total_hand = 0
-        successful_hand = 0
         played_rounds = 0
 
         dealer = 0
         round_wind = EAST
 
-        for tag in elements:
-            if tag.name == 'go':
-                game_rule_temp = int(tag.attrs['type'])
+        for tag, attrs in tokenize_stream(log_data):
+            if tag == 'go':
+                game_rule_temp = int(attrs['type'])
+                ruleset = Ruleset.from_game_type(game_rule_temp)
 
                 # let's skip hirosima games
-                hirosima = [177, 185, 241, 249]
-                if game_rule_temp in hirosima:
-                    print('0,0')
+                if ruleset.sanma:
                     return
 
                 # one round games
                 skip_games = [2113]
                 if game_rule_temp in skip_games:
-                    print('0,0')
                     return
 
-                no_red_five = [163, 167, 171, 175]
-                if game_rule_temp in no_red_five:
-                    settings.FIVE_REDS = False
-
-                no_open_tanyao = [167, 175]
-                if game_rule_temp in no_open_tanyao:
-                    settings.OPEN_TANYAO = False
+                finished_hand = FinishedHand(ruleset=ruleset)
 
-            if tag.name == 'taikyoku':
-                dealer = int(tag.attrs['oya'])
+            if tag == 'taikyoku':
+                dealer = int(attrs['oya'])
 
-            if tag.name == 'init':
-                dealer = int(tag.attrs['oya'])
-                seed = [int(i) for i in tag.attrs['seed'].split(',')]
+            if tag == 'init':
+                dealer = int(attrs['oya'])
+                seed = [int(i) for i in attrs['seed'].split(',')]
                 round_number = seed[0]
 
                 if round_number < 4:
@@ -126,25 +130,25 @@ class TenhouLogParser(object):
 
                 played_rounds += 1
 
-            if tag.name == 'agari':
+            if tag == 'agari':
                 success = True
-                winner = int(tag.attrs['who'])
-                from_who = int(tag.attrs['fromwho'])
+                winner = int(attrs['who'])
+                from_who = int(attrs['fromwho'])
 
-                closed_hand = [int(i) for i in tag.attrs['hai'].split(',')]
-                ten = [int(i) for i in tag.attrs['ten'].split(',')]
-                dora_indicators = [int(i) for i in tag.attrs['dorahai'].split(',')]
-                if 'dorahaiura' in tag.attrs:
-                    dora_indicators += [int(i) for i in tag.attrs['dorahaiura'].split(',')]
+                closed_hand = [int(i) for i in attrs['hai'].split(',')]
+                ten = [int(i) for i in attrs['ten'].split(',')]
+                dora_indicators = [int(i) for i in attrs['dorahai'].split(',')]
+                if 'dorahaiura' in attrs:
+                    dora_indicators += [int(i) for i in attrs['dorahaiura'].split(',')]
 
                 yaku_list = []
                 yakuman_list = []
-                if 'yaku' in tag.attrs:
-                    yaku_temp = [int(i) for i in tag.attrs['yaku'].split(',')]
+                if 'yaku' in attrs:
+                    yaku_temp = [int(i) for i in attrs['yaku'].split(',')]
                     yaku_list = yaku_temp[::2]
                     han = sum(yaku_temp[1::2])
                 else:
-                    yakuman_list = [int(i) for i in tag.attrs['yakuman'].split(',')]
+                    yakuman_list = [int(i) for i in attrs['yakuman'].split(',')]
                     han = len(yakuman_list) * 13
 
                 fu = ten[0]
@@ -152,10 +156,9 @@ class TenhouLogParser(object):
 
                 melds = []
                 called_kan_indices = []
-                if 'm' in tag.attrs:
-                    for x in tag.attrs['m'].split(','):
-                        message = '<N who={} m={}>'.format(tag.attrs['who'], x)
-                        meld = decoder.parse_meld(message)
+                if 'm' in attrs:
+                    for x in attrs['m'].split(','):
+                        meld = decoder.parse_meld(('n', {'who': attrs['who'], 'm': x}))
                         tiles = meld.tiles
                         if len(tiles) == 4:
                             called_kan_indices.append(tiles[0])
@@ -172,7 +175,7 @@ class TenhouLogParser(object):
                 if melds:
                     hand += reduce(lambda z, y: z + y, melds)
 
-                win_tile = int(tag.attrs['machi'])
+                win_tile = int(attrs['machi'])
 
                 is_tsumo = winner == from_who
                 is_riichi = 1 in yaku_list
@@ -240,15 +243,20 @@ class TenhouLogParser(object):
                     logger.error('Open sets: {}'.format(melds))
                     logger.error('Called kans: {}'.format(TilesConverter.to_one_line_string(called_kan_indices)))
                     logger.error('Our results: {}'.format(result))
-                    logger.error('Tenhou results: {}'.format(tag.attrs))
+                    logger.error('Tenhou results: {}'.format(attrs))
                     logger.error('Dora: {}'.format(TilesConverter.to_one_line_string(dora_indicators)))
                     logger.error('')
-                else:
-                    successful_hand += 1
-
-                total_hand += 1
 
-        print('{},{}'.format(successful_hand, total_hand))
+                yield {
+                    'success': success,
+                    'error': result['error'],
+                    'yaku': yaku_list + yakuman_list,
+                    'round': played_rounds - 1,
+                    'winner': winner,
+                    'fu': (result['fu'], fu),
+                    'han': (result['han'], han),
+                    'cost': (calculated_cost, cost),
+                }
 
 
 if __name__ == '__main__':